@@ -0,0 +1,267 @@
+"""
+Benchmark Suite
+Measures the library's own overhead against the local mock server: client
+throughput and p50/p99 latency in sync, async, batch and streaming modes,
+plus microbenchmarks for the cache, rate limiter and token counting.
+Results are written to JSON; pass --compare to diff against an earlier run.
+
+Run:
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --quick --compare benchmarks/results/previous.json
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from examples.mock_server import MockLLMServer
+from src.llm.claude_client import ClaudeClient
+from src.llm.openai_client import OpenAIClient
+from src.utils.cache import Cache, MemoryCache
+from src.utils.rate_limiter import RateLimiter
+from src.utils.token_counter import get_token_counter
+
+CLIENTS = {"openai": OpenAIClient, "anthropic": ClaudeClient}
+
+
+def summarize(latencies: List[float], elapsed: float) -> Dict[str, float]:
+    """Throughput and latency percentiles (milliseconds) for a set of calls."""
+    ordered = sorted(latencies)
+
+    def percentile(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1000 if ordered else 0.0
+
+    return {
+        "requests": len(ordered),
+        "throughput_rps": len(ordered) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(0.50),
+        "p99_ms": percentile(0.99),
+        "mean_ms": sum(ordered) / len(ordered) * 1000 if ordered else 0.0,
+    }
+
+
+def bench_sync(client, requests: int) -> Dict[str, float]:
+    latencies = []
+    start = time.perf_counter()
+    for i in range(requests):
+        t = time.perf_counter()
+        client.generate(f"sync benchmark prompt {i}", max_tokens=16)
+        latencies.append(time.perf_counter() - t)
+    return summarize(latencies, time.perf_counter() - start)
+
+
+def bench_async(client, requests: int, concurrency: int) -> Dict[str, float]:
+    async def run() -> Dict[str, float]:
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(i: int) -> float:
+            async with semaphore:
+                t = time.perf_counter()
+                await client.generate_async(f"async benchmark prompt {i}", max_tokens=16)
+                return time.perf_counter() - t
+
+        # The async SDK client is created per event loop; keep that out of the timings.
+        await client.generate_async("warm-up", max_tokens=4)
+        start = time.perf_counter()
+        latencies = await asyncio.gather(*(one(i) for i in range(requests)))
+        return summarize(latencies, time.perf_counter() - start)
+
+    return asyncio.run(run())
+
+
+def bench_batch(client, requests: int, concurrency: int) -> Dict[str, float]:
+    prompts = [f"batch benchmark prompt {i}" for i in range(requests)]
+    start = time.perf_counter()
+    results = client.generate_batch(prompts, concurrency=concurrency, max_tokens=16)
+    elapsed = time.perf_counter() - start
+    failed = sum(1 for r in results if not r.success)
+    return {"requests": len(results), "failed": failed, "throughput_rps": len(results) / elapsed}
+
+
+def bench_stream(client, requests: int) -> Dict[str, float]:
+    first_tokens, latencies = [], []
+    start = time.perf_counter()
+    for i in range(requests):
+        t = time.perf_counter()
+        first = None
+        for _ in client.generate_stream(f"stream benchmark prompt {i} with a few more words", max_tokens=32):
+            if first is None:
+                first = time.perf_counter() - t
+        first_tokens.append(first or 0.0)
+        latencies.append(time.perf_counter() - t)
+    result = summarize(latencies, time.perf_counter() - start)
+    ttft = summarize(first_tokens, 1.0)
+    result["ttft_p50_ms"], result["ttft_p99_ms"] = ttft["p50_ms"], ttft["p99_ms"]
+    return result
+
+
+def per_op(func: Callable[[int], Any], iterations: int) -> Dict[str, float]:
+    """Run func(i) `iterations` times and report the cost per call."""
+    start = time.perf_counter()
+    for i in range(iterations):
+        func(i)
+    elapsed = time.perf_counter() - start
+    return {"iterations": iterations, "us_per_op": elapsed / iterations * 1e6, "ops_per_s": iterations / elapsed}
+
+
+def micro_benchmarks(iterations: int) -> Dict[str, Dict[str, float]]:
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = Cache(tmp)
+        value = {"text": "x" * 512}
+        results["cache_set"] = per_op(lambda i: cache.set(f"key-{i}", value), iterations)
+        results["cache_get_hit"] = per_op(lambda i: cache.get(f"key-{i}"), iterations)
+        results["cache_get_miss"] = per_op(lambda i: cache.get(f"missing-{i}"), iterations)
+        keys = [f"key-{i}" for i in range(100)]
+        results["cache_get_many_100"] = per_op(lambda i: cache.get_many(keys), max(1, iterations // 100))
+
+    memory = MemoryCache()
+    for i in range(1000):
+        memory.set(f"key-{i}", value)
+    results["memory_cache_get_hit"] = per_op(lambda i: memory.get(f"key-{i % 1000}"), iterations * 10)
+
+    limiter = RateLimiter(max_calls=10 ** 9, period=1, tokens_per_minute=10 ** 12)
+    results["rate_limiter_acquire"] = per_op(lambda i: limiter.acquire(100), iterations * 10)
+
+    for model in ("gpt-4o", "claude-3-5-sonnet-20240620"):
+        counter = get_token_counter(model)
+        name = type(counter).__name__
+        text = "The quick brown fox jumps over the lazy dog. " * 20
+        results[f"token_count_memoized[{model}:{name}]"] = per_op(lambda i: counter.count(text), iterations * 10)
+        results[f"token_count_unique[{model}:{name}]"] = per_op(lambda i: counter.count(f"{i} {text}"), iterations)
+        messages = [{"role": "system", "content": "You are helpful."}, {"role": "user", "content": text}]
+        results[f"count_messages[{model}:{name}]"] = per_op(lambda i: counter.count_messages(messages), iterations)
+    return results
+
+
+def _serve(options: Dict[str, Any], urls: "multiprocessing.Queue", stop: "multiprocessing.Event"):
+    with MockLLMServer(**options) as server:
+        urls.put({"openai": server.openai_base_url, "anthropic": server.anthropic_base_url})
+        stop.wait()
+
+
+@contextmanager
+def mock_server(options: Dict[str, Any], in_process: bool = False) -> Iterator[Dict[str, str]]:
+    """
+    Run the mock server and yield its base URLs per provider.
+
+    By default it runs in a child process, so its request handling doesn't
+    compete with the client under test for the GIL.
+    """
+    if in_process:
+        with MockLLMServer(**options) as server:
+            yield {"openai": server.openai_base_url, "anthropic": server.anthropic_base_url}
+        return
+    urls, stop = multiprocessing.Queue(), multiprocessing.Event()
+    process = multiprocessing.Process(target=_serve, args=(options, urls, stop), daemon=True)
+    process.start()
+    try:
+        yield urls.get(timeout=30)
+    finally:
+        stop.set()
+        process.join(timeout=10)
+
+
+def client_benchmarks(base_urls: Dict[str, str], requests: int, concurrency: int) -> Dict[str, Dict[str, Any]]:
+    results = {}
+    for provider, client_cls in CLIENTS.items():
+        client = client_cls(api_key="benchmark", base_url=base_urls[provider])
+        client.generate("warm-up", max_tokens=4)
+        results[provider] = {
+            "sync": bench_sync(client, requests),
+            "async": bench_async(client, requests, concurrency),
+            "batch": bench_batch(client, requests, concurrency),
+            "stream": bench_stream(client, max(1, requests // 4)),
+        }
+    return results
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], path: str = ""):
+    """Print the relative change of every numeric result that exists in both runs."""
+    for key, value in current.items():
+        name = f"{path}.{key}" if path else key
+        old = baseline.get(key) if isinstance(baseline, dict) else None
+        if isinstance(value, dict):
+            compare(value, old or {}, name)
+        elif key in ("requests", "iterations", "failed"):
+            continue
+        elif isinstance(value, (int, float)) and isinstance(old, (int, float)) and old:
+            change = (value - old) / old * 100
+            print(f"  {name:<70} {old:>12.2f} -> {value:>12.2f}  ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the library against a local mock server.")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per client and mode.")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrency for async and batch modes.")
+    parser.add_argument("--latency", type=float, default=0.0, help="Mock server latency per request (seconds).")
+    parser.add_argument("--chunk-latency", type=float, default=0.0, help="Mock delay between streamed chunks.")
+    parser.add_argument("--iterations", type=int, default=2000, help="Base iteration count for microbenchmarks.")
+    parser.add_argument("--quick", action="store_true", help="Run a reduced workload.")
+    parser.add_argument("--in-process", action="store_true", help="Run the mock server in this process.")
+    parser.add_argument("--output", default=None, help="JSON output path (default: benchmarks/results/<time>.json).")
+    parser.add_argument("--compare", default=None, help="Earlier results JSON to compare against.")
+    args = parser.parse_args()
+    if args.quick:
+        args.requests, args.iterations = max(1, args.requests // 4), max(1, args.iterations // 4)
+
+    options = {"latency": args.latency, "chunk_latency": args.chunk_latency}
+    with mock_server(options, in_process=args.in_process) as base_urls:
+        clients = client_benchmarks(base_urls, args.requests, args.concurrency)
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": vars(args),
+        "clients": clients,
+        "micro": micro_benchmarks(args.iterations),
+    }
+
+    output = args.output or os.path.join(
+        "benchmarks", "results", datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    print("\n" + "=" * 70)
+    print("📊 BENCHMARK RESULTS")
+    print("=" * 70)
+    for provider, modes in clients.items():
+        for mode, result in modes.items():
+            latency = f"p50 {result['p50_ms']:7.2f} ms  p99 {result['p99_ms']:7.2f} ms" if "p50_ms" in result else ""
+            print(f"{provider:<10} {mode:<7} {result['throughput_rps']:9.1f} req/s  {latency}")
+    print()
+    for name, result in report["micro"].items():
+        print(f"{name:<60} {result['us_per_op']:10.2f} µs/op")
+    print(f"\nSaved to {output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"\nChange vs {args.compare} (commit {baseline.get('commit')}):")
+        compare({"clients": clients, "micro": report["micro"]}, baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Adaptive Rate Limiting Example
+Runs a batch against the local mock server, whose request limit is lower than
+the client's configured one, and shows the limiter backing off on 429s and
+settling at the limit the server reports. No API key is needed.
+"""
+
+import sys
+import os
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from examples.mock_server import MockLLMServer
+from src.llm.openai_client import OpenAIClient
+from src.utils.logger import setup_logger
+from src.utils.rate_limiter import RateLimiter
+
+logger = setup_logger("adaptive_rate_limit")
+
+SERVER_RPM = 300
+CLIENT_RPM = 1200
+
+
+def main():
+    logger.info("Starting adaptive rate limiting example...")
+
+    with MockLLMServer(requests_per_minute=SERVER_RPM) as server:
+        # Deliberately too optimistic: the server only allows a quarter of this.
+        rate_limiter = RateLimiter(max_calls=CLIENT_RPM // 60, period=1, adaptive=True)
+        client = OpenAIClient(api_key="mock", model="gpt-4", base_url=server.openai_base_url,
+                              rate_limiter=rate_limiter)
+
+        prompts = [f"Question {i}" for i in range(60)]
+
+        print("\n" + "="*60)
+        print("🎛️  ADAPTIVE RATE LIMITING")
+        print(f"Server limit: {SERVER_RPM}/min, configured client limit: {CLIENT_RPM}/min")
+        print("="*60 + "\n")
+
+        start_time = time.time()
+        results = client.generate_batch(prompts, concurrency=8, max_tokens=50)
+        elapsed_time = time.time() - start_time
+
+        successful = sum(1 for r in results if r.success)
+        print(f"Successful: {successful}/{len(prompts)}")
+        print(f"429s returned by the server: {server.stats['rate_limited']}")
+        print(f"Limiter rate now: {rate_limiter.requests.rate * 60:.0f}/min "
+              f"(ceiling {rate_limiter.requests.max_rate * 60:.0f}/min)")
+        print(f"Time elapsed: {elapsed_time:.2f} seconds\n")
+
+    logger.info("✅ Adaptive rate limiting example completed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,75 +9,46 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from src.llm.claude_client import ClaudeClient
+from src.llm.conversation import Conversation
 from src.utils.logger import setup_logger
 from src.utils.cache import Cache
 
 class ChatSession:
     """Manages a conversation session with context."""
     
-    def __init__(self, client, use_cache=True):
+    def __init__(self, client, max_context_tokens=4000):
         self.client = client
-        self.conversation_history = []
-        self.cache = Cache() if use_cache else None
+        # Keeps the history as native messages with running token totals, and
+        # summarizes the oldest turns once the context budget is exceeded.
+        self.conversation = Conversation(client, max_context_tokens=max_context_tokens, summarize=True)
         self.logger = setup_logger("chat_session")
     
     def send_message(self, user_message: str) -> str:
         """Send a message and get a response."""
-        
-        # Check cache first
-        cache_key = f"chat_{hash(str(self.conversation_history) + user_message)}"
-        
-        if self.cache:
-            cached_response = self.cache.get(cache_key)
-            if cached_response:
-                self.logger.info("📦 Using cached response")
-                return cached_response
-        
-        # Build context from conversation history
-        context = "\n".join([
-            f"User: {msg['user']}\nAssistant: {msg['assistant']}"
-            for msg in self.conversation_history
-        ])
-        
-        # Create full prompt with context
-        full_prompt = f"{context}\nUser: {user_message}\nAssistant:" if context else user_message
-        
-        # Generate response
         self.logger.info(f"💬 User: {user_message}")
-        response = self.client.generate(
-            full_prompt,
+        response = self.conversation.send(
+            user_message,
             temperature=0.8,
             max_tokens=300
         )
-        
-        # Store in conversation history
-        self.conversation_history.append({
-            "user": user_message,
-            "assistant": response
-        })
-        
-        # Cache the response
-        if self.cache:
-            self.cache.set(cache_key, response)
-        
         self.logger.info(f"🤖 Assistant: {response[:100]}...")
         
         return response
     
     def clear_history(self):
         """Clear conversation history."""
-        self.conversation_history = []
+        self.conversation.clear()
         self.logger.info("🗑️  Conversation history cleared")
 
 def main():
     logger = setup_logger("chat_example")
     logger.info("Starting chat session example...")
     
-    # Initialize Claude client
-    client = ClaudeClient(model="claude-3-opus-20240229")
+    # Initialize Claude client; force_cache caches replies even at temperature 0.8
+    client = ClaudeClient(model="claude-3-opus-20240229", cache=Cache(), force_cache=True)
     
     # Create chat session
-    chat = ChatSession(client, use_cache=True)
+    chat = ChatSession(client)
     
     # Simulate a conversation
     conversation = [
@@ -99,7 +70,8 @@ def main():
     
     # Show conversation stats
     logger.info(f"\n📊 Conversation stats:")
-    logger.info(f"   Total messages: {len(chat.conversation_history)}")
+    logger.info(f"   Total messages: {len(chat.conversation)}")
+    logger.info(f"   Context tokens: {chat.conversation.total_tokens}")
     
     print("\n✅ Chat session example completed!")
 
@@ -0,0 +1,584 @@
+"""
+Mock LLM Server
+A local stand-in for the OpenAI and Anthropic HTTP APIs, for running the
+clients offline. It supports configurable latency (including a slow tail),
+streaming (server-sent events in each provider's format), injected server
+errors, a server-side request limit that answers with provider-style
+rate-limit headers and 429s, and the batch APIs (OpenAI files + batches,
+Anthropic message batches), which finish after a configurable delay.
+
+Run standalone:
+    python examples/mock_server.py --port 8080 --rpm 120
+"""
+
+import argparse
+import email.parser
+import email.policy
+import itertools
+import json
+import os
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.rate_limiter import TokenBucket
+
+
+class MockLLMServer:
+    """
+    Threaded HTTP server answering /v1/chat/completions (OpenAI) and
+    /v1/messages (Anthropic) with echo responses, plus their batch APIs.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0,
+                 requests_per_minute: Optional[int] = None, tail_latency: float = 0.0,
+                 tail_fraction: float = 0.0, error_rate: float = 0.0, seed: Optional[int] = None,
+                 chunk_chars: int = 16, chunk_latency: float = 0.0, batch_latency: float = 0.0,
+                 batch_window: Optional[float] = None):
+        """
+        Args:
+            host (str): Interface to bind.
+            port (int): Port to bind; 0 picks a free one.
+            latency (float): Seconds to wait before answering each request.
+            requests_per_minute (int, optional): Server-side request limit; excess requests get 429s.
+            tail_latency (float): Latency of the occasional slow request.
+            tail_fraction (float): Fraction of requests that take `tail_latency` instead.
+            error_rate (float): Fraction of requests answered with a 500 error.
+            seed (int, optional): Seed for the slow-request and error draws.
+            chunk_chars (int): Characters of text per streamed chunk.
+            chunk_latency (float): Seconds between streamed chunks (after the first).
+            batch_latency (float): Seconds until a submitted batch has ended.
+            batch_window (float, optional): Seconds a batch may run; a batch whose
+                `batch_latency` exceeds it expires then, with no request processed.
+        """
+        self.latency = latency
+        self.tail_latency = tail_latency
+        self.tail_fraction = tail_fraction
+        self.error_rate = error_rate
+        self.chunk_chars = max(1, chunk_chars)
+        self.chunk_latency = chunk_latency
+        self.batch_latency = batch_latency
+        self.batch_window = batch_window
+        self.random = random.Random(seed)
+        self.requests_per_minute = requests_per_minute
+        self.bucket = TokenBucket(requests_per_minute, requests_per_minute / 60.0) if requests_per_minute else None
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "rate_limited": 0, "errors": 0, "batches": 0}
+        # Batch API state: uploaded files (OpenAI) and batches of both providers by id.
+        self.files: Dict[str, bytes] = {}
+        self.batches: Dict[str, Dict[str, Any]] = {}
+        self.ids = itertools.count(1)
+
+        handler = type("Handler", (_Handler,), {"server_state": self})
+        self.httpd = _Server((host, port), handler)
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def openai_base_url(self) -> str:
+        return f"{self.url}/v1"
+
+    @property
+    def anthropic_base_url(self) -> str:
+        return self.url
+
+    def start(self) -> "MockLLMServer":
+        """Serve requests on a background thread."""
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Shut the server down."""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "MockLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def admit(self) -> Dict[str, Any]:
+        """
+        Count a request against the server-side limit.
+
+        Returns:
+            Dict[str, Any]: "allowed", plus "remaining" and "reset" seconds when limited.
+        """
+        with self.lock:
+            self.stats["requests"] += 1
+            if self.bucket is None:
+                return {"allowed": True}
+            now = time.monotonic()
+            self.bucket.refill(now)
+            allowed = self.bucket.level >= 1
+            if allowed:
+                self.bucket.level -= 1
+            else:
+                self.stats["rate_limited"] += 1
+            remaining = max(0, int(self.bucket.level))
+            reset = (self.bucket.capacity - self.bucket.level) / self.bucket.rate
+            retry_after = 0.0 if allowed else (1 - self.bucket.level) / self.bucket.rate
+        return {"allowed": allowed, "remaining": remaining, "reset": reset, "retry_after": retry_after}
+
+    def draw_error(self) -> bool:
+        """Decide whether to inject a server error (counted in stats)."""
+        with self.lock:
+            failed = self.random.random() < self.error_rate
+            if failed:
+                self.stats["errors"] += 1
+        return failed
+
+    @staticmethod
+    def echo(request: Dict[str, Any]) -> Tuple[str, int, int]:
+        """Return the echo text and the input/output token counts for a request."""
+        prompt = request.get("messages", [{}])[-1].get("content", "")
+        # Honour max_tokens, at roughly four characters per token.
+        text = f"Echo: {prompt}"[:4 * int(request.get("max_tokens") or 1000)]
+        input_tokens = max(1, len(json.dumps(request.get("messages", []))) // 4)
+        output_tokens = max(1, len(text) // 4)
+        return text, input_tokens, output_tokens
+
+    @classmethod
+    def completion(cls, anthropic: bool, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the non-streamed response body for a request in the provider's format."""
+        text, input_tokens, output_tokens = cls.echo(request)
+        if anthropic:
+            return {
+                "id": "msg_mock", "type": "message", "role": "assistant", "model": request.get("model"),
+                "content": [{"type": "text", "text": text}],
+                "stop_reason": "end_turn", "stop_sequence": None,
+                "usage": {"input_tokens": input_tokens, "output_tokens": output_tokens},
+            }
+        return {
+            "id": "chatcmpl-mock", "object": "chat.completion", "created": int(time.time()),
+            "model": request.get("model"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": input_tokens, "completion_tokens": output_tokens,
+                      "total_tokens": input_tokens + output_tokens},
+        }
+
+    def new_id(self, prefix: str) -> str:
+        return f"{prefix}_mock{next(self.ids)}"
+
+    def create_batch(self, anthropic: bool, requests: List[Tuple[str, Dict[str, Any]]],
+                     **fields: Any) -> Dict[str, Any]:
+        """Register a batch of (custom_id, request) pairs that ends `batch_latency` seconds from now."""
+        now = time.time()
+        expires = self.batch_window is not None and self.batch_latency > self.batch_window
+        batch = {
+            "id": self.new_id("msgbatch" if anthropic else "batch"),
+            "anthropic": anthropic,
+            "requests": requests,
+            "created_at": now,
+            "ends_at": now + (self.batch_window if expires else self.batch_latency),
+            "expired": expires,
+            "cancelled_at": None,
+            "ended_at": None,
+            "errors": None,
+            "results": None,
+            **fields,
+        }
+        with self.lock:
+            self.batches[batch["id"]] = batch
+            self.stats["batches"] += 1
+        return batch
+
+    def settle_batch(self, batch: Dict[str, Any]) -> bool:
+        """Process a batch once it is due or cancelled; returns True if it has ended."""
+        with self.lock:
+            due = batch["results"] is None and (batch["cancelled_at"] or time.time() >= batch["ends_at"])
+            if due:
+                batch["results"] = {}
+        if due:
+            if not (batch["cancelled_at"] or batch["errors"] or batch["expired"]):
+                for custom_id, request in batch["requests"]:
+                    failed = self.draw_error()
+                    batch["results"][custom_id] = None if failed else self.completion(batch["anthropic"], request)
+            batch["ended_at"] = time.time()
+        return batch["ended_at"] is not None
+
+
+class _Server(ThreadingHTTPServer):
+    # Concurrent clients open many connections at once; the default listen backlog of 5 drops some.
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without TCP_NODELAY the
+    # body waits on a delayed ACK and adds ~40 ms to every response.
+    disable_nagle_algorithm = True
+    server_state: MockLLMServer
+
+    def log_message(self, format, *args):
+        pass
+
+    def _rate_limit_headers(self, anthropic: bool, admission: Dict[str, Any]) -> Dict[str, str]:
+        state = self.server_state
+        if state.bucket is None:
+            return {}
+        limit = str(state.requests_per_minute)
+        remaining = str(admission["remaining"])
+        if anthropic:
+            reset_at = datetime.now(timezone.utc) + timedelta(seconds=admission["reset"])
+            return {
+                "anthropic-ratelimit-requests-limit": limit,
+                "anthropic-ratelimit-requests-remaining": remaining,
+                "anthropic-ratelimit-requests-reset": reset_at.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            }
+        return {
+            "x-ratelimit-limit-requests": limit,
+            "x-ratelimit-remaining-requests": remaining,
+            "x-ratelimit-reset-requests": f"{admission['reset']:.3f}s",
+        }
+
+    def _send_json(self, status: int, body: Dict[str, Any], headers: Dict[str, str]):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(payload)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        try:
+            self.wfile.write(payload)
+        except ConnectionError:
+            # The client gave up on the request (e.g. a cancelled hedged call).
+            self.close_connection = True
+
+    def _send_events(self, events: List[Tuple[Optional[str], Any]], headers: Dict[str, str]):
+        """Send server-sent events with chunked transfer encoding, pausing chunk_latency between them."""
+        self.send_response(200)
+        self.send_header("content-type", "text/event-stream")
+        self.send_header("transfer-encoding", "chunked")
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        try:
+            for i, (event, data) in enumerate(events):
+                if i and self.server_state.chunk_latency:
+                    time.sleep(self.server_state.chunk_latency)
+                payload = data if isinstance(data, str) else json.dumps(data)
+                message = (f"event: {event}\n" if event else "") + f"data: {payload}\n\n"
+                encoded = message.encode("utf-8")
+                self.wfile.write(f"{len(encoded):x}\r\n".encode("ascii") + encoded + b"\r\n")
+                self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+        except ConnectionError:
+            self.close_connection = True
+
+    def _stream_events(self, anthropic: bool, request: Dict[str, Any], text: str,
+                       input_tokens: int, output_tokens: int) -> List[Tuple[Optional[str], Any]]:
+        """Build the event sequence of a streamed response in the provider's format."""
+        size = self.server_state.chunk_chars
+        chunks = [text[i:i + size] for i in range(0, len(text), size)]
+        model = request.get("model")
+        if anthropic:
+            events: List[Tuple[Optional[str], Any]] = [
+                ("message_start", {"type": "message_start", "message": {
+                    "id": "msg_mock", "type": "message", "role": "assistant", "model": model, "content": [],
+                    "stop_reason": None, "stop_sequence": None,
+                    "usage": {"input_tokens": input_tokens, "output_tokens": 1}}}),
+                ("content_block_start", {"type": "content_block_start", "index": 0,
+                                         "content_block": {"type": "text", "text": ""}}),
+            ]
+            events += [("content_block_delta", {"type": "content_block_delta", "index": 0,
+                                                "delta": {"type": "text_delta", "text": chunk}}) for chunk in chunks]
+            events += [
+                ("content_block_stop", {"type": "content_block_stop", "index": 0}),
+                ("message_delta", {"type": "message_delta", "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                                   "usage": {"output_tokens": output_tokens}}),
+                ("message_stop", {"type": "message_stop"}),
+            ]
+            return events
+
+        base = {"id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": int(time.time()), "model": model}
+        events = [(None, {**base, "choices": [{"index": 0, "delta": {"role": "assistant", "content": chunk},
+                                               "finish_reason": None}]}) for chunk in chunks]
+        events.append((None, {**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}))
+        if (request.get("stream_options") or {}).get("include_usage"):
+            events.append((None, {**base, "choices": [], "usage": {
+                "prompt_tokens": input_tokens, "completion_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens}}))
+        events.append((None, "[DONE]"))
+        return events
+
+    def _read_json(self) -> Dict[str, Any]:
+        length = int(self.headers.get("content-length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _send_jsonl(self, lines: List[Dict[str, Any]]):
+        payload = "".join(json.dumps(line) + "\n" for line in lines).encode("utf-8")
+        self.send_response(200)
+        self.send_header("content-type", "application/octet-stream")
+        self.send_header("content-length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _not_found(self):
+        self._send_json(404, {"error": {"type": "not_found_error", "message": f"Unknown path {self.path}"}}, {})
+
+    def _upload_file(self):
+        """POST /v1/files: store a multipart-uploaded batch input file."""
+        length = int(self.headers.get("content-length", 0))
+        head = f"Content-Type: {self.headers.get('content-type')}\r\n\r\n".encode("utf-8")
+        message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(head + self.rfile.read(length))
+        parts = {part.get_param("name", header="content-disposition"): part for part in message.iter_parts()}
+        upload = parts["file"]
+        content = upload.get_payload(decode=True)
+        state = self.server_state
+        file_id = state.new_id("file")
+        with state.lock:
+            state.files[file_id] = content
+        self._send_json(200, {
+            "id": file_id, "object": "file", "bytes": len(content), "created_at": int(time.time()),
+            "filename": upload.get_filename() or "upload.jsonl", "purpose": "batch", "status": "processed",
+        }, {})
+
+    def _create_openai_batch(self):
+        """POST /v1/batches: validate the input file and queue its requests."""
+        body = self._read_json()
+        state = self.server_state
+        content = state.files.get(body.get("input_file_id"))
+        if content is None:
+            self._not_found()
+            return
+        requests, errors, seen = [], [], set()
+        for number, line in enumerate(content.decode("utf-8").splitlines(), 1):
+            try:
+                entry = json.loads(line)
+                if entry["custom_id"] in seen:
+                    raise ValueError(f"Duplicate custom_id {entry['custom_id']}")
+                if entry.get("method") != "POST" or entry.get("url") != body.get("endpoint"):
+                    raise ValueError("Request method or url does not match the batch endpoint")
+                seen.add(entry["custom_id"])
+                requests.append((entry["custom_id"], entry["body"]))
+            except (ValueError, KeyError, TypeError) as e:
+                errors.append({"code": "invalid_request", "message": str(e), "line": number, "param": None})
+        batch = state.create_batch(
+            False, requests, endpoint=body.get("endpoint"), input_file_id=body["input_file_id"],
+            metadata=body.get("metadata"), errors={"object": "list", "data": errors} if errors else None)
+        self._send_json(200, self._openai_batch(batch), {})
+
+    def _openai_batch(self, batch: Dict[str, Any]) -> Dict[str, Any]:
+        state = self.server_state
+        ended = state.settle_batch(batch)
+        results = batch["results"] or {}
+        if ended and "output_file_id" not in batch:
+            outputs, failures = [], []
+            for custom_id, response in results.items():
+                entry = {"id": state.new_id("batch_req"), "custom_id": custom_id, "error": None}
+                if response is None:
+                    entry["response"] = {"status_code": 500, "request_id": "req_mock", "body": {
+                        "error": {"message": "Injected server error", "type": "server_error", "code": None}}}
+                    failures.append(entry)
+                else:
+                    entry["response"] = {"status_code": 200, "request_id": "req_mock", "body": response}
+                    outputs.append(entry)
+            with state.lock:
+                for key, lines in (("output_file_id", outputs), ("error_file_id", failures)):
+                    file_id = None
+                    if lines:
+                        file_id = state.new_id("file")
+                        state.files[file_id] = "".join(json.dumps(line) + "\n" for line in lines).encode("utf-8")
+                    batch[key] = file_id
+        if ended:
+            status = ("failed" if batch["errors"] else "cancelled" if batch["cancelled_at"]
+                      else "expired" if batch["expired"] else "completed")
+        else:
+            status = "cancelling" if batch["cancelled_at"] else "in_progress"
+        succeeded = sum(1 for response in results.values() if response is not None)
+        return {
+            "id": batch["id"], "object": "batch", "endpoint": batch["endpoint"], "errors": batch["errors"],
+            "input_file_id": batch["input_file_id"], "completion_window": "24h", "status": status,
+            "output_file_id": batch.get("output_file_id"), "error_file_id": batch.get("error_file_id"),
+            "created_at": int(batch["created_at"]), "metadata": batch["metadata"],
+            "request_counts": {"total": len(batch["requests"]), "completed": succeeded,
+                               "failed": len(results) - succeeded},
+        }
+
+    def _create_anthropic_batch(self):
+        """POST /v1/messages/batches: queue the requests of a message batch."""
+        body = self._read_json()
+        requests = [(entry["custom_id"], entry["params"]) for entry in body.get("requests", [])]
+        self._send_json(200, self._anthropic_batch(self.server_state.create_batch(True, requests)), {})
+
+    def _anthropic_batch(self, batch: Dict[str, Any]) -> Dict[str, Any]:
+        state = self.server_state
+        ended = state.settle_batch(batch)
+        results = batch["results"] or {}
+
+        def timestamp(value: Optional[float]) -> Optional[str]:
+            return datetime.fromtimestamp(value, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ") if value else None
+
+        succeeded = sum(1 for response in results.values() if response is not None)
+        total = len(batch["requests"])
+        unprocessed = total - len(results) if ended else 0
+        return {
+            "id": batch["id"], "type": "message_batch",
+            "processing_status": "ended" if ended else "canceling" if batch["cancelled_at"] else "in_progress",
+            "request_counts": {"processing": 0 if ended else total, "succeeded": succeeded,
+                               "errored": len(results) - succeeded,
+                               "canceled": 0 if batch["expired"] else unprocessed,
+                               "expired": unprocessed if batch["expired"] else 0},
+            "created_at": timestamp(batch["created_at"]), "expires_at": timestamp(batch["created_at"] + 86400),
+            "ended_at": timestamp(batch["ended_at"]), "cancel_initiated_at": timestamp(batch["cancelled_at"]),
+            "archived_at": None,
+            "results_url": f"{state.url}/v1/messages/batches/{batch['id']}/results" if ended else None,
+        }
+
+    def _anthropic_results(self, batch: Dict[str, Any]):
+        """GET .../results: one JSON line per request, in submission order."""
+        lines = []
+        for custom_id, _ in batch["requests"]:
+            response = batch["results"].get(custom_id, False)
+            if response is False:
+                result = {"type": "expired" if batch["expired"] else "canceled"}
+            elif response is None:
+                result = {"type": "errored", "error": {"type": "error", "error": {
+                    "type": "api_error", "message": "Injected server error"}}}
+            else:
+                result = {"type": "succeeded", "message": response}
+            lines.append({"custom_id": custom_id, "result": result})
+        self._send_jsonl(lines)
+
+    def do_GET(self):
+        state = self.server_state
+        url = urlparse(self.path)
+        parts = url.path.strip("/").split("/")
+        if parts[-1] == "batches":
+            # Newest first, paginated with `limit` and an `after_id` (Anthropic) or `after` (OpenAI) cursor.
+            anthropic = "messages" in parts
+            query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            with state.lock:
+                batches = [b for b in reversed(state.batches.values()) if b["anthropic"] == anthropic]
+            cursor = query.get("after_id" if anthropic else "after")
+            if cursor:
+                ids = [batch["id"] for batch in batches]
+                batches = batches[ids.index(cursor) + 1:] if cursor in ids else []
+            limit = int(query.get("limit", 20))
+            render = self._anthropic_batch if anthropic else self._openai_batch
+            data = [render(batch) for batch in batches[:limit]]
+            self._send_json(200, {"object": "list", "data": data, "has_more": len(batches) > limit,
+                                  "first_id": data[0]["id"] if data else None,
+                                  "last_id": data[-1]["id"] if data else None}, {})
+        elif len(parts) >= 3 and parts[-3] == "files" and parts[-1] == "content":
+            content = state.files.get(parts[-2])
+            if content is None:
+                self._not_found()
+                return
+            self.send_response(200)
+            self.send_header("content-type", "application/octet-stream")
+            self.send_header("content-length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+        elif parts[-1] == "results" and parts[-2] in state.batches and state.batches[parts[-2]]["ended_at"]:
+            self._anthropic_results(state.batches[parts[-2]])
+        elif parts[-1] in state.batches:
+            batch = state.batches[parts[-1]]
+            self._send_json(200, self._anthropic_batch(batch) if batch["anthropic"] else self._openai_batch(batch), {})
+        else:
+            self._not_found()
+
+    def _cancel_batch(self, batch_id: str):
+        """POST .../batches/{id}/cancel: stop a batch; unprocessed requests end up canceled."""
+        batch = self.server_state.batches.get(batch_id)
+        if batch is None:
+            self._not_found()
+            return
+        if batch["ended_at"] is None and batch["cancelled_at"] is None:
+            batch["cancelled_at"] = time.time()
+        self._send_json(200, self._anthropic_batch(batch) if batch["anthropic"] else self._openai_batch(batch), {})
+
+    def do_POST(self):
+        path = urlparse(self.path).path.rstrip("/")
+        if path.endswith("/files"):
+            self._upload_file()
+            return
+        if path.endswith("/messages/batches"):
+            self._create_anthropic_batch()
+            return
+        if path.endswith("/batches"):
+            self._create_openai_batch()
+            return
+        if path.endswith("/cancel"):
+            self._cancel_batch(path.split("/")[-2])
+            return
+        anthropic = path.endswith("/messages")
+        if not anthropic and not path.endswith("/chat/completions"):
+            self._not_found()
+            return
+        request = self._read_json()
+
+        state = self.server_state
+        admission = state.admit()
+        headers = self._rate_limit_headers(anthropic, admission)
+        if not admission["allowed"]:
+            headers["retry-after"] = f"{admission['retry_after']:.3f}"
+            if anthropic:
+                body = {"type": "error", "error": {"type": "rate_limit_error", "message": "Rate limit exceeded"}}
+            else:
+                body = {"error": {"message": "Rate limit exceeded", "type": "requests", "code": "rate_limit_exceeded"}}
+            self._send_json(429, body, headers)
+            return
+
+        failed = state.draw_error()
+        with state.lock:
+            slow = state.random.random() < state.tail_fraction
+        if failed:
+            if anthropic:
+                body = {"type": "error", "error": {"type": "api_error", "message": "Injected server error"}}
+            else:
+                body = {"error": {"message": "Injected server error", "type": "server_error", "code": None}}
+            self._send_json(500, body, headers)
+            return
+
+        delay = state.tail_latency if slow else state.latency
+        if delay:
+            time.sleep(delay)
+        if request.get("stream"):
+            text, input_tokens, output_tokens = state.echo(request)
+            self._send_events(self._stream_events(anthropic, request, text, input_tokens, output_tokens), headers)
+            return
+        body = state.completion(anthropic, request)
+        self._send_json(200, body, headers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local mock OpenAI/Anthropic server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds of latency per request.")
+    parser.add_argument("--rpm", type=int, default=None, help="Server-side requests per minute.")
+    parser.add_argument("--chunk-latency", type=float, default=0.0, help="Seconds between streamed chunks.")
+    parser.add_argument("--batch-latency", type=float, default=0.0, help="Seconds until a batch has ended.")
+    parser.add_argument("--batch-window", type=float, default=None,
+                        help="Seconds a batch may run before it expires unprocessed.")
+    args = parser.parse_args()
+
+    server = MockLLMServer(args.host, args.port, latency=args.latency, requests_per_minute=args.rpm,
+                           chunk_latency=args.chunk_latency, batch_latency=args.batch_latency,
+                           batch_window=args.batch_window)
+    print(f"Mock LLM server on {server.url} (OpenAI base_url: {server.openai_base_url})")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -9,17 +9,18 @@ import time
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.llm.openai_client import OpenAIClient
-from src.llm.claude_client import ClaudeClient
+from src.llm.factory import get_factory
 from src.utils.logger import setup_logger
+from src.utils.metrics import registry
 
 def compare_providers(prompt: str):
     """Compare responses from different providers."""
     logger = setup_logger("comparison")
     
-    # Initialize both clients
-    openai_client = OpenAIClient(model="gpt-4")
-    claude_client = ClaudeClient(model="claude-3-opus-20240229")
+    # Shared clients from config/model_config.yaml; connections stay warm between prompts
+    factory = get_factory()
+    openai_client = factory.get("openai")
+    claude_client = factory.get("anthropic")
     
     results = {}
     
@@ -107,7 +108,18 @@ def main():
             print(f"\n⚡ Faster: {faster}")
         
         print("\n" + "="*70)
-    
+
+    # Aggregate latency and token usage recorded by the clients
+    snapshot = registry.snapshot()
+    print("\n📈 LATENCY ACROSS ALL PROMPTS")
+    for series in snapshot["llm_request_duration_seconds"]:
+        labels = series["labels"]
+        print(f"   {labels['provider']}/{labels['model']}: {series['count']} calls, "
+              f"mean {series['mean']:.2f}s, p95 ≈ {series['p95']:.2f}s")
+    for series in snapshot["llm_tokens_total"]:
+        labels = series["labels"]
+        print(f"   {labels['provider']} {labels['kind']} tokens: {int(series['value'])}")
+
     logger.info("✅ Multi-provider comparison completed!")
 
 if __name__ == "__main__":
@@ -11,34 +11,15 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from src.llm.openai_client import OpenAIClient
 from src.utils.logger import setup_logger
-from src.utils.rate_limiter import limit_calls
+from src.utils.rate_limiter import RateLimiter
 from src.utils.cache import Cache
 
 # Setup
 logger = setup_logger("batch_processing")
 cache = Cache()
 
-# Rate limited function: max 3 calls per 10 seconds
-@limit_calls(max_calls=3, period=10)
-def generate_with_rate_limit(client, prompt):
-    """Generate response with rate limiting."""
-    
-    # Check cache first
-    cache_key = f"batch_{hash(prompt)}"
-    cached = cache.get(cache_key)
-    
-    if cached:
-        logger.info(f"📦 Cache hit for: {prompt[:50]}...")
-        return cached
-    
-    # Generate new response
-    logger.info(f"🔄 Generating for: {prompt[:50]}...")
-    response = client.generate(prompt, max_tokens=100)
-    
-    # Cache it
-    cache.set(cache_key, response)
-    
-    return response
+# Shared limiter: max 3 calls per 10 seconds across all batch workers
+rate_limiter = RateLimiter(max_calls=3, period=10)
 
 def main():
     logger.info("Starting rate-limited batch processing example...")
@@ -64,31 +45,27 @@ def main():
     print("="*60 + "\n")
     
     start_time = time.time()
-    results = []
     
-    for i, prompt in enumerate(prompts, 1):
-        print(f"\n[{i}/{len(prompts)}] Processing: {prompt}")
-        
-        try:
-            response = generate_with_rate_limit(client, prompt)
-            results.append({
-                "prompt": prompt,
-                "response": response,
-                "success": True
-            })
-            print(f"✅ Response: {response[:100]}...")
-            
-        except Exception as e:
-            logger.error(f"❌ Error: {e}")
-            results.append({
-                "prompt": prompt,
-                "response": None,
-                "success": False
-            })
+    # Fan out with at most 3 requests in flight; results come back in input order
+    results = client.generate_batch(
+        prompts,
+        concurrency=3,
+        rate_limiter=rate_limiter,
+        cache=cache,
+        max_tokens=100
+    )
+    
+    for result in results:
+        print(f"\n[{result.index + 1}/{len(prompts)}] {result.prompt}")
+        if result.success:
+            source = "📦 cached" if result.cached else "✅"
+            print(f"{source} Response: {result.response[:100]}...")
+        else:
+            logger.error(f"❌ Error: {result.error}")
     
     # Summary
     elapsed_time = time.time() - start_time
-    successful = sum(1 for r in results if r["success"])
+    successful = sum(1 for r in results if r.success)
     
     print("\n" + "="*60)
     print("📊 BATCH PROCESSING SUMMARY")
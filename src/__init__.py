@@ -0,0 +1,110 @@
+"""
+Public API of the toolkit.
+
+    from src import OpenAIClient, Cache, RateLimiter
+
+Names are resolved on first access, so `import src` stays cheap: a
+submodule (and any provider SDK it needs) is only imported when one of its
+names is used.
+"""
+
+import importlib
+from typing import TYPE_CHECKING, Any, Dict, List
+
+# Public name -> module that defines it.
+_EXPORTS: Dict[str, str] = {
+    # Clients
+    "BaseLLMClient": "src.llm.base",
+    "BatchResult": "src.llm.base",
+    "BatchJob": "src.llm.batch_jobs",
+    "BatchJobError": "src.llm.batch_jobs",
+    "TextStream": "src.llm.base",
+    "AsyncTextStream": "src.llm.base",
+    "OpenAIClient": "src.llm.openai_client",
+    "ClaudeClient": "src.llm.claude_client",
+    "ClientPool": "src.llm.pool",
+    "RouterClient": "src.llm.router",
+    "Conversation": "src.llm.conversation",
+    "ClientFactory": "src.llm.factory",
+    "create_client": "src.llm.factory",
+    "get_factory": "src.llm.factory",
+    "HTTPPool": "src.llm.http_pool",
+    # Resilience
+    "ErrorHandler": "src.handlers.error_handler",
+    "CircuitBreaker": "src.handlers.error_handler",
+    "CircuitOpenError": "src.handlers.error_handler",
+    "RetryBudget": "src.handlers.error_handler",
+    "get_circuit_breaker": "src.handlers.error_handler",
+    "RateLimiter": "src.utils.rate_limiter",
+    "SharedRateLimiter": "src.utils.rate_limiter",
+    "limit_calls": "src.utils.rate_limiter",
+    # Caching
+    "Cache": "src.utils.cache",
+    "MemoryCache": "src.utils.cache",
+    "TieredCache": "src.utils.cache",
+    "SimilarityCache": "src.utils.similarity_cache",
+    "SingleFlight": "src.utils.single_flight",
+    # Prompts
+    "PromptTemplate": "src.prompt_engineering.templates",
+    "TemplateRegistry": "src.prompt_engineering.templates",
+    "get_registry": "src.prompt_engineering.templates",
+    "render": "src.prompt_engineering.templates",
+    "PromptChain": "src.prompt_engineering.chain",
+    "Step": "src.prompt_engineering.chain",
+    "FewShotSelector": "src.prompt_engineering.few_shot",
+    # Utilities
+    "count_tokens": "src.utils.token_counter",
+    "get_token_counter": "src.utils.token_counter",
+    "load_config": "src.utils.config",
+    "setup_logger": "src.utils.logger",
+    "start_http_server": "src.utils.metrics",
+}
+# Public name -> (module, attribute) for names that differ from the attribute.
+_ALIASES = {
+    "metrics": ("src.utils.metrics", "registry"),
+}
+
+__all__ = sorted([*_EXPORTS, *_ALIASES])
+
+
+def __getattr__(name: str) -> Any:
+    if name in _EXPORTS:
+        module, attribute = _EXPORTS[name], name
+    elif name in _ALIASES:
+        module, attribute = _ALIASES[name]
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), attribute)
+    # Cache it so later lookups bypass __getattr__.
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(__all__))
+
+
+if TYPE_CHECKING:
+    from src.handlers.error_handler import (CircuitBreaker, CircuitOpenError, ErrorHandler, RetryBudget,
+                                            get_circuit_breaker)
+    from src.llm.base import AsyncTextStream, BaseLLMClient, BatchResult, TextStream
+    from src.llm.batch_jobs import BatchJob, BatchJobError
+    from src.llm.claude_client import ClaudeClient
+    from src.llm.conversation import Conversation
+    from src.llm.factory import ClientFactory, create_client, get_factory
+    from src.llm.http_pool import HTTPPool
+    from src.llm.openai_client import OpenAIClient
+    from src.llm.pool import ClientPool
+    from src.llm.router import RouterClient
+    from src.prompt_engineering.chain import PromptChain, Step
+    from src.prompt_engineering.few_shot import FewShotSelector
+    from src.prompt_engineering.templates import PromptTemplate, TemplateRegistry, get_registry, render
+    from src.utils.cache import Cache, MemoryCache, TieredCache
+    from src.utils.config import load_config
+    from src.utils.logger import setup_logger
+    from src.utils.metrics import registry as metrics
+    from src.utils.metrics import start_http_server
+    from src.utils.rate_limiter import RateLimiter, SharedRateLimiter, limit_calls
+    from src.utils.similarity_cache import SimilarityCache
+    from src.utils.single_flight import SingleFlight
+    from src.utils.token_counter import count_tokens, get_token_counter
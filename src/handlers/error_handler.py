@@ -1 +1,342 @@
+import asyncio
+import random
+import sys
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple, TypeVar
 
+from src.utils.logger import setup_logger
+from src.utils.metrics import LLM_RETRIES
+from src.utils.rate_limiter import parse_retry_after
+
+logger = setup_logger(__name__)
+
+T = TypeVar("T")
+
+# Statuses worth retrying: timeouts, conflicts, rate limits and server errors.
+# Other 4xx errors (bad request, auth, not found, ...) fail the same way every time.
+RETRYABLE_STATUSES = {408, 409, 429}
+CONNECTION_ERRORS = (ConnectionError, TimeoutError)
+# Provider SDKs whose APIConnectionError (which also covers their timeouts) counts as a connection error.
+SDK_MODULES = ("openai", "anthropic")
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of calling a provider whose circuit breaker is open.
+    """
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"Circuit '{name}' is open; failing fast for another {retry_after:.1f}s.")
+        self.name = name
+        self.retry_after = retry_after
+
+
+def _connection_errors() -> Tuple[type, ...]:
+    """
+    CONNECTION_ERRORS plus the APIConnectionError of every provider SDK imported so far.
+
+    The SDKs are not imported here: one that was never loaded cannot have
+    raised the error being classified.
+    """
+    errors = CONNECTION_ERRORS
+    for name in SDK_MODULES:
+        error_type = getattr(sys.modules.get(name), "APIConnectionError", None)
+        if error_type is not None:
+            errors += (error_type,)
+    return errors
+
+
+def is_retryable(error: Exception) -> bool:
+    """
+    Return True if repeating the request could succeed.
+
+    Connection errors, timeouts, 408/409/429 and 5xx responses are retryable;
+    other client errors and non-API exceptions are not.
+    """
+    if isinstance(error, _connection_errors()):
+        return True
+    status = getattr(error, "status_code", None)
+    return status is not None and (status in RETRYABLE_STATUSES or status >= 500)
+
+
+def is_provider_failure(error: Exception) -> bool:
+    """
+    Return True if the error means the provider itself is unhealthy (counts towards opening a circuit).
+
+    Rate limits and client errors show the provider is up, so they don't count.
+    """
+    if isinstance(error, _connection_errors()):
+        return True
+    status = getattr(error, "status_code", None)
+    return status is not None and (status == 408 or status >= 500)
+
+
+def error_retry_after(error: Exception) -> Optional[float]:
+    """Return the Retry-After delay carried by an API error's response, if any."""
+    return parse_retry_after(getattr(getattr(error, "response", None), "headers", None))
+
+
+class RetryBudget:
+    """
+    Caps retries at a fraction of recent requests, shared by every client using it.
+
+    Over the last `window` seconds, retries may add at most `ratio` of the
+    requests made, plus `min_per_second` so a quiet process can still
+    retry. When a provider is down, most calls then fail after one attempt
+    instead of every worker sitting in backoff loops.
+    """
+
+    def __init__(self, ratio: float = 0.2, min_per_second: float = 1.0, window: float = 10.0):
+        """
+        Args:
+            ratio (float): Allowed retries per request.
+            min_per_second (float): Retries allowed regardless of traffic.
+            window (float): Seconds of history considered.
+        """
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.window = window
+        self.requests: Deque[float] = deque()
+        self.retries: Deque[float] = deque()
+        self.lock = threading.Lock()
+
+    def _expire(self, now: float):
+        cutoff = now - self.window
+        for events in (self.requests, self.retries):
+            while events and events[0] < cutoff:
+                events.popleft()
+
+    def record_request(self):
+        """Count a first attempt."""
+        with self.lock:
+            now = time.monotonic()
+            self._expire(now)
+            self.requests.append(now)
+
+    def try_retry(self) -> bool:
+        """Spend budget on a retry; False if the budget is exhausted."""
+        with self.lock:
+            now = time.monotonic()
+            self._expire(now)
+            if len(self.retries) >= self.min_per_second * self.window + self.ratio * len(self.requests):
+                return False
+            self.retries.append(now)
+            return True
+
+
+class CircuitBreaker:
+    """
+    Per-provider circuit breaker.
+
+    Closed: calls pass through. After `failure_threshold` consecutive
+    provider failures it opens and calls fail immediately with
+    CircuitOpenError. After `recovery_time` it turns half-open and lets
+    `half_open_calls` probe requests through. A successful probe closes it;
+    a failed one opens it again.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_time: float = 30.0,
+                 half_open_calls: int = 1):
+        """
+        Args:
+            name (str): Name used in logs and errors.
+            failure_threshold (int): Consecutive failures that open the circuit.
+            recovery_time (float): Seconds to stay open before probing.
+            half_open_calls (int): Probe requests allowed at once while half-open.
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self.half_open_calls = half_open_calls
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probes = 0
+        self.lock = threading.Lock()
+
+    def before_call(self):
+        """
+        Admit a call or raise CircuitOpenError.
+        """
+        with self.lock:
+            if self.state == self.CLOSED:
+                return
+            now = time.monotonic()
+            if self.state == self.OPEN:
+                remaining = self.opened_at + self.recovery_time - now
+                if remaining > 0:
+                    raise CircuitOpenError(self.name, remaining)
+                self.state = self.HALF_OPEN
+                self.probes = 0
+                logger.info(f"Circuit '{self.name}' half-open, probing.")
+            if self.probes >= self.half_open_calls:
+                raise CircuitOpenError(self.name, 0.0)
+            self.probes += 1
+
+    def on_success(self):
+        """Record a call that reached a healthy provider."""
+        with self.lock:
+            self.failures = 0
+            if self.state != self.CLOSED:
+                logger.info(f"Circuit '{self.name}' closed.")
+                self.state = self.CLOSED
+
+    def on_failure(self):
+        """Record a provider failure."""
+        with self.lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or (self.state == self.CLOSED and self.failures >= self.failure_threshold):
+                logger.warning(f"Circuit '{self.name}' opened after {self.failures} consecutive failures.")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def release(self):
+        """Free the probe slot of a call that ended without telling anything about the provider."""
+        with self.lock:
+            if self.state == self.HALF_OPEN and self.probes > 0:
+                self.probes -= 1
+
+    def record(self, error: Optional[Exception]):
+        """Record the outcome of an admitted call."""
+        if error is None or (getattr(error, "status_code", None) is not None and not is_provider_failure(error)):
+            # Success, or an API error response such as a 429 or 400: the provider is up.
+            self.on_success()
+        elif is_provider_failure(error):
+            self.on_failure()
+        else:
+            self.release()
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breaker_lock = threading.Lock()
+default_retry_budget = RetryBudget()
+
+
+def get_circuit_breaker(name: str, **kwargs) -> CircuitBreaker:
+    """
+    Return the shared circuit breaker for a provider endpoint, creating it on first use.
+
+    Args:
+        name (str): Breaker name, e.g. "openai" or "openai:http://localhost:8000/v1".
+        **kwargs: CircuitBreaker options, used only when the breaker is created.
+    """
+    with _breaker_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(name, **kwargs)
+        return breaker
+
+
+class ErrorHandler:
+    """
+    Runs single-attempt calls with classification, backoff, a retry budget and a circuit breaker.
+
+    Non-retryable errors are raised at once. Retryable ones are retried up
+    to `max_attempts` in total, waiting for the server's Retry-After when it
+    sends one and otherwise for a random delay of up to
+    `base_delay * 2 ** attempt` (full jitter, capped at `max_delay`). A
+    Retry-After longer than `max_retry_after` is raised instead of waited
+    out. Every retry must also be allowed by the shared RetryBudget.
+    """
+
+    def __init__(self, breaker: Optional[CircuitBreaker] = None, budget: Optional[RetryBudget] = None,
+                 max_attempts: int = 3, base_delay: float = 0.5, max_delay: float = 10.0,
+                 max_retry_after: float = 60.0):
+        """
+        Args:
+            breaker (CircuitBreaker, optional): Breaker guarding the provider.
+            budget (RetryBudget, optional): Retry budget; the process-wide default if omitted.
+            max_attempts (int): Attempts per call, including the first.
+            base_delay (float): Backoff scale in seconds.
+            max_delay (float): Longest backoff between attempts.
+            max_retry_after (float): Longest server-requested delay to wait for.
+        """
+        self.breaker = breaker
+        self.name = breaker.name if breaker is not None else "default"
+        self.budget = budget or default_retry_budget
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+
+    def _before_attempt(self, attempt: int):
+        if self.breaker is not None:
+            self.breaker.before_call()
+        if attempt == 0:
+            self.budget.record_request()
+
+    def _after_attempt(self, error: Optional[Exception]):
+        if self.breaker is not None:
+            self.breaker.record(error)
+
+    def _retry_delay(self, error: Exception, attempt: int, attempts: int) -> Optional[float]:
+        """Return how long to wait before the next attempt, or None to give up."""
+        if attempt + 1 >= attempts or not is_retryable(error):
+            return None
+        retry_after = error_retry_after(error)
+        if retry_after is not None and retry_after > self.max_retry_after:
+            return None
+        if not self.budget.try_retry():
+            logger.warning(f"Retry budget exhausted, not retrying: {error}")
+            return None
+        if retry_after is not None:
+            return retry_after
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def call(self, func: Callable[..., T], *args: Any, retry: bool = True, **kwargs: Any) -> T:
+        """
+        Call `func(*args, **kwargs)`, retrying transient errors.
+
+        Args:
+            func (Callable): One attempt of the operation.
+            retry (bool): False for a single attempt (still guarded by the breaker).
+
+        Returns:
+            The result of the first successful attempt.
+        """
+        attempts = self.max_attempts if retry else 1
+        for attempt in range(attempts):
+            self._before_attempt(attempt)
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                self._after_attempt(e)
+                delay = self._retry_delay(e, attempt, attempts)
+                if delay is None:
+                    raise
+                logger.info(f"Retrying in {delay:.2f}s (attempt {attempt + 2}/{attempts}) after: {e}")
+                LLM_RETRIES.inc(self.name)
+                time.sleep(delay)
+                continue
+            self._after_attempt(None)
+            return result
+
+    async def acall(self, func: Callable[..., Awaitable[T]], *args: Any, retry: bool = True, **kwargs: Any) -> T:
+        """
+        Async counterpart of call(); backoff uses asyncio.sleep.
+        """
+        attempts = self.max_attempts if retry else 1
+        for attempt in range(attempts):
+            self._before_attempt(attempt)
+            try:
+                result = await func(*args, **kwargs)
+            except asyncio.CancelledError:
+                # A cancelled call (e.g. a hedge that lost) says nothing about the provider.
+                if self.breaker is not None:
+                    self.breaker.release()
+                raise
+            except Exception as e:
+                self._after_attempt(e)
+                delay = self._retry_delay(e, attempt, attempts)
+                if delay is None:
+                    raise
+                logger.info(f"Retrying in {delay:.2f}s (attempt {attempt + 2}/{attempts}) after: {e}")
+                LLM_RETRIES.inc(self.name)
+                await asyncio.sleep(delay)
+                continue
+            self._after_attempt(None)
+            return result
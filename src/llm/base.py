@@ -1,12 +1,253 @@
+import asyncio
+import threading
+import time
+import weakref
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, Optional, Union
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, Union
+
+from src.handlers.error_handler import ErrorHandler
+from src.llm.http_pool import HTTPPool, close_now, close_with_loop
+from src.llm.utils import request_cache_key
+from src.utils.cache import Cache
+from src.utils.metrics import LLM_LATENCY, LLM_REQUESTS, LLM_TIME_TO_FIRST_TOKEN, LLM_TOKENS
+from src.utils.rate_limiter import RateLimiter, parse_rate_limit_headers, parse_retry_after
+from src.utils.single_flight import SingleFlight
+from src.utils.token_counter import HeuristicTokenCounter, TokenCounter, get_token_counter
+
+# Guards lazy creation of the sync SDK client (see BaseLLMClient.client).
+_client_lock = threading.Lock()
+
+
+@dataclass
+class BatchResult:
+    """
+    Outcome of a single prompt within a batch.
+    """
+    index: int
+    prompt: str
+    response: Optional[str] = None
+    error: Optional[Exception] = None
+    cached: bool = False
+
+    @property
+    def success(self) -> bool:
+        return self.error is None
+
+
+class TextStream:
+    """
+    Iterator over the text deltas of a streamed completion.
+
+    Once the stream is exhausted, `text`, `usage` and `stop_reason` describe
+    the complete response. The request is sent once: iterating a finished
+    stream again replays `text` as a single delta, and iterating it again
+    before it has finished raises RuntimeError.
+    """
+
+    def __init__(self, source: Callable[["TextStream"], Iterator[str]],
+                 on_complete: Optional[Callable[[str], None]] = None):
+        """
+        Args:
+            source (Callable): Generator function yielding text deltas. It receives
+                the stream so it can record `usage` and `stop_reason` as they arrive.
+            on_complete (Callable, optional): Called with the full text once the
+                stream finishes successfully.
+        """
+        self.text: Optional[str] = None
+        self.usage: Optional[Dict[str, int]] = None
+        self.stop_reason: Optional[str] = None
+        self.cached = False
+        self._source = source
+        self._on_complete = on_complete
+        self._started = False
+
+    @property
+    def done(self) -> bool:
+        return self.text is not None
+
+    def __iter__(self) -> Iterator[str]:
+        if self.done:
+            if self.text:
+                yield self.text
+            return
+        if self._started:
+            raise RuntimeError("This stream is already being iterated (or failed); request a new stream.")
+        self._started = True
+        parts = []
+        for delta in self._source(self):
+            parts.append(delta)
+            yield delta
+        self.text = "".join(parts)
+        if self._on_complete:
+            self._on_complete(self.text)
+
+
+class AsyncTextStream:
+    """
+    Async iterator over the text deltas of a streamed completion.
+
+    Once the stream is exhausted, `text`, `usage` and `stop_reason` describe
+    the complete response. Like TextStream, it sends its request once.
+    """
+
+    def __init__(self, source: Callable[["AsyncTextStream"], AsyncIterator[str]],
+                 on_complete: Optional[Callable[[str], None]] = None):
+        self.text: Optional[str] = None
+        self.usage: Optional[Dict[str, int]] = None
+        self.stop_reason: Optional[str] = None
+        self.cached = False
+        self._source = source
+        self._on_complete = on_complete
+        self._started = False
+
+    @property
+    def done(self) -> bool:
+        return self.text is not None
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        if self.done:
+            if self.text:
+                yield self.text
+            return
+        if self._started:
+            raise RuntimeError("This stream is already being iterated (or failed); request a new stream.")
+        self._started = True
+        parts = []
+        async for delta in self._source(self):
+            parts.append(delta)
+            yield delta
+        self.text = "".join(parts)
+        if self._on_complete:
+            self._on_complete(self.text)
+
 
 class BaseLLMClient(ABC):
     """
     Abstract base class for LLM clients to ensure a consistent interface
     across different providers (OpenAI, Anthropic, etc.).
+
+    Clients may be given a `cache`. Requests are then cached under a stable
+    hash of the provider, its endpoint and the full request, so hits survive
+    restarts and are shared between processes. Only deterministic requests (temperature 0)
+    are cached unless `force_cache` is set on the client or per call; pass
+    `use_cache=False` to bypass the cache for a single call.
+
+    Clients with a `single_flight` coalesce identical concurrent requests into
+    one upstream call whose result is shared by all callers. Like caching,
+    this only applies to deterministic requests unless `force_cache` is set;
+    pass `coalesce=True` or `coalesce=False` to decide for a single call.
+
+    Clients with a `rate_limiter` acquire it before every upstream call,
+    reserving the estimated token cost, and report back the actual usage,
+    rate-limit headers and any 429 responses so an adaptive limiter can
+    tune itself.
     """
 
+    provider: str = "base"
+    cache: Optional[Cache] = None
+    force_cache: bool = False
+    single_flight: Optional[SingleFlight] = None
+    rate_limiter: Optional[RateLimiter] = None
+    error_handler: Optional[ErrorHandler] = None
+    http_pool: Optional[HTTPPool] = None
+    # Latest provider rate-limit state, as parsed by parse_rate_limit_headers();
+    # set per instance by the provider clients.
+    rate_limits: Dict[str, Dict[str, float]]
+
+    @property
+    def client(self) -> Any:
+        """
+        The provider's SDK client, created on first use.
+
+        The SDK itself is only imported then, so importing the package and
+        constructing clients stays cheap for code that never sends a request.
+        """
+        client = self.__dict__.get("_client")
+        if client is None:
+            with _client_lock:
+                client = self.__dict__.get("_client")
+                if client is None:
+                    client = self.__dict__["_client"] = self._create_client()
+        return client
+
+    @client.setter
+    def client(self, client: Any):
+        self.__dict__["_client"] = client
+
+    def _create_client(self) -> Any:
+        """Create the provider's SDK client."""
+        raise NotImplementedError
+
+    @property
+    def async_client(self) -> Any:
+        """
+        The provider's async SDK client for the running event loop.
+
+        All coroutines on a loop share one client and its keep-alive
+        connection pool. Pooled connections cannot be reused across event
+        loops, and asyncio.run() starts a new loop each time, so each loop
+        gets its own client. A client is closed when its loop shuts down, or
+        by aclose() or close(); clients on an `http_pool` leave that to the pool.
+        """
+        loop = asyncio.get_running_loop()
+        clients = self.__dict__.setdefault("_async_clients", weakref.WeakKeyDictionary())
+        entry = clients.get(loop)
+        if entry is None:
+            client = self._create_async_client()
+            closer = None if self.http_pool else close_with_loop(lambda: self._aclose_client(loop, client))
+            entry = clients[loop] = (client, closer)
+        return entry[0]
+
+    async def _aclose_client(self, loop: asyncio.AbstractEventLoop, client: Any):
+        clients = self.__dict__.get("_async_clients", {})
+        entry = clients.get(loop)
+        if entry is None or entry[0] is not client:
+            return
+        del clients[loop]
+        if not self.http_pool:
+            await client.close()
+
+    def _close_async_clients(self):
+        """Close the async clients still open on other event loops."""
+        clients = self.__dict__.get("_async_clients", {})
+        for loop, (_, closer) in list(clients.items()):
+            if closer is not None and not loop.is_closed():
+                # The closer drops the entry once the client is closed.
+                close_now(loop, closer)
+            else:
+                clients.pop(loop, None)
+
+    async def aclose(self):
+        """Close the async clients, awaiting the one of the running event loop."""
+        loop = asyncio.get_running_loop()
+        entry = self.__dict__.get("_async_clients", {}).get(loop)
+        if entry is not None:
+            client, closer = entry
+            await self._aclose_client(loop, client)
+            if closer is not None:
+                closer.cancel()
+        self._close_async_clients()
+
+    def close(self):
+        """
+        Close the sync client and the async clients, if any were created.
+
+        An async client whose event loop is running closes on that loop
+        shortly after this returns. Clients on an `http_pool` only drop their
+        SDK clients; the pool's connections stay open for the other clients
+        sharing it.
+        """
+        client = self.__dict__.pop("_client", None)
+        if client is not None and not self.http_pool:
+            client.close()
+        self._close_async_clients()
+
+    def _create_async_client(self) -> Any:
+        """Create the provider's async SDK client."""
+        raise NotImplementedError
+
     @abstractmethod
     def generate(self, prompt: str, **kwargs) -> str:
         """
@@ -47,3 +288,406 @@ class BaseLLMClient(ABC):
             int: The number of tokens.
         """
         pass
+
+    def _build_request(self, prompt: str, **kwargs) -> Dict[str, Any]:
+        """
+        Build the parameters that identify a request. Providers override this
+        to return their native API parameters.
+        """
+        params = {k: v for k, v in kwargs.items() if k not in ("use_cache", "force_cache", "coalesce", "retry")}
+        return {"model": getattr(self, "model", None), "prompt": prompt, **params}
+
+    def _cache_key(self, request: Dict[str, Any]) -> str:
+        """Build the cache key for a request built by _build_request."""
+        return request_cache_key(self.provider, request, getattr(self, "base_url", None))
+
+    def _request_cache(self, request: Dict[str, Any], kwargs: Dict[str, Any],
+                       cache: Optional[Cache] = None) -> Optional[Cache]:
+        """
+        Return the cache to use for a request, or None if it should not be cached.
+
+        An explicitly passed `cache` is always used. The client's own cache is
+        only used for deterministic requests unless caching is forced.
+        """
+        if not kwargs.get("use_cache", True):
+            return None
+        if cache is not None:
+            return cache
+        if self.cache is None:
+            return None
+        if kwargs.get("force_cache", self.force_cache) or not request.get("temperature"):
+            return self.cache
+        return None
+
+    def _coalesce(self, request: Dict[str, Any], kwargs: Dict[str, Any]) -> bool:
+        """
+        Whether a request may share an identical in-flight request's upstream call.
+
+        Sampled requests (temperature > 0) each get their own sample unless
+        caching is forced or the call asks for `coalesce=True`.
+        """
+        if self.single_flight is None:
+            return False
+        if "coalesce" in kwargs:
+            return bool(kwargs["coalesce"])
+        return bool(kwargs.get("force_cache", self.force_cache) or not request.get("temperature"))
+
+    def _token_counter(self, request: Dict[str, Any]) -> TokenCounter:
+        """Return the shared token counter for the request's model."""
+        return get_token_counter(request.get("model") or getattr(self, "model", None) or "")
+
+    @staticmethod
+    def _prompt_messages(request: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Return a request's messages, with any system prompt or bare prompt as messages."""
+        messages = list(request.get("messages", []))
+        if request.get("system"):
+            messages.insert(0, {"role": "system", "content": request["system"]})
+        if request.get("prompt"):
+            messages.append({"role": "user", "content": request["prompt"]})
+        return messages
+
+    def _estimate_tokens(self, request: Dict[str, Any]) -> int:
+        """Estimate the tokens a request may use: its prompt plus max_tokens."""
+        prompt_tokens = self._token_counter(request).count_messages(self._prompt_messages(request))
+        return prompt_tokens + request.get("max_tokens", 0)
+
+    def _acquire(self, request: Dict[str, Any]) -> int:
+        """Wait for the rate limiter; return the token estimate that was reserved."""
+        if self.rate_limiter is None:
+            return 0
+        estimate = self._estimate_tokens(request) if self.rate_limiter.tokens_per_minute else 0
+        self.rate_limiter.acquire(estimate)
+        return estimate
+
+    async def _acquire_async(self, request: Dict[str, Any]) -> int:
+        """Async counterpart of _acquire."""
+        if self.rate_limiter is None:
+            return 0
+        estimate = self._estimate_tokens(request) if self.rate_limiter.tokens_per_minute else 0
+        await self.rate_limiter.acquire_async(estimate)
+        return estimate
+
+    def _settle(self, estimate: int, usage: Optional[Dict[str, int]], headers: Optional[Any] = None,
+                request: Optional[Dict[str, Any]] = None):
+        """
+        Feed a completed call back: calibrate estimated token counts with the
+        actual usage, correct the rate limiter's token estimate and pass on
+        the provider's rate-limit headers.
+        """
+        if usage:
+            model = request.get("model", self.model) if request is not None else self.model
+            LLM_TOKENS.inc(self.provider, model, "input", amount=usage["input_tokens"])
+            LLM_TOKENS.inc(self.provider, model, "output", amount=usage["output_tokens"])
+        if usage and request is not None:
+            counter = self._token_counter(request)
+            if isinstance(counter, HeuristicTokenCounter):
+                counter.calibrate(self._prompt_messages(request), usage["input_tokens"])
+        limits = parse_rate_limit_headers(headers) if headers is not None else None
+        if limits:
+            self.rate_limits = limits
+        if self.rate_limiter is None:
+            return
+        if estimate and usage:
+            self.rate_limiter.reconcile(estimate, usage["input_tokens"] + usage["output_tokens"])
+        if limits is not None:
+            self.rate_limiter.update_from_limits(limits)
+
+    @staticmethod
+    def _response_headers(response: Any) -> Optional[Any]:
+        """Return the HTTP headers behind an SDK stream, if available."""
+        return getattr(getattr(response, "response", None), "headers", None)
+
+    def _record_error(self, error: Exception):
+        """Tell the rate limiter about a 429, including any Retry-After it carried."""
+        if self.rate_limiter is not None and getattr(error, "status_code", None) == 429:
+            response = getattr(error, "response", None)
+            self.rate_limiter.on_rate_limited(parse_retry_after(getattr(response, "headers", None)))
+
+    def _with_retries(self, attempt: Callable[[Dict[str, Any]], Any], kwargs: Dict[str, Any]) -> Callable:
+        """
+        Wrap a single-attempt upstream call with the client's error handler.
+
+        `retry=False` in kwargs limits it to one attempt, still guarded by the
+        circuit breaker (used by callers that fail over instead, see RouterClient).
+        """
+        if self.error_handler is None:
+            return attempt
+        retry = kwargs.get("retry", True)
+        return lambda request: self.error_handler.call(attempt, request, retry=retry)
+
+    def _awith_retries(self, attempt: Callable[[Dict[str, Any]], Awaitable[Any]],
+                       kwargs: Dict[str, Any]) -> Callable:
+        """Async counterpart of _with_retries."""
+        if self.error_handler is None:
+            return attempt
+        retry = kwargs.get("retry", True)
+        return lambda request: self.error_handler.acall(attempt, request, retry=retry)
+
+    def _generate_with_cache(self, request: Dict[str, Any], kwargs: Dict[str, Any],
+                             complete: Callable[[Dict[str, Any]], str]) -> str:
+        """
+        Serve a request from the cache, or complete it upstream (coalesced with
+        identical in-flight requests if it is deterministic) and cache the result.
+        """
+        cache = self._request_cache(request, kwargs)
+        key = self._cache_key(request) if cache is not None else None
+        model = request.get("model", self.model)
+        if key is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                LLM_REQUESTS.inc(self.provider, model, "cached")
+                return cached
+        started = time.perf_counter()
+        try:
+            if self._coalesce(request, kwargs):
+                text = self.single_flight.do(key or self._cache_key(request), lambda: complete(request))
+            else:
+                text = complete(request)
+        except Exception:
+            LLM_REQUESTS.inc(self.provider, model, "error")
+            raise
+        LLM_LATENCY.observe(time.perf_counter() - started, self.provider, model)
+        LLM_REQUESTS.inc(self.provider, model, "ok")
+        if key is not None:
+            cache.set(key, text)
+        return text
+
+    async def _agenerate_with_cache(self, request: Dict[str, Any], kwargs: Dict[str, Any],
+                                    complete: Callable[[Dict[str, Any]], Awaitable[str]]) -> str:
+        """Async counterpart of _generate_with_cache."""
+        cache = self._request_cache(request, kwargs)
+        key = self._cache_key(request) if cache is not None else None
+        model = request.get("model", self.model)
+        if key is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                LLM_REQUESTS.inc(self.provider, model, "cached")
+                return cached
+        started = time.perf_counter()
+        try:
+            if self._coalesce(request, kwargs):
+                text = await self.single_flight.do_async(key or self._cache_key(request), lambda: complete(request))
+            else:
+                text = await complete(request)
+        except Exception:
+            LLM_REQUESTS.inc(self.provider, model, "error")
+            raise
+        LLM_LATENCY.observe(time.perf_counter() - started, self.provider, model)
+        LLM_REQUESTS.inc(self.provider, model, "ok")
+        if key is not None:
+            cache.set(key, text)
+        return text
+
+    def _stream_from_cache(self, stream_cls, cache: Optional[Cache], key: Optional[str]):
+        """Return a one-chunk stream for a cached response, or None on a miss."""
+        if key is None:
+            return None
+        cached = cache.get(key)
+        if cached is None:
+            return None
+        if stream_cls is TextStream:
+            def source(stream):
+                yield cached
+        else:
+            async def source(stream):
+                yield cached
+        stream = stream_cls(source)
+        stream.cached = True
+        return stream
+
+    def _timed_stream(self, request: Dict[str, Any],
+                      source: Callable[[TextStream], Iterator[str]]) -> Callable[[TextStream], Iterator[str]]:
+        """Wrap a stream source to record time to first token, total latency and the outcome."""
+        model = request.get("model", self.model)
+
+        def timed(stream: TextStream) -> Iterator[str]:
+            started = time.perf_counter()
+            first = True
+            try:
+                for delta in source(stream):
+                    if first:
+                        LLM_TIME_TO_FIRST_TOKEN.observe(time.perf_counter() - started, self.provider, model)
+                        first = False
+                    yield delta
+            except Exception:
+                LLM_REQUESTS.inc(self.provider, model, "error")
+                raise
+            LLM_LATENCY.observe(time.perf_counter() - started, self.provider, model)
+            LLM_REQUESTS.inc(self.provider, model, "ok")
+        return timed
+
+    def _atimed_stream(self, request: Dict[str, Any], source: Callable[[AsyncTextStream], AsyncIterator[str]]
+                       ) -> Callable[[AsyncTextStream], AsyncIterator[str]]:
+        """Async counterpart of _timed_stream."""
+        model = request.get("model", self.model)
+
+        async def timed(stream: AsyncTextStream) -> AsyncIterator[str]:
+            started = time.perf_counter()
+            first = True
+            try:
+                async for delta in source(stream):
+                    if first:
+                        LLM_TIME_TO_FIRST_TOKEN.observe(time.perf_counter() - started, self.provider, model)
+                        first = False
+                    yield delta
+            except Exception:
+                LLM_REQUESTS.inc(self.provider, model, "error")
+                raise
+            LLM_LATENCY.observe(time.perf_counter() - started, self.provider, model)
+            LLM_REQUESTS.inc(self.provider, model, "ok")
+        return timed
+
+    def _iter_stream(self, prompt: str, stream: TextStream, **kwargs) -> Iterator[str]:
+        """
+        Yield text deltas for a prompt. Providers override this with native
+        streaming; the default yields the full generate() result as one chunk.
+        """
+        yield self.generate(prompt, **dict(kwargs, use_cache=False))
+
+    async def _aiter_stream(self, prompt: str, stream: AsyncTextStream, **kwargs) -> AsyncIterator[str]:
+        """
+        Asynchronously yield text deltas for a prompt. Providers override this
+        with native streaming; the default yields the generate_async() result.
+        """
+        yield await self.generate_async(prompt, **dict(kwargs, use_cache=False))
+
+    def generate_stream(self, prompt: str, cache: Optional[Cache] = None, **kwargs) -> TextStream:
+        """
+        Stream a response for a given prompt as text deltas.
+
+        Args:
+            prompt (str): The input prompt.
+            cache (Cache, optional): Cache to serve from, and to fill once the stream
+                completes. Defaults to the client's cache, subject to its caching policy.
+            **kwargs: Additional model-specific parameters.
+
+        Returns:
+            TextStream: Iterable of text deltas; `usage` and `stop_reason` are set when it ends.
+        """
+        request = self._build_request(prompt, **kwargs)
+        cache = self._request_cache(request, kwargs, cache)
+        key = self._cache_key(request) if cache is not None else None
+        cached = self._stream_from_cache(TextStream, cache, key)
+        if cached is not None:
+            LLM_REQUESTS.inc(self.provider, request.get("model", self.model), "cached")
+            return cached
+        return TextStream(
+            self._timed_stream(request, lambda stream: self._iter_stream(prompt, stream, **kwargs)),
+            on_complete=(lambda text: cache.set(key, text)) if cache is not None else None,
+        )
+
+    def agenerate_stream(self, prompt: str, cache: Optional[Cache] = None, **kwargs) -> AsyncTextStream:
+        """
+        Asynchronously stream a response for a given prompt as text deltas.
+
+        Args:
+            prompt (str): The input prompt.
+            cache (Cache, optional): Cache to serve from, and to fill once the stream
+                completes. Defaults to the client's cache, subject to its caching policy.
+            **kwargs: Additional model-specific parameters.
+
+        Returns:
+            AsyncTextStream: Async iterable of text deltas; `usage` and `stop_reason` are set when it ends.
+        """
+        request = self._build_request(prompt, **kwargs)
+        cache = self._request_cache(request, kwargs, cache)
+        key = self._cache_key(request) if cache is not None else None
+        cached = self._stream_from_cache(AsyncTextStream, cache, key)
+        if cached is not None:
+            LLM_REQUESTS.inc(self.provider, request.get("model", self.model), "cached")
+            return cached
+        return AsyncTextStream(
+            self._atimed_stream(request, lambda stream: self._aiter_stream(prompt, stream, **kwargs)),
+            on_complete=(lambda text: cache.set(key, text)) if cache is not None else None,
+        )
+
+    def generate_batch(
+        self,
+        prompts: List[str],
+        concurrency: int = 8,
+        rate_limiter: Optional[RateLimiter] = None,
+        cache: Optional[Cache] = None,
+        **kwargs
+    ) -> List[BatchResult]:
+        """
+        Generate responses for many prompts using a bounded thread pool.
+
+        Args:
+            prompts (List[str]): The input prompts.
+            concurrency (int): Maximum number of requests in flight at once.
+            rate_limiter (RateLimiter, optional): Limiter acquired before each upstream call.
+            cache (Cache, optional): Cache consulted before, and filled after, each call.
+                Defaults to the client's cache, subject to its caching policy.
+            **kwargs: Additional model-specific parameters passed to generate().
+
+        Returns:
+            List[BatchResult]: One result per prompt, in input order.
+        """
+        def run(index: int, prompt: str) -> BatchResult:
+            try:
+                request = self._build_request(prompt, **kwargs)
+                active_cache = self._request_cache(request, kwargs, cache)
+                key = self._cache_key(request) if active_cache is not None else None
+                if key is not None:
+                    cached = active_cache.get(key)
+                    if cached is not None:
+                        return BatchResult(index, prompt, response=cached, cached=True)
+                if rate_limiter:
+                    rate_limiter.acquire()
+                response = self.generate(prompt, **dict(kwargs, use_cache=False))
+                if key is not None:
+                    active_cache.set(key, response)
+                return BatchResult(index, prompt, response=response)
+            except Exception as e:
+                return BatchResult(index, prompt, error=e)
+
+        if not prompts:
+            return []
+        with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(prompts)))) as executor:
+            return list(executor.map(run, range(len(prompts)), prompts))
+
+    async def generate_batch_async(
+        self,
+        prompts: List[str],
+        concurrency: int = 8,
+        rate_limiter: Optional[RateLimiter] = None,
+        cache: Optional[Cache] = None,
+        **kwargs
+    ) -> List[BatchResult]:
+        """
+        Asynchronously generate responses for many prompts with at most
+        `concurrency` requests in flight.
+
+        Args:
+            prompts (List[str]): The input prompts.
+            concurrency (int): Maximum number of requests in flight at once.
+            rate_limiter (RateLimiter, optional): Limiter acquired before each upstream call.
+            cache (Cache, optional): Cache consulted before, and filled after, each call.
+                Defaults to the client's cache, subject to its caching policy.
+            **kwargs: Additional model-specific parameters passed to generate_async().
+
+        Returns:
+            List[BatchResult]: One result per prompt, in input order.
+        """
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def run(index: int, prompt: str) -> BatchResult:
+            async with semaphore:
+                try:
+                    request = self._build_request(prompt, **kwargs)
+                    active_cache = self._request_cache(request, kwargs, cache)
+                    key = self._cache_key(request) if active_cache is not None else None
+                    if key is not None:
+                        cached = active_cache.get(key)
+                        if cached is not None:
+                            return BatchResult(index, prompt, response=cached, cached=True)
+                    if rate_limiter:
+                        await rate_limiter.acquire_async()
+                    response = await self.generate_async(prompt, **dict(kwargs, use_cache=False))
+                    if key is not None:
+                        active_cache.set(key, response)
+                    return BatchResult(index, prompt, response=response)
+                except Exception as e:
+                    return BatchResult(index, prompt, error=e)
+
+        return list(await asyncio.gather(*(run(i, p) for i, p in enumerate(prompts))))
@@ -0,0 +1,433 @@
+import json
+import os
+import random
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from src.handlers.error_handler import is_retryable
+from src.llm.base import BaseLLMClient, BatchResult
+from src.llm.claude_client import ClaudeClient
+from src.llm.openai_client import OpenAIClient
+from src.llm.utils import stable_hash
+from src.utils.logger import setup_logger
+from src.utils.metrics import LLM_TOKENS
+
+logger = setup_logger(__name__)
+
+MANIFEST_NAME = "job.json"
+
+
+class BatchJobError(Exception):
+    """
+    A batch, or a single request within it, failed at the provider.
+    """
+
+
+class OpenAIBatchAPI:
+    """
+    OpenAI Batch API: the JSONL input is uploaded as a file, and results are
+    read back from the batch's output and error files.
+    """
+
+    endpoint = "/v1/chat/completions"
+    max_requests = 50_000
+    max_bytes = 200 * 1024 * 1024
+    # Batches carry our metadata, so a submit that may have reached the server can be found again.
+    can_find = True
+    terminal_statuses = {"completed", "failed", "expired", "cancelled"}
+
+    def line(self, custom_id: str, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Wrap a chat completion request as one line of a batch input file."""
+        return {"custom_id": custom_id, "method": "POST", "url": self.endpoint, "body": request}
+
+    def submit(self, sdk: Any, payload: bytes, metadata: Dict[str, str]) -> str:
+        """Upload the JSONL payload and create a batch from it; returns the batch id."""
+        upload = sdk.files.create(file=(f"{metadata['batch_job']}-{metadata['chunk']}.jsonl", payload),
+                                  purpose="batch")
+        batch = sdk.batches.create(input_file_id=upload.id, endpoint=self.endpoint, completion_window="24h",
+                                   metadata=metadata)
+        return batch.id
+
+    def find(self, sdk: Any, metadata: Dict[str, str]) -> Optional[str]:
+        """Return a live batch created earlier with this metadata (a submit cut short by a crash)."""
+        # Iterating the page follows the cursor through every page, newest batches first.
+        for batch in sdk.batches.list(limit=100):
+            if (batch.metadata or {}) == metadata and batch.status not in ("failed", "cancelling", "cancelled"):
+                return batch.id
+        return None
+
+    def status(self, sdk: Any, batch_id: str) -> Tuple[bool, Optional[str], Dict[str, int]]:
+        """Return (ended, batch-level error, request counts)."""
+        batch = sdk.batches.retrieve(batch_id)
+        counts = batch.request_counts.model_dump() if batch.request_counts else {}
+        if batch.status not in self.terminal_statuses:
+            return False, None, counts
+        if batch.status == "failed":
+            errors = [e.message or e.code or "" for e in (batch.errors.data or [])] if batch.errors else []
+            return True, "Batch failed: " + ("; ".join(errors) or "no details"), counts
+        if batch.status != "completed":
+            return True, f"Batch {batch.status} before this request was processed.", counts
+        return True, None, counts
+
+    def results(self, sdk: Any, batch_id: str) -> Iterator[Dict[str, Any]]:
+        """Yield normalized results from the output and error files (in any order)."""
+        batch = sdk.batches.retrieve(batch_id)
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            with sdk.files.with_streaming_response.content(file_id) as response:
+                for line in response.iter_lines():
+                    if line.strip():
+                        yield self._entry(json.loads(line))
+
+    @staticmethod
+    def _entry(line: Dict[str, Any]) -> Dict[str, Any]:
+        response = line.get("response") or {}
+        body = response.get("body") or {}
+        if response.get("status_code") == 200:
+            usage = body.get("usage") or {}
+            return {
+                "custom_id": line["custom_id"],
+                "response": body["choices"][0]["message"]["content"],
+                "error": None,
+                "usage": {"input_tokens": usage.get("prompt_tokens", 0),
+                          "output_tokens": usage.get("completion_tokens", 0)},
+            }
+        error = line.get("error") or body.get("error") or {}
+        message = error.get("message") if isinstance(error, dict) else error
+        return {"custom_id": line["custom_id"], "response": None, "usage": None,
+                "error": f"{response.get('status_code', 'error')}: {message or 'request failed'}"}
+
+    def cancel(self, sdk: Any, batch_id: str):
+        sdk.batches.cancel(batch_id)
+
+
+class AnthropicBatchAPI:
+    """
+    Anthropic Message Batches: requests are sent in the create call, and the
+    results are streamed back as JSONL once the batch has ended.
+    """
+
+    max_requests = 100_000
+    max_bytes = 256 * 1024 * 1024
+    can_find = False
+
+    def line(self, custom_id: str, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Wrap a Messages API request as one batch request."""
+        return {"custom_id": custom_id, "params": request}
+
+    def submit(self, sdk: Any, payload: bytes, metadata: Dict[str, str]) -> str:
+        """Create a message batch from the JSONL payload; returns the batch id."""
+        requests = [json.loads(line) for line in payload.splitlines() if line.strip()]
+        return sdk.messages.batches.create(requests=requests).id
+
+    def find(self, sdk: Any, metadata: Dict[str, str]) -> Optional[str]:
+        """Message batches carry no metadata, so an interrupted submit cannot be matched."""
+        return None
+
+    def status(self, sdk: Any, batch_id: str) -> Tuple[bool, Optional[str], Dict[str, int]]:
+        """Return (ended, batch-level error, request counts)."""
+        batch = sdk.messages.batches.retrieve(batch_id)
+        return batch.processing_status == "ended", None, batch.request_counts.model_dump()
+
+    def results(self, sdk: Any, batch_id: str) -> Iterator[Dict[str, Any]]:
+        """Yield normalized results (in any order)."""
+        for item in sdk.messages.batches.results(batch_id):
+            result = item.result
+            if result.type == "succeeded":
+                message = result.message
+                yield {
+                    "custom_id": item.custom_id,
+                    "response": "".join(block.text for block in message.content if block.type == "text"),
+                    "error": None,
+                    "usage": {"input_tokens": message.usage.input_tokens,
+                              "output_tokens": message.usage.output_tokens},
+                }
+            else:
+                # errored results wrap the API error; canceled/expired ones carry nothing else.
+                detail = getattr(getattr(getattr(result, "error", None), "error", None), "message", None)
+                yield {"custom_id": item.custom_id, "response": None, "usage": None,
+                       "error": f"{result.type}: {detail}" if detail else result.type}
+
+    def cancel(self, sdk: Any, batch_id: str):
+        sdk.messages.batches.cancel(batch_id)
+
+
+BATCH_APIS = {OpenAIClient: OpenAIBatchAPI, ClaudeClient: AnthropicBatchAPI}
+
+
+class BatchJob:
+    """
+    Runs a prompt set through the provider's batch endpoint (OpenAI Batch API
+    or Anthropic Message Batches) instead of one call per prompt.
+
+    Batches cost less than regular calls and have their own, much larger rate
+    limits, but results take minutes to hours: use this for offline bulk work.
+    The requests are written as JSONL chunks under the provider's count and
+    size limits, and each chunk is submitted as one batch.
+
+    Progress is recorded in `job_dir` after every step. Running the same job
+    (same client settings and prompts) again after a crash resumes it:
+    submitted batches are polled rather than resubmitted, and downloaded
+    results are read from disk.
+    """
+
+    def __init__(self, client: BaseLLMClient, prompts: Sequence[str], job_dir: str,
+                 max_requests: Optional[int] = None, max_bytes: Optional[int] = None,
+                 poll_interval: float = 30.0, max_poll_interval: float = 300.0, **kwargs):
+        """
+        Prepare the job, or load its state if `job_dir` already holds it.
+
+        Args:
+            client (BaseLLMClient): An OpenAIClient or ClaudeClient; its SDK client and
+                error handler are used for the batch API calls.
+            prompts (Sequence[str]): Prompts to run.
+            job_dir (str): Directory for the JSONL chunks, results and job state.
+            max_requests (int, optional): Requests per batch (capped at the provider limit).
+            max_bytes (int, optional): Bytes of JSONL per batch (capped at the provider limit).
+            poll_interval (float): Seconds between status checks; grows while nothing finishes.
+            max_poll_interval (float): Upper bound for the poll interval.
+            **kwargs: Request options, as for generate() (model, max_tokens, system_prompt, ...).
+
+        Raises:
+            ValueError: If the client has no batch API, or `job_dir` holds a different job.
+        """
+        api_cls = next((api for cls, api in BATCH_APIS.items() if isinstance(client, cls)), None)
+        if api_cls is None:
+            raise ValueError(f"{type(client).__name__} has no batch API; use an OpenAIClient or ClaudeClient.")
+        self.client = client
+        self.api = api_cls()
+        self.prompts = list(prompts)
+        self.requests = [client._build_request(prompt, **kwargs) for prompt in self.prompts]
+        self.job_dir = Path(job_dir)
+        self.max_requests = min(max_requests or self.api.max_requests, self.api.max_requests)
+        self.max_bytes = min(max_bytes or self.api.max_bytes, self.api.max_bytes)
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.state = self._load_state()
+
+    @property
+    def job_id(self) -> str:
+        return self.state["job_id"]
+
+    @property
+    def chunks(self) -> List[Dict[str, Any]]:
+        return self.state["chunks"]
+
+    @staticmethod
+    def _custom_id(index: int) -> str:
+        return f"request-{index}"
+
+    def _load_state(self) -> Dict[str, Any]:
+        """Load the manifest from job_dir, or plan the chunks and write their input files."""
+        fingerprint = stable_hash({"provider": self.client.provider, "requests": self.requests})
+        manifest = self.job_dir / MANIFEST_NAME
+        if manifest.exists():
+            with open(manifest, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            if state.get("fingerprint") != fingerprint:
+                raise ValueError(f"{self.job_dir} holds a different batch job; use a new directory.")
+            done = sum(1 for chunk in state["chunks"] if chunk["status"] == "done")
+            logger.info(f"Resuming batch job {state['job_id']}: {done}/{len(state['chunks'])} chunks done.")
+            return state
+
+        self.job_dir.mkdir(parents=True, exist_ok=True)
+        state = {"job_id": f"job-{fingerprint[:12]}", "provider": self.client.provider,
+                 "fingerprint": fingerprint, "total": len(self.requests), "chunks": []}
+        chunk, f = None, None
+        try:
+            for index, request in enumerate(self.requests):
+                line = (json.dumps(self.api.line(self._custom_id(index), request), ensure_ascii=False)
+                        + "\n").encode("utf-8")
+                if len(line) > self.max_bytes:
+                    raise ValueError(f"Request {index} is {len(line)} bytes, over the batch limit of {self.max_bytes}.")
+                if chunk is None or chunk["count"] >= self.max_requests or chunk["bytes"] + len(line) > self.max_bytes:
+                    if f is not None:
+                        f.close()
+                    number = len(state["chunks"])
+                    chunk = {"number": number, "start": index, "count": 0, "bytes": 0, "status": "pending",
+                             "batch_id": None, "error": None,
+                             "input": f"chunk-{number:04d}.jsonl", "results": f"chunk-{number:04d}.results.jsonl"}
+                    state["chunks"].append(chunk)
+                    f = open(self.job_dir / chunk["input"], "wb")
+                f.write(line)
+                chunk["count"] += 1
+                chunk["bytes"] += len(line)
+        finally:
+            if f is not None:
+                f.close()
+        self.state = state
+        self._save()
+        logger.info(f"Created batch job {state['job_id']}: {len(self.requests)} requests "
+                    f"in {len(state['chunks'])} chunks.")
+        return state
+
+    def _save(self):
+        """Write the manifest atomically, so a crash never leaves a half-written file."""
+        path = self.job_dir / MANIFEST_NAME
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp, path)
+
+    def _call(self, func: Callable[..., Any], *args: Any, retry: bool = True) -> Any:
+        """Make a batch API call through the client's error handler (retries, circuit breaker)."""
+        if self.client.error_handler is None:
+            return func(*args)
+        return self.client.error_handler.call(func, *args, retry=retry)
+
+    def _submit_once(self, sdk: Any, payload: bytes, metadata: Dict[str, str]) -> str:
+        """
+        Create the batch for a chunk without ever creating it twice.
+
+        Submitting is not idempotent: a timeout may come after the server
+        accepted the batch, and a blind retry would pay for it again. So each
+        attempt is made once, and after a retryable error the batch is looked
+        up by its metadata before the next attempt. Providers whose batches
+        cannot be looked up are not retried; rerunning the job resubmits the
+        chunk.
+        """
+        handler = self.client.error_handler
+        attempts = handler.max_attempts if handler is not None and self.api.can_find else 1
+        attempt = 0
+        while True:
+            try:
+                return self._call(self.api.submit, sdk, payload, metadata, retry=False)
+            except Exception as e:
+                if attempt + 1 >= attempts or not is_retryable(e):
+                    raise
+                batch_id = self._call(self.api.find, sdk, metadata)
+                if batch_id is not None:
+                    logger.info(f"Submit of chunk {metadata['chunk']} failed ({e}) but reached the provider "
+                                f"as batch {batch_id}.")
+                    return batch_id
+                delay = random.uniform(0, min(handler.max_delay, handler.base_delay * 2 ** attempt))
+                logger.warning(f"Submit of chunk {metadata['chunk']} failed, retrying in {delay:.2f}s: {e}")
+                time.sleep(delay)
+                attempt += 1
+
+    def submit(self):
+        """Submit every chunk that has no batch yet."""
+        sdk = self.client.client
+        for chunk in self.chunks:
+            if chunk["status"] not in ("pending", "submitting"):
+                continue
+            metadata = {"batch_job": self.job_id, "chunk": str(chunk["number"])}
+            # A chunk left in "submitting" may have been created just before a crash.
+            batch_id = self._call(self.api.find, sdk, metadata) if chunk["status"] == "submitting" else None
+            if batch_id is None:
+                chunk["status"] = "submitting"
+                self._save()
+                payload = (self.job_dir / chunk["input"]).read_bytes()
+                batch_id = self._submit_once(sdk, payload, metadata)
+            chunk["batch_id"] = batch_id
+            chunk["status"] = "running"
+            self._save()
+            logger.info(f"Submitted chunk {chunk['number'] + 1}/{len(self.chunks)} "
+                        f"({chunk['count']} requests) as batch {batch_id}.")
+
+    def poll(self) -> bool:
+        """
+        Check running batches once and download the results of those that ended.
+
+        Returns:
+            bool: True when every chunk is done.
+        """
+        sdk = self.client.client
+        for chunk in self.chunks:
+            if chunk["status"] != "running":
+                continue
+            ended, error, counts = self._call(self.api.status, sdk, chunk["batch_id"])
+            if not ended:
+                logger.debug("Batch %s still running: %s", chunk["batch_id"], counts)
+                continue
+            self._download(sdk, chunk)
+            chunk["status"] = "done"
+            chunk["error"] = error
+            self._save()
+            logger.info(f"Batch {chunk['batch_id']} ended ({counts}); chunk {chunk['number'] + 1}/"
+                        f"{len(self.chunks)} done.")
+        return all(chunk["status"] == "done" for chunk in self.chunks)
+
+    def _download(self, sdk: Any, chunk: Dict[str, Any]):
+        """Stream a batch's results into the chunk's results file (replaced atomically)."""
+        path = self.job_dir / chunk["results"]
+        tmp = path.with_suffix(".tmp")
+        usage = {"input_tokens": 0, "output_tokens": 0}
+        with open(tmp, "w", encoding="utf-8") as f:
+            for entry in self.api.results(sdk, chunk["batch_id"]):
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                for kind in usage:
+                    usage[kind] += (entry["usage"] or {}).get(kind, 0)
+        os.replace(tmp, path)
+        model = self.requests[chunk["start"]].get("model", "unknown")
+        LLM_TOKENS.inc(self.client.provider, model, "input", amount=usage["input_tokens"])
+        LLM_TOKENS.inc(self.client.provider, model, "output", amount=usage["output_tokens"])
+
+    def _wait_for(self, chunk: Optional[Dict[str, Any]] = None):
+        """Poll until `chunk` (or every chunk) is done, backing off while nothing finishes."""
+        delay = self.poll_interval
+        while True:
+            remaining = sum(1 for c in self.chunks if c["status"] != "done")
+            all_done = self.poll()
+            if all_done or (chunk is not None and chunk["status"] == "done"):
+                return
+            if sum(1 for c in self.chunks if c["status"] != "done") < remaining:
+                delay = self.poll_interval
+            else:
+                delay = min(delay * 1.5, self.max_poll_interval)
+            time.sleep(delay)
+
+    def wait(self):
+        """Submit the job and block until every batch has ended and its results are downloaded."""
+        self.submit()
+        self._wait_for()
+
+    def results(self) -> Iterator[BatchResult]:
+        """
+        Submit the job and yield one BatchResult per prompt, in prompt order.
+
+        Each chunk's results are yielded as soon as it (and every chunk before
+        it) is done, while later batches are still running.
+        """
+        self.submit()
+        for chunk in self.chunks:
+            if chunk["status"] != "done":
+                self._wait_for(chunk)
+            yield from self._chunk_results(chunk)
+
+    def run(self) -> List[BatchResult]:
+        """Run the job to completion and return all results in prompt order."""
+        return list(self.results())
+
+    def _chunk_results(self, chunk: Dict[str, Any]) -> Iterator[BatchResult]:
+        entries = {}
+        with open(self.job_dir / chunk["results"], "r", encoding="utf-8") as f:
+            for line in f:
+                entry = json.loads(line)
+                entries[entry["custom_id"]] = entry
+        for index in range(chunk["start"], chunk["start"] + chunk["count"]):
+            entry = entries.get(self._custom_id(index))
+            if entry is None:
+                error = BatchJobError(chunk["error"] or "The batch returned no result for this request.")
+                yield BatchResult(index=index, prompt=self.prompts[index], error=error)
+            elif entry["error"]:
+                yield BatchResult(index=index, prompt=self.prompts[index], error=BatchJobError(entry["error"]))
+            else:
+                yield BatchResult(index=index, prompt=self.prompts[index], response=entry["response"])
+
+    def cancel(self):
+        """Ask the provider to cancel running batches; whatever was processed can still be collected."""
+        sdk = self.client.client
+        for chunk in self.chunks:
+            if chunk["status"] == "running":
+                self._call(self.api.cancel, sdk, chunk["batch_id"])
+                logger.info(f"Cancelling batch {chunk['batch_id']}.")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return chunk counts by status and the number of requests."""
+        statuses: Dict[str, int] = {}
+        for chunk in self.chunks:
+            statuses[chunk["status"]] = statuses.get(chunk["status"], 0) + 1
+        return {"job_id": self.job_id, "requests": self.state["total"], "chunks": len(self.chunks), **statuses}
@@ -1,10 +1,17 @@
 import os
-from typing import Any, Dict, Optional
-import anthropic
-from tenacity import retry, stop_after_attempt, wait_exponential
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, Iterator, Optional, Tuple
 
-from src.llm.base import BaseLLMClient
+from src.handlers.error_handler import ErrorHandler, get_circuit_breaker
+from src.llm.base import AsyncTextStream, BaseLLMClient, TextStream
+from src.llm.http_pool import HTTPPool
+from src.utils.cache import Cache
 from src.utils.logger import setup_logger
+from src.utils.rate_limiter import RateLimiter
+from src.utils.single_flight import SingleFlight
+from src.utils.token_counter import get_token_counter
+
+if TYPE_CHECKING:
+    import anthropic
 
 logger = setup_logger(__name__)
 
@@ -13,59 +20,206 @@ class ClaudeClient(BaseLLMClient):
     Client for interacting with Anthropic's Claude models.
     """
 
-    def __init__(self, api_key: Optional[str] = None, model: str = "claude-3-opus-20240229"):
+    provider = "anthropic"
+
+    def __init__(self, api_key: Optional[str] = None, model: str = "claude-3-opus-20240229",
+                 cache: Optional[Cache] = None, force_cache: bool = False, coalesce: bool = True,
+                 rate_limiter: Optional[RateLimiter] = None, base_url: Optional[str] = None,
+                 error_handler: Optional[ErrorHandler] = None, http_pool: Optional[HTTPPool] = None,
+                 temperature: float = 0.7, max_tokens: int = 1000):
         """
         Initialize the Claude client.
         
         Args:
             api_key (str, optional): Anthropic API key. Defaults to env var ANTHROPIC_API_KEY.
             model (str): Default model to use.
+            cache (Cache, optional): Cache for responses to deterministic requests.
+            force_cache (bool): Also cache requests with temperature > 0.
+            coalesce (bool): Share one upstream call between identical concurrent deterministic
+                requests (temperature 0, or any temperature with `force_cache`).
+            rate_limiter (RateLimiter, optional): Limiter acquired before every upstream call.
+            base_url (str, optional): Override the API endpoint, e.g. for a local mock server.
+            error_handler (ErrorHandler, optional): Retry and circuit-breaker policy. Defaults to
+                the shared breaker of this provider endpoint and the process-wide retry budget.
+            http_pool (HTTPPool, optional): Shared keep-alive connection pool (and timeouts);
+                without one the SDK opens a pool per client.
+            temperature (float): Default sampling temperature.
+            max_tokens (int): Default cap on response tokens.
         """
         self.api_key = api_key or os.getenv("ANTHROPIC_API_KEY")
         if not self.api_key:
             logger.warning("Anthropic API key not found. Please set ANTHROPIC_API_KEY environment variable.")
-        
-        self.client = anthropic.Anthropic(api_key=self.api_key)
+
+        self.base_url = base_url
+        self.http_pool = http_pool
         self.model = model
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.cache = cache
+        self.force_cache = force_cache
+        self.single_flight = SingleFlight() if coalesce else None
+        self.rate_limiter = rate_limiter
+        self.rate_limits = {}
+        self.error_handler = error_handler or ErrorHandler(
+            get_circuit_breaker(f"{self.provider}:{base_url}" if base_url else self.provider))
 
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
-    def generate(self, prompt: str, **kwargs) -> str:
+    def _create_client(self) -> "anthropic.Anthropic":
+        """Create the Anthropic SDK client; see BaseLLMClient.client."""
+        import anthropic
+
+        # Retries are handled by the error handler (and reported to the rate limiter),
+        # so the SDK's own retry loop is disabled.
+        return anthropic.Anthropic(api_key=self.api_key, base_url=self.base_url, max_retries=0,
+                                   http_client=self.http_pool.client() if self.http_pool else None)
+
+    def _create_async_client(self) -> "anthropic.AsyncAnthropic":
+        """Create an async Anthropic SDK client; see BaseLLMClient.async_client."""
+        import anthropic
+
+        return anthropic.AsyncAnthropic(api_key=self.api_key, base_url=self.base_url, max_retries=0,
+                                        http_client=self.http_pool.async_client() if self.http_pool else None)
+
+    def _build_request(self, prompt: str, **kwargs) -> Dict[str, Any]:
+        """
+        Build the Messages API request parameters for a prompt.
+
+        Prior turns can be passed as `messages` (alternating user/assistant
+        dicts); the prompt is appended as the next user message.
+        """
+        return {
+            "model": kwargs.get("model", self.model),
+            "max_tokens": kwargs.get("max_tokens", self.max_tokens),
+            "temperature": kwargs.get("temperature", self.temperature),
+            "system": kwargs.get("system_prompt", "You are a helpful AI assistant."),
+            "messages": [
+                *kwargs.get("messages", []),
+                {"role": "user", "content": prompt}
+            ],
+        }
+
+    def _complete(self, request: Dict[str, Any]) -> str:
         """
-        Generate a response using Anthropic's API.
+        Send a request to the API once and return the response text (retries: see generate()).
         """
         try:
-            model = kwargs.get("model", self.model)
-            temperature = kwargs.get("temperature", 0.7)
-            max_tokens = kwargs.get("max_tokens", 1000)
-            system_prompt = kwargs.get("system_prompt", "You are a helpful AI assistant.")
-
-            message = self.client.messages.create(
-                model=model,
-                max_tokens=max_tokens,
-                temperature=temperature,
-                system=system_prompt,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
-            )
-            
+            estimate = self._acquire(request)
+            raw = self.client.messages.with_raw_response.create(**request)
+            message = raw.parse()
+            self._settle(estimate, self._usage(message.usage), raw.headers, request)
             return message.content[0].text
         except Exception as e:
+            self._record_error(e)
             logger.error(f"Error generating response from Claude: {e}")
             raise
 
+    async def _acomplete(self, request: Dict[str, Any]) -> str:
+        """
+        Asynchronously send a request to the API once and return the response text.
+        """
+        try:
+            estimate = await self._acquire_async(request)
+            raw = await self.async_client.messages.with_raw_response.create(**request)
+            message = raw.parse()
+            self._settle(estimate, self._usage(message.usage), raw.headers, request)
+            return message.content[0].text
+        except Exception as e:
+            self._record_error(e)
+            logger.error(f"Error generating async response from Claude: {e}")
+            raise
+
+    def generate(self, prompt: str, **kwargs) -> str:
+        """
+        Generate a response, serving deterministic requests from the cache when enabled.
+        """
+        return self._generate_with_cache(self._build_request(prompt, **kwargs), kwargs,
+                                         self._with_retries(self._complete, kwargs))
+
     async def generate_async(self, prompt: str, **kwargs) -> str:
         """
-        Asynchronously generate a response.
-        (Placeholder for now)
+        Asynchronously generate a response, serving deterministic requests from the cache when enabled.
         """
-        return self.generate(prompt, **kwargs)
+        return await self._agenerate_with_cache(self._build_request(prompt, **kwargs), kwargs,
+                                                self._awith_retries(self._acomplete, kwargs))
+
+    @staticmethod
+    def _usage(usage: Any) -> Optional[Dict[str, int]]:
+        """Normalize Anthropic usage to input_tokens/output_tokens."""
+        if not usage:
+            return None
+        return {"input_tokens": usage.input_tokens, "output_tokens": usage.output_tokens}
+
+    @classmethod
+    def _record_event(cls, event: Any, stream: Any) -> Optional[str]:
+        """Record usage/stop reason from a stream event and return its text delta."""
+        if event.type == "message_start":
+            stream.usage = cls._usage(event.message.usage)
+        elif event.type == "message_delta":
+            stream.stop_reason = event.delta.stop_reason
+            if stream.usage is not None:
+                stream.usage["output_tokens"] = event.usage.output_tokens
+        elif event.type == "content_block_delta" and event.delta.type == "text_delta":
+            return event.delta.text
+        return None
+
+    def _open_stream(self, request: Dict[str, Any]) -> Tuple[int, Any]:
+        """
+        Start a streamed message once; returns the token estimate and the stream.
+        """
+        try:
+            estimate = self._acquire(request)
+            return estimate, self.client.messages.create(**request, stream=True)
+        except Exception as e:
+            self._record_error(e)
+            logger.error(f"Error starting stream from Claude: {e}")
+            raise
+
+    async def _aopen_stream(self, request: Dict[str, Any]) -> Tuple[int, Any]:
+        """
+        Asynchronously start a streamed message once.
+        """
+        try:
+            estimate = await self._acquire_async(request)
+            return estimate, await self.async_client.messages.create(**request, stream=True)
+        except Exception as e:
+            self._record_error(e)
+            logger.error(f"Error starting async stream from Claude: {e}")
+            raise
+
+    def _iter_stream(self, prompt: str, stream: TextStream, **kwargs) -> Iterator[str]:
+        """
+        Yield text deltas from a streamed message.
+        """
+        request = self._build_request(prompt, **kwargs)
+        estimate, response = self._with_retries(self._open_stream, kwargs)(request)
+        try:
+            for event in response:
+                delta = self._record_event(event, stream)
+                if delta:
+                    yield delta
+        finally:
+            response.close()
+        self._settle(estimate, stream.usage, self._response_headers(response), request)
+
+    async def _aiter_stream(self, prompt: str, stream: AsyncTextStream, **kwargs) -> AsyncIterator[str]:
+        """
+        Asynchronously yield text deltas from a streamed message.
+        """
+        request = self._build_request(prompt, **kwargs)
+        estimate, response = await self._awith_retries(self._aopen_stream, kwargs)(request)
+        try:
+            async for event in response:
+                delta = self._record_event(event, stream)
+                if delta:
+                    yield delta
+        finally:
+            await response.close()
+        self._settle(estimate, stream.usage, self._response_headers(response), request)
 
     def get_token_count(self, text: str) -> int:
         """
-        Count tokens using Anthropic's token counting method (if available) or estimate.
-        Note: Anthropic doesn't have a public tiktoken equivalent yet, but the API returns usage.
-        For pre-flight counting, we can use a rough estimate or a third-party library.
+        Estimate tokens for Claude, whose tokenizer is not public.
+
+        Uses a characters-per-token ratio that is calibrated from the input
+        token usage reported for this model's completed requests.
         """
-        # Simple character-based estimation as a fallback (approx 4 chars per token)
-        return len(text) // 4
+        return get_token_counter(self.model).count(text)
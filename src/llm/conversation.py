@@ -0,0 +1,194 @@
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from src.llm.base import BaseLLMClient
+from src.utils.logger import setup_logger
+from src.utils.token_counter import get_token_counter
+
+logger = setup_logger(__name__)
+
+SUMMARY_SYSTEM_PROMPT = (
+    "You summarize conversations. Keep facts, decisions, names and open "
+    "questions; drop pleasantries. Answer with the summary only."
+)
+
+
+class Conversation:
+    """
+    Multi-turn conversation kept as a provider-native message list under a token budget.
+
+    Each message is counted once, when it is added, and the running total is
+    updated incrementally, so a turn costs the same however long the
+    conversation gets. When the next request would exceed `max_context_tokens`
+    the oldest turns are dropped, or with `summarize=True` folded into a
+    running summary that is sent with the system prompt. Trimming goes down to
+    `low_water` of the budget so it happens once every few turns rather than
+    on every turn.
+
+    Not thread-safe: use one Conversation per chat.
+    """
+
+    def __init__(self, client: BaseLLMClient, system_prompt: Optional[str] = None,
+                 max_context_tokens: int = 4000, summarize: bool = False, low_water: float = 0.75,
+                 summary_max_tokens: int = 256):
+        """
+        Initialize the conversation.
+
+        Args:
+            client (BaseLLMClient): Client used for replies (and summaries).
+            system_prompt (str, optional): System prompt; the client's default if omitted.
+            max_context_tokens (int): Budget for the prompt sent with each turn
+                (system prompt, summary, history and the new message).
+            summarize (bool): Summarize dropped turns instead of discarding them.
+            low_water (float): Fraction of the budget to trim down to once it is exceeded.
+            summary_max_tokens (int): Maximum length of the running summary.
+        """
+        self.client = client
+        self.system_prompt = system_prompt
+        self.max_context_tokens = max_context_tokens
+        self.summarize = summarize
+        self.low_water = low_water
+        self.summary_max_tokens = summary_max_tokens
+        self.counter = get_token_counter(getattr(client, "model", "") or "")
+
+        self.messages: Deque[Dict[str, Any]] = deque()
+        self._message_tokens: Deque[int] = deque()
+        self.history_tokens = 0
+        self.summary: Optional[str] = None
+        self._system_tokens = 0
+        self._update_system()
+
+    @property
+    def total_tokens(self) -> int:
+        """Prompt tokens of the current context, excluding the next message."""
+        return self.counter.request_overhead + self._system_tokens + self.history_tokens
+
+    def _system(self) -> Optional[str]:
+        """Return the system prompt with the running summary appended."""
+        if not self.summary:
+            return self.system_prompt
+        summary = f"Summary of the earlier conversation:\n{self.summary}"
+        return f"{self.system_prompt}\n\n{summary}" if self.system_prompt else summary
+
+    def _update_system(self):
+        system = self._system()
+        self._system_tokens = self.counter.count_message({"role": "system", "content": system}) if system else 0
+
+    def add_message(self, role: str, content: str):
+        """
+        Append a message to the history.
+
+        Args:
+            role (str): "user" or "assistant".
+            content (str): Message text.
+        """
+        message = {"role": role, "content": content}
+        tokens = self.counter.count_message(message)
+        self.messages.append(message)
+        self._message_tokens.append(tokens)
+        self.history_tokens += tokens
+
+    def _pop_turn(self) -> List[Dict[str, Any]]:
+        """Remove the oldest turn: one user message and the replies that follow it."""
+        dropped = []
+        while self.messages and (not dropped or self.messages[0]["role"] != "user"):
+            dropped.append(self.messages.popleft())
+            self.history_tokens -= self._message_tokens.popleft()
+        return dropped
+
+    def _trim(self, incoming: int) -> List[Dict[str, Any]]:
+        """Drop the oldest turns if the next request would exceed the budget; return them."""
+        if self.total_tokens + incoming <= self.max_context_tokens:
+            return []
+        target = self.max_context_tokens * self.low_water
+        dropped = []
+        while self.messages and self.total_tokens + incoming > target:
+            dropped.extend(self._pop_turn())
+        logger.info(f"Trimmed {len(dropped)} messages from the conversation ({self.total_tokens} tokens remain).")
+        return dropped
+
+    def _summary_prompt(self, dropped: List[Dict[str, Any]]) -> str:
+        transcript = "\n".join(f"{m['role'].capitalize()}: {m['content']}" for m in dropped)
+        if self.summary:
+            return f"Summary so far:\n{self.summary}\n\nContinue the summary with:\n{transcript}"
+        return f"Summarize this conversation:\n{transcript}"
+
+    def _set_summary(self, summary: str):
+        self.summary = summary.strip()
+        self._update_system()
+
+    def _check_fits(self, incoming: int):
+        if self.total_tokens + incoming > self.max_context_tokens:
+            logger.warning(f"Message does not fit the context budget of {self.max_context_tokens} tokens "
+                           f"even after trimming ({self.total_tokens + incoming} tokens).")
+
+    def _request_kwargs(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        request_kwargs = {"messages": list(self.messages), **kwargs}
+        system = self._system()
+        if system is not None:
+            request_kwargs["system_prompt"] = system
+        return request_kwargs
+
+    def _summary_kwargs(self) -> Dict[str, Any]:
+        return {"system_prompt": SUMMARY_SYSTEM_PROMPT, "temperature": 0,
+                "max_tokens": self.summary_max_tokens}
+
+    def send(self, content: str, **kwargs) -> str:
+        """
+        Send a user message with the conversation context and record the reply.
+
+        Args:
+            content (str): The user message.
+            **kwargs: Additional parameters passed to the client's generate().
+
+        Returns:
+            str: The assistant's reply.
+        """
+        incoming = self.counter.count_message({"role": "user", "content": content})
+        dropped = self._trim(incoming)
+        if dropped and self.summarize:
+            try:
+                self._set_summary(self.client.generate(self._summary_prompt(dropped), **self._summary_kwargs()))
+            except Exception as e:
+                logger.error(f"Error summarizing conversation; dropped turns are discarded: {e}")
+        self._check_fits(incoming)
+        response = self.client.generate(content, **self._request_kwargs(kwargs))
+        self.add_message("user", content)
+        self.add_message("assistant", response)
+        return response
+
+    async def send_async(self, content: str, **kwargs) -> str:
+        """
+        Asynchronously send a user message with the conversation context and record the reply.
+
+        Args:
+            content (str): The user message.
+            **kwargs: Additional parameters passed to the client's generate_async().
+
+        Returns:
+            str: The assistant's reply.
+        """
+        incoming = self.counter.count_message({"role": "user", "content": content})
+        dropped = self._trim(incoming)
+        if dropped and self.summarize:
+            try:
+                summary = await self.client.generate_async(self._summary_prompt(dropped), **self._summary_kwargs())
+                self._set_summary(summary)
+            except Exception as e:
+                logger.error(f"Error summarizing conversation; dropped turns are discarded: {e}")
+        self._check_fits(incoming)
+        response = await self.client.generate_async(content, **self._request_kwargs(kwargs))
+        self.add_message("user", content)
+        self.add_message("assistant", response)
+        return response
+
+    def __len__(self) -> int:
+        return len(self.messages)
+
+    def clear(self):
+        """Forget the history and the summary."""
+        self.messages.clear()
+        self._message_tokens.clear()
+        self.history_tokens = 0
+        self.summary = None
+        self._update_system()
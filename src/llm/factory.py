@@ -0,0 +1,157 @@
+import threading
+from typing import Any, Dict, Optional
+
+from src.llm.base import BaseLLMClient
+from src.llm.claude_client import ClaudeClient
+from src.llm.http_pool import HTTPPool
+from src.llm.openai_client import OpenAIClient
+from src.utils.cache import Cache
+from src.utils.config import load_config
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+CLIENT_CLASSES = {"openai": OpenAIClient, "anthropic": ClaudeClient}
+
+_factories: Dict[str, "ClientFactory"] = {}
+_factories_lock = threading.Lock()
+
+
+class ClientFactory:
+    """
+    Builds clients from model_config.yaml that share one keep-alive HTTP pool per provider.
+
+    The config is read once. Each provider section supplies the defaults
+    (`api_key`, `default_model`, `temperature`, `max_tokens`,
+    `retry_attempts`, `base_url`); connection limits and timeouts come from
+    `global.timeout` and `global.http`, overridable per provider with `timeout`
+    and `http`. With `global.cache_enabled` all clients share one response
+    cache. Creating a client opens no connections, so clients are cheap to
+    make; use `get()` for one long-lived client per provider.
+    """
+
+    def __init__(self, path: str = "config/model_config.yaml", config: Optional[Dict[str, Any]] = None):
+        """
+        Initialize the factory.
+
+        Args:
+            path (str): Config file to read (ignored when `config` is given).
+            config (dict, optional): Already loaded config with the same layout.
+        """
+        self.path = path
+        self.config = config if config is not None else load_config(path)
+        self.http_pools: Dict[str, HTTPPool] = {}
+        self.clients: Dict[str, BaseLLMClient] = {}
+        self.response_cache: Optional[Cache] = None
+        self.lock = threading.Lock()
+
+    def section(self, provider: str) -> Dict[str, Any]:
+        """Return the config section of a provider."""
+        if provider not in CLIENT_CLASSES:
+            raise ValueError(f"Unknown provider '{provider}'. Expected one of {sorted(CLIENT_CLASSES)}.")
+        return self.config.get(provider) or {}
+
+    def http_settings(self, provider: str) -> Dict[str, Any]:
+        """Merge the HTTP pool settings for a provider: global first, then the provider's overrides."""
+        defaults = self.config.get("global") or {}
+        section = self.section(provider)
+        settings: Dict[str, Any] = {}
+        for scope in (defaults, section):
+            if "timeout" in scope:
+                settings["timeout"] = scope["timeout"]
+            settings.update(scope.get("http") or {})
+        return settings
+
+    def http_pool(self, provider: str) -> HTTPPool:
+        """Return the HTTP pool shared by every client of a provider, creating it on first use."""
+        with self.lock:
+            pool = self.http_pools.get(provider)
+            if pool is None:
+                pool = self.http_pools[provider] = HTTPPool.from_config(self.http_settings(provider))
+            return pool
+
+    def cache(self) -> Optional[Cache]:
+        """Return the shared response cache if `global.cache_enabled` is set, else None."""
+        if not (self.config.get("global") or {}).get("cache_enabled"):
+            return None
+        with self.lock:
+            if self.response_cache is None:
+                self.response_cache = Cache()
+            return self.response_cache
+
+    def create(self, provider: str, **kwargs) -> BaseLLMClient:
+        """
+        Create a client for a provider with the configured defaults and the shared HTTP pool.
+
+        Args:
+            provider (str): "openai" or "anthropic".
+            **kwargs: Client constructor arguments; these override the config.
+
+        Returns:
+            BaseLLMClient: A new client.
+        """
+        section = self.section(provider)
+        options: Dict[str, Any] = {
+            # An unset ${ENV_VAR} expands to "", which should fall back to the client's own lookup.
+            "api_key": section.get("api_key") or None,
+            "model": section.get("default_model"),
+            "temperature": section.get("temperature"),
+            "max_tokens": section.get("max_tokens"),
+            "base_url": section.get("base_url"),
+        }
+        options = {key: value for key, value in options.items() if value is not None}
+        if "http_pool" not in kwargs:
+            options["http_pool"] = self.http_pool(provider)
+        if "cache" not in kwargs:
+            options["cache"] = self.cache()
+        options.update(kwargs)
+        client = CLIENT_CLASSES[provider](**options)
+        if "error_handler" not in kwargs and section.get("retry_attempts"):
+            client.error_handler.max_attempts = int(section["retry_attempts"])
+        return client
+
+    def get(self, provider: str) -> BaseLLMClient:
+        """Return the factory's default client for a provider, creating it once."""
+        client = self.clients.get(provider)
+        if client is None:
+            client = self.create(provider)
+            with self.lock:
+                client = self.clients.setdefault(provider, client)
+        return client
+
+    def close(self):
+        """Close the HTTP pools. Clients created by this factory must not be used afterwards."""
+        with self.lock:
+            pools = list(self.http_pools.values())
+            self.http_pools.clear()
+            self.clients.clear()
+        for pool in pools:
+            pool.close()
+
+
+def get_factory(path: str = "config/model_config.yaml") -> ClientFactory:
+    """
+    Return the process-wide factory for a config file, creating it on first use.
+    """
+    factory = _factories.get(path)
+    if factory is None:
+        with _factories_lock:
+            factory = _factories.get(path)
+            if factory is None:
+                factory = _factories[path] = ClientFactory(path)
+    return factory
+
+
+def create_client(provider: str, path: str = "config/model_config.yaml", **kwargs) -> BaseLLMClient:
+    """
+    Create a client from the config with the process-wide shared HTTP pools.
+
+    Args:
+        provider (str): "openai" or "anthropic".
+        path (str): Config file.
+        **kwargs: Client constructor arguments; these override the config.
+
+    Returns:
+        BaseLLMClient: A new client.
+    """
+    return get_factory(path).create(provider, **kwargs)
@@ -0,0 +1,172 @@
+import asyncio
+import threading
+import weakref
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from src.utils.logger import setup_logger
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = setup_logger(__name__)
+
+
+def close_with_loop(close: Callable[[], Awaitable[Any]]) -> "asyncio.Task":
+    """
+    Call `close()` on the running event loop when that loop shuts down.
+
+    asyncio.run() cancels the tasks still pending when its main coroutine
+    returns and runs them until they finish, so a task parked until it is
+    cancelled can release loop-bound resources (pooled connections) while
+    the loop is still usable. Cancelling the returned task earlier makes the
+    call then.
+
+    Returns:
+        asyncio.Task: The parked task.
+    """
+    async def wait_for_shutdown():
+        try:
+            await asyncio.get_running_loop().create_future()
+        except asyncio.CancelledError:
+            await close()
+            raise
+
+    return asyncio.get_running_loop().create_task(wait_for_shutdown())
+
+
+def close_now(loop: asyncio.AbstractEventLoop, closer: "asyncio.Task"):
+    """
+    Make a task from close_with_loop() call its `close()` now instead of at loop shutdown.
+
+    On a running loop the task is cancelled from that loop's thread and the
+    close runs there shortly; on an idle loop it is run to completion before
+    returning. A closed loop has already dropped its connections, so there
+    is nothing left to close.
+    """
+    if loop.is_closed():
+        return
+    if loop.is_running():
+        loop.call_soon_threadsafe(closer.cancel)
+        return
+
+    def finish():
+        closer.cancel()
+        loop.run_until_complete(asyncio.wait([closer]))
+
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        finish()
+    else:
+        # An idle loop cannot be run from a thread that is running another one.
+        thread = threading.Thread(target=finish)
+        thread.start()
+        thread.join()
+
+
+class HTTPPool:
+    """
+    Keep-alive HTTP connection pools shared by every client handed this object.
+
+    Provider SDK clients built on the same HTTPPool reuse its connections, so
+    a new client costs no TCP/TLS handshake once the pool is warm. There is
+    one httpx.Client for sync calls and one httpx.AsyncClient per event loop
+    (async connections cannot move between loops). httpx is imported when the
+    first pool is opened.
+
+    Timeouts set here apply to every request: the SDKs adopt the timeout of
+    an http_client they are given.
+    """
+
+    def __init__(self, timeout: Optional[float] = 600.0, connect_timeout: float = 5.0,
+                 max_connections: int = 1000, max_keepalive_connections: int = 100,
+                 keepalive_expiry: float = 30.0, http2: bool = False):
+        """
+        Initialize the pool settings; no connections are opened until first use.
+
+        Args:
+            timeout (float, optional): Read/write/pool timeout in seconds (None: wait forever).
+            connect_timeout (float): Timeout for establishing a connection.
+            max_connections (int): Upper bound on open connections per pool.
+            max_keepalive_connections (int): Idle connections kept open for reuse.
+            keepalive_expiry (float): Seconds an idle connection is kept.
+            http2 (bool): Negotiate HTTP/2 (requires the `h2` package).
+        """
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.http2 = http2
+        self._client: Optional["httpx.Client"] = None
+        # loop -> (client, task closing it when the loop shuts down)
+        self._async_clients: \
+            "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Tuple[httpx.AsyncClient, asyncio.Task]]" = \
+            weakref.WeakKeyDictionary()
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, settings: Dict[str, Any]) -> "HTTPPool":
+        """
+        Build a pool from a config mapping with any of the constructor's keys.
+
+        Unknown keys are ignored, so a whole config section can be passed.
+        """
+        keys = ("timeout", "connect_timeout", "max_connections", "max_keepalive_connections",
+                "keepalive_expiry", "http2")
+        return cls(**{key: settings[key] for key in keys if key in settings})
+
+    def _options(self) -> Dict[str, Any]:
+        import httpx
+
+        return {
+            "timeout": httpx.Timeout(self.timeout, connect=self.connect_timeout),
+            "limits": httpx.Limits(max_connections=self.max_connections,
+                                   max_keepalive_connections=self.max_keepalive_connections,
+                                   keepalive_expiry=self.keepalive_expiry),
+            "http2": self.http2,
+            # Matches the SDKs' own default clients.
+            "follow_redirects": True,
+        }
+
+    def client(self) -> "httpx.Client":
+        """Return the shared sync httpx client, creating it on first use."""
+        if self._client is None:
+            with self.lock:
+                if self._client is None:
+                    import httpx
+
+                    self._client = httpx.Client(**self._options())
+                    logger.debug(f"Opened HTTP pool (max {self.max_connections} connections).")
+        return self._client
+
+    def async_client(self) -> "httpx.AsyncClient":
+        """Return the shared async httpx client for the running event loop, creating it on first use."""
+        loop = asyncio.get_running_loop()
+        entry = self._async_clients.get(loop)
+        if entry is None:
+            import httpx
+
+            with self.lock:
+                entry = self._async_clients.get(loop)
+                if entry is None:
+                    client = httpx.AsyncClient(**self._options())
+                    entry = self._async_clients[loop] = (client, close_with_loop(client.aclose))
+        return entry[0]
+
+    def close(self):
+        """
+        Close the sync pool and the async pools of every event loop.
+
+        An async pool whose loop is running (in another thread, or this one)
+        closes on that loop shortly after this returns. Clients built on this
+        pool must not be used afterwards.
+        """
+        with self.lock:
+            client, self._client = self._client, None
+            async_clients = list(self._async_clients.items())
+            self._async_clients.clear()
+        if client is not None:
+            client.close()
+        for loop, (_, closer) in async_clients:
+            close_now(loop, closer)
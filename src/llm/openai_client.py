@@ -1,10 +1,17 @@
 import os
-from typing import Any, Dict, Optional
-import openai
-from tenacity import retry, stop_after_attempt, wait_exponential
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, Iterator, Optional, Tuple
 
-from src.llm.base import BaseLLMClient
+from src.handlers.error_handler import ErrorHandler, get_circuit_breaker
+from src.llm.base import AsyncTextStream, BaseLLMClient, TextStream
+from src.llm.http_pool import HTTPPool
+from src.utils.cache import Cache
 from src.utils.logger import setup_logger
+from src.utils.rate_limiter import RateLimiter
+from src.utils.single_flight import SingleFlight
+from src.utils.token_counter import get_token_counter
+
+if TYPE_CHECKING:
+    import openai
 
 logger = setup_logger(__name__)
 
@@ -13,66 +20,210 @@ class OpenAIClient(BaseLLMClient):
     Client for interacting with OpenAI's GPT models.
     """
 
-    def __init__(self, api_key: Optional[str] = None, model: str = "gpt-4"):
+    provider = "openai"
+
+    def __init__(self, api_key: Optional[str] = None, model: str = "gpt-4",
+                 cache: Optional[Cache] = None, force_cache: bool = False, coalesce: bool = True,
+                 rate_limiter: Optional[RateLimiter] = None, base_url: Optional[str] = None,
+                 error_handler: Optional[ErrorHandler] = None, http_pool: Optional[HTTPPool] = None,
+                 temperature: float = 0.7, max_tokens: int = 1000):
         """
         Initialize the OpenAI client.
         
         Args:
             api_key (str, optional): OpenAI API key. Defaults to env var OPENAI_API_KEY.
             model (str): Default model to use.
+            cache (Cache, optional): Cache for responses to deterministic requests.
+            force_cache (bool): Also cache requests with temperature > 0.
+            coalesce (bool): Share one upstream call between identical concurrent deterministic
+                requests (temperature 0, or any temperature with `force_cache`).
+            rate_limiter (RateLimiter, optional): Limiter acquired before every upstream call.
+            base_url (str, optional): Override the API endpoint, e.g. for a local mock server.
+            error_handler (ErrorHandler, optional): Retry and circuit-breaker policy. Defaults to
+                the shared breaker of this provider endpoint and the process-wide retry budget.
+            http_pool (HTTPPool, optional): Shared keep-alive connection pool (and timeouts);
+                without one the SDK opens a pool per client.
+            temperature (float): Default sampling temperature.
+            max_tokens (int): Default cap on response tokens.
         """
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
         if not self.api_key:
             logger.warning("OpenAI API key not found. Please set OPENAI_API_KEY environment variable.")
-        
-        self.client = openai.OpenAI(api_key=self.api_key)
+
+        self.base_url = base_url
+        self.http_pool = http_pool
         self.model = model
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.cache = cache
+        self.force_cache = force_cache
+        self.single_flight = SingleFlight() if coalesce else None
+        self.rate_limiter = rate_limiter
+        self.rate_limits = {}
+        self.error_handler = error_handler or ErrorHandler(
+            get_circuit_breaker(f"{self.provider}:{base_url}" if base_url else self.provider))
 
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
-    def generate(self, prompt: str, **kwargs) -> str:
+    def _create_client(self) -> "openai.OpenAI":
+        """Create the OpenAI SDK client; see BaseLLMClient.client."""
+        import openai
+
+        # Retries are handled by the error handler (and reported to the rate limiter),
+        # so the SDK's own retry loop is disabled.
+        return openai.OpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=0,
+                             http_client=self.http_pool.client() if self.http_pool else None)
+
+    def _create_async_client(self) -> "openai.AsyncOpenAI":
+        """Create an async OpenAI SDK client; see BaseLLMClient.async_client."""
+        import openai
+
+        return openai.AsyncOpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=0,
+                                  http_client=self.http_pool.async_client() if self.http_pool else None)
+
+    def _build_request(self, prompt: str, **kwargs) -> Dict[str, Any]:
+        """
+        Build the chat completion request parameters for a prompt.
+
+        Prior turns can be passed as `messages` (user/assistant dicts); the
+        prompt is appended as the next user message.
+        """
+        return {
+            "model": kwargs.get("model", self.model),
+            "messages": [
+                {"role": "system", "content": kwargs.get("system_prompt", "You are a helpful AI assistant.")},
+                *kwargs.get("messages", []),
+                {"role": "user", "content": prompt}
+            ],
+            "temperature": kwargs.get("temperature", self.temperature),
+            "max_tokens": kwargs.get("max_tokens", self.max_tokens),
+        }
+
+    def _complete(self, request: Dict[str, Any]) -> str:
         """
-        Generate a response using OpenAI's API.
+        Send a request to the API once and return the response text (retries: see generate()).
         """
         try:
-            model = kwargs.get("model", self.model)
-            temperature = kwargs.get("temperature", 0.7)
-            max_tokens = kwargs.get("max_tokens", 1000)
-
-            response = self.client.chat.completions.create(
-                model=model,
-                messages=[
-                    {"role": "system", "content": "You are a helpful AI assistant."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=temperature,
-                max_tokens=max_tokens,
-            )
-            
+            estimate = self._acquire(request)
+            raw = self.client.chat.completions.with_raw_response.create(**request)
+            response = raw.parse()
+            self._settle(estimate, self._usage(response.usage), raw.headers, request)
             return response.choices[0].message.content
         except Exception as e:
+            self._record_error(e)
             logger.error(f"Error generating response from OpenAI: {e}")
             raise
 
+    async def _acomplete(self, request: Dict[str, Any]) -> str:
+        """
+        Asynchronously send a request to the API once and return the response text.
+        """
+        try:
+            estimate = await self._acquire_async(request)
+            raw = await self.async_client.chat.completions.with_raw_response.create(**request)
+            response = raw.parse()
+            self._settle(estimate, self._usage(response.usage), raw.headers, request)
+            return response.choices[0].message.content
+        except Exception as e:
+            self._record_error(e)
+            logger.error(f"Error generating async response from OpenAI: {e}")
+            raise
+
+    def generate(self, prompt: str, **kwargs) -> str:
+        """
+        Generate a response, serving deterministic requests from the cache when enabled.
+        """
+        return self._generate_with_cache(self._build_request(prompt, **kwargs), kwargs,
+                                         self._with_retries(self._complete, kwargs))
+
     async def generate_async(self, prompt: str, **kwargs) -> str:
         """
-        Asynchronously generate a response.
-        (Note: Requires AsyncOpenAI client, using sync for now as placeholder or need to init AsyncClient)
+        Asynchronously generate a response, serving deterministic requests from the cache when enabled.
         """
-        # For true async, we should use openai.AsyncOpenAI
-        # This is a placeholder implementation
-        return self.generate(prompt, **kwargs)
+        return await self._agenerate_with_cache(self._build_request(prompt, **kwargs), kwargs,
+                                                self._awith_retries(self._acomplete, kwargs))
 
-    def get_token_count(self, text: str) -> int:
+    @staticmethod
+    def _usage(usage: Any) -> Optional[Dict[str, int]]:
+        """Normalize OpenAI usage to input_tokens/output_tokens."""
+        if not usage:
+            return None
+        return {"input_tokens": usage.prompt_tokens, "output_tokens": usage.completion_tokens}
+
+    @classmethod
+    def _record_chunk(cls, chunk: Any, stream: Any) -> Optional[str]:
+        """Record usage/finish reason from a stream chunk and return its text delta."""
+        if getattr(chunk, "usage", None):
+            stream.usage = cls._usage(chunk.usage)
+        if not chunk.choices:
+            return None
+        choice = chunk.choices[0]
+        if choice.finish_reason:
+            stream.stop_reason = choice.finish_reason
+        return choice.delta.content
+
+    def _open_stream(self, request: Dict[str, Any]) -> Tuple[int, Any]:
+        """
+        Start a streamed chat completion once; returns the token estimate and the stream.
+        """
+        try:
+            estimate = self._acquire(request)
+            return estimate, self.client.chat.completions.create(
+                **request,
+                stream=True,
+                stream_options={"include_usage": True},
+            )
+        except Exception as e:
+            self._record_error(e)
+            logger.error(f"Error starting stream from OpenAI: {e}")
+            raise
+
+    async def _aopen_stream(self, request: Dict[str, Any]) -> Tuple[int, Any]:
         """
-        Count tokens using tiktoken.
+        Asynchronously start a streamed chat completion once.
         """
         try:
-            import tiktoken
-            encoding = tiktoken.encoding_for_model(self.model)
-            return len(encoding.encode(text))
-        except ImportError:
-            logger.warning("tiktoken not installed. Returning estimated token count.")
-            return len(text.split())
+            estimate = await self._acquire_async(request)
+            return estimate, await self.async_client.chat.completions.create(
+                **request,
+                stream=True,
+                stream_options={"include_usage": True},
+            )
         except Exception as e:
-            logger.error(f"Error counting tokens: {e}")
-            return 0
+            self._record_error(e)
+            logger.error(f"Error starting async stream from OpenAI: {e}")
+            raise
+
+    def _iter_stream(self, prompt: str, stream: TextStream, **kwargs) -> Iterator[str]:
+        """
+        Yield text deltas from a streamed chat completion.
+        """
+        request = self._build_request(prompt, **kwargs)
+        estimate, response = self._with_retries(self._open_stream, kwargs)(request)
+        try:
+            for chunk in response:
+                delta = self._record_chunk(chunk, stream)
+                if delta:
+                    yield delta
+        finally:
+            response.close()
+        self._settle(estimate, stream.usage, self._response_headers(response), request)
+
+    async def _aiter_stream(self, prompt: str, stream: AsyncTextStream, **kwargs) -> AsyncIterator[str]:
+        """
+        Asynchronously yield text deltas from a streamed chat completion.
+        """
+        request = self._build_request(prompt, **kwargs)
+        estimate, response = await self._awith_retries(self._aopen_stream, kwargs)(request)
+        try:
+            async for chunk in response:
+                delta = self._record_chunk(chunk, stream)
+                if delta:
+                    yield delta
+        finally:
+            await response.close()
+        self._settle(estimate, stream.usage, self._response_headers(response), request)
+
+    def get_token_count(self, text: str) -> int:
+        """
+        Count tokens using the model's tiktoken encoding (loaded once and memoized).
+        """
+        return get_token_counter(self.model).count(text)
@@ -0,0 +1,309 @@
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from src.llm.base import AsyncTextStream, BaseLLMClient, TextStream
+from src.llm.factory import get_factory
+from src.utils.cache import Cache
+from src.utils.logger import setup_logger
+from src.utils.rate_limiter import RateLimiter, parse_retry_after
+
+logger = setup_logger(__name__)
+
+# Errors caused by the request itself; another member would fail the same way.
+REQUEST_ERROR_STATUSES = {400, 404, 413, 422}
+
+
+class PoolMember:
+    """
+    One credential/endpoint in a ClientPool, with its health and load statistics.
+    """
+
+    def __init__(self, client: BaseLLMClient, name: str, weight: float = 1.0):
+        self.client = client
+        self.name = name
+        self.weight = weight
+        self.in_flight = 0
+        self.requests = 0
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.ejections = 0
+        self.ejected_until = 0.0
+        self.latency: Optional[float] = None  # EWMA of successful call latency, seconds
+
+    def quota_fraction(self) -> float:
+        """Return the smallest remaining/limit fraction the provider last reported, 1.0 if unknown."""
+        fraction = 1.0
+        for fields in getattr(self.client, "rate_limits", {}).values():
+            limit, remaining = fields.get("limit"), fields.get("remaining")
+            if limit and remaining is not None:
+                fraction = min(fraction, max(0.0, remaining / limit))
+        return fraction
+
+    def is_ejected(self, now: float) -> bool:
+        return now < self.ejected_until
+
+    def stats(self, now: float) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "model": getattr(self.client, "model", None),
+            "base_url": getattr(self.client, "base_url", None),
+            "weight": self.weight,
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "successes": self.successes,
+            "failures": self.failures,
+            "latency_ms": round(self.latency * 1000, 1) if self.latency is not None else None,
+            "quota_remaining": round(self.quota_fraction(), 3),
+            "ejected_for": round(max(0.0, self.ejected_until - now), 1),
+            "ejections": self.ejections,
+        }
+
+
+class ClientPool(BaseLLMClient):
+    """
+    Client that load-balances requests across several keys or deployments of a provider.
+
+    Each request goes to the member with the lowest
+    `(in_flight + 1) * latency / (quota_remaining * weight)`, where latency is
+    an exponentially weighted average of the member's successful calls and
+    quota_remaining is the smallest remaining/limit fraction from its last
+    rate-limit headers. So load spreads across members, slow members get less
+    of it, and members close to their quota are avoided before they start
+    returning 429s.
+
+    A failed call fails over to the next-best member straight away; only the
+    last attempt retries. A 429 takes the member out of rotation until its
+    Retry-After. After `eject_after` consecutive failures a member is ejected
+    for `ejection_time`, doubling with each further ejection up to
+    `max_ejection_time`. Once the ejection expires, the member gets one probe
+    request; a success restores it. Errors caused by the request itself
+    (400, 404, 413, 422) are raised without failover.
+    """
+
+    def __init__(self, clients: Sequence[BaseLLMClient], names: Optional[Sequence[str]] = None,
+                 weights: Optional[Sequence[float]] = None, eject_after: int = 3, ejection_time: float = 10.0,
+                 max_ejection_time: float = 300.0, latency_smoothing: float = 0.2):
+        """
+        Initialize the pool.
+
+        Args:
+            clients (Sequence[BaseLLMClient]): Clients of the same provider, one per key or deployment.
+            names (Sequence[str], optional): Member names for logs and stats.
+            weights (Sequence[float], optional): Relative share of traffic per member (default 1.0 each).
+            eject_after (int): Consecutive failures before a member is ejected.
+            ejection_time (float): Seconds of the first ejection.
+            max_ejection_time (float): Upper bound for repeated ejections.
+            latency_smoothing (float): Weight of the newest sample in the latency average.
+        """
+        if not clients:
+            raise ValueError("ClientPool needs at least one client.")
+        names = list(names) if names else [f"member-{i}" for i in range(len(clients))]
+        weights = list(weights) if weights else [1.0] * len(clients)
+        self.members = [PoolMember(c, n, w) for c, n, w in zip(clients, names, weights)]
+        self.provider = clients[0].provider
+        self.model = getattr(clients[0], "model", None)
+        self.eject_after = eject_after
+        self.ejection_time = ejection_time
+        self.max_ejection_time = max_ejection_time
+        self.latency_smoothing = latency_smoothing
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, provider: str = "openai", path: str = "config/model_config.yaml",
+                    cache: Optional[Cache] = None, **kwargs) -> "ClientPool":
+        """
+        Build a pool from the `pool` list of a provider section in model_config.yaml.
+
+        Each entry may set `name`, `api_key`, `base_url`, `model` (defaults to
+        the section's `default_model`), `weight`, and `requests_per_minute` /
+        `tokens_per_minute` for an adaptive per-member rate limiter. Without a
+        `pool` list the section's own `api_key` is the only member. Entries
+        whose key is empty (e.g. an unset environment variable) are skipped.
+        Members are built by the config's ClientFactory, so they share its
+        HTTP pool, timeouts and retry settings.
+
+        Args:
+            provider (str): Config section, "openai" or "anthropic".
+            path (str): Config file.
+            cache (Cache, optional): Response cache shared by all members.
+            **kwargs: Further ClientPool arguments (eject_after, ejection_time, ...).
+        """
+        factory = get_factory(path)
+        section = factory.section(provider)
+        entries = section.get("pool") or [{"name": provider, "api_key": section.get("api_key")}]
+        clients, names, weights = [], [], []
+        for i, entry in enumerate(entries):
+            name = entry.get("name") or f"{provider}-{i}"
+            if not entry.get("api_key"):
+                logger.warning(f"Skipping pool member '{name}': no API key configured.")
+                continue
+            rate_limiter = None
+            if entry.get("requests_per_minute"):
+                rate_limiter = RateLimiter(entry["requests_per_minute"], 60,
+                                           tokens_per_minute=entry.get("tokens_per_minute"), adaptive=True)
+            model = entry.get("model") or section.get("default_model")
+            clients.append(factory.create(
+                provider,
+                api_key=entry["api_key"],
+                cache=cache,
+                rate_limiter=rate_limiter,
+                base_url=entry.get("base_url"),
+                **({"model": model} if model else {}),
+            ))
+            names.append(name)
+            weights.append(float(entry.get("weight", 1.0)))
+        if not clients:
+            raise ValueError(f"No usable '{provider}' pool members in {path}.")
+        logger.info(f"Created {provider} pool with {len(clients)} members: {', '.join(names)}.")
+        return cls(clients, names=names, weights=weights, **kwargs)
+
+    def _pick(self, tried: List[PoolMember], reserve: bool = True) -> Optional[PoolMember]:
+        """Choose the best untried member and, with `reserve`, count it as in flight; None when all were tried."""
+        with self.lock:
+            now = time.monotonic()
+            candidates = [m for m in self.members if m not in tried]
+            if not candidates:
+                return None
+            # A member back from ejection takes one probe request at a time until it succeeds.
+            healthy = [m for m in candidates if not m.is_ejected(now)
+                       and not (m.consecutive_failures >= self.eject_after and m.in_flight)]
+            if healthy:
+                known = [m.latency for m in self.members if m.latency is not None]
+                # Unmeasured members are assumed to be as fast as the average.
+                default_latency = sum(known) / len(known) if known else 1.0
+                member = min(healthy, key=lambda m: (m.in_flight + 1) * (m.latency or default_latency)
+                             / (max(m.quota_fraction(), 0.05) * m.weight))
+            else:
+                # Everything is ejected: try the member that comes back first rather than fail outright.
+                member = min(candidates, key=lambda m: m.ejected_until)
+            if reserve:
+                member.in_flight += 1
+                member.requests += 1
+            return member
+
+    def _release(self, member: PoolMember):
+        """Free the in-flight slot taken by _pick, however the call ended (cancellation included)."""
+        with self.lock:
+            member.in_flight -= 1
+
+    def _record_success(self, member: PoolMember, latency: float):
+        with self.lock:
+            member.successes += 1
+            member.consecutive_failures = 0
+            member.ejections = 0
+            member.ejected_until = 0.0
+            if member.latency is None:
+                member.latency = latency
+            else:
+                member.latency += self.latency_smoothing * (latency - member.latency)
+
+    def _record_failure(self, member: PoolMember, error: Exception):
+        status = getattr(error, "status_code", None)
+        with self.lock:
+            if status in REQUEST_ERROR_STATUSES:
+                return
+            member.failures += 1
+            member.consecutive_failures += 1
+            now = time.monotonic()
+            # Calls that were already in flight when the member was ejected do not extend the ejection.
+            if member.consecutive_failures >= self.eject_after and not member.is_ejected(now):
+                duration = min(self.max_ejection_time, self.ejection_time * 2 ** member.ejections)
+                member.ejections += 1
+                member.ejected_until = max(member.ejected_until, now + duration)
+                logger.warning(f"Ejecting pool member '{member.name}' for {duration:.0f}s after "
+                               f"{member.consecutive_failures} consecutive failures: {error}")
+            if status == 429:
+                retry_after = parse_retry_after(getattr(getattr(error, "response", None), "headers", None))
+                member.ejected_until = max(member.ejected_until, now + (retry_after or 1.0))
+
+    def _call_kwargs(self, kwargs: Dict[str, Any], tried: List[PoolMember]) -> Dict[str, Any]:
+        is_last = len(tried) == len(self.members)
+        return {**kwargs, "retry": is_last and kwargs.get("retry", True)}
+
+    def generate(self, prompt: str, **kwargs) -> str:
+        """
+        Generate a response from the best available member, failing over on errors.
+        """
+        tried: List[PoolMember] = []
+        while True:
+            member = self._pick(tried)
+            tried.append(member)
+            started = time.perf_counter()
+            try:
+                response = member.client.generate(prompt, **self._call_kwargs(kwargs, tried))
+            except Exception as e:
+                self._record_failure(member, e)
+                if getattr(e, "status_code", None) in REQUEST_ERROR_STATUSES or len(tried) == len(self.members):
+                    raise
+                logger.warning(f"Pool member '{member.name}' failed, failing over: {e}")
+                continue
+            finally:
+                # Cancellation (a timeout, a hedge that lost) is neither a success nor a failure.
+                self._release(member)
+            self._record_success(member, time.perf_counter() - started)
+            return response
+
+    async def generate_async(self, prompt: str, **kwargs) -> str:
+        """
+        Asynchronously generate a response from the best available member, failing over on errors.
+        """
+        tried: List[PoolMember] = []
+        while True:
+            member = self._pick(tried)
+            tried.append(member)
+            started = time.perf_counter()
+            try:
+                response = await member.client.generate_async(prompt, **self._call_kwargs(kwargs, tried))
+            except Exception as e:
+                self._record_failure(member, e)
+                if getattr(e, "status_code", None) in REQUEST_ERROR_STATUSES or len(tried) == len(self.members):
+                    raise
+                logger.warning(f"Pool member '{member.name}' failed, failing over: {e}")
+                continue
+            finally:
+                # Cancellation (a timeout, a hedge that lost) is neither a success nor a failure.
+                self._release(member)
+            self._record_success(member, time.perf_counter() - started)
+            return response
+
+    def generate_stream(self, prompt: str, cache: Optional[Cache] = None, **kwargs) -> TextStream:
+        """
+        Stream a response from the best available member (no failover once a stream has started).
+        """
+        return self._pick([], reserve=False).client.generate_stream(prompt, cache=cache, **kwargs)
+
+    def agenerate_stream(self, prompt: str, cache: Optional[Cache] = None, **kwargs) -> AsyncTextStream:
+        """
+        Asynchronously stream a response from the best available member.
+        """
+        return self._pick([], reserve=False).client.agenerate_stream(prompt, cache=cache, **kwargs)
+
+    def get_token_count(self, text: str) -> int:
+        """
+        Count tokens with the first member's tokenizer.
+        """
+        return self.members[0].client.get_token_count(text)
+
+    def close(self):
+        """
+        Close every member's sync client.
+        """
+        for member in self.members:
+            member.client.close()
+
+    async def aclose(self):
+        """
+        Close every member's async client for the running event loop.
+        """
+        for member in self.members:
+            await member.client.aclose()
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """
+        Return per-member load, latency, quota and health statistics.
+        """
+        with self.lock:
+            now = time.monotonic()
+            return [member.stats(now) for member in self.members]
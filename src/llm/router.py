@@ -0,0 +1,258 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Deque, Dict, List, Optional
+
+from src.llm.base import BaseLLMClient
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class LatencyTracker:
+    """
+    Rolling window of recent call latencies for one client.
+    """
+
+    def __init__(self, window: int = 200):
+        self.samples: Deque[float] = deque(maxlen=window)
+        self.lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self.lock:
+            self.samples.append(seconds)
+
+    def percentile(self, q: float, min_samples: int = 1) -> Optional[float]:
+        """
+        Return the q-th percentile (0-100) of the window, or None with fewer than `min_samples` samples.
+        """
+        with self.lock:
+            if len(self.samples) < max(1, min_samples):
+                return None
+            ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q / 100))]
+
+
+class RouterClient(BaseLLMClient):
+    """
+    Client that routes each request across several providers to cut tail latency.
+
+    The primary client gets the request first. If it has not answered within
+    its rolling `hedge_percentile` latency, one hedged request goes to the next
+    client, the first successful response wins and the other call is
+    cancelled. If a call fails, the request fails over to the next client
+    straight away. Only the last client in the order retries, so errors are
+    not delayed by backoff when another provider is available.
+
+    Keyword arguments are passed to every client, so leave out
+    provider-specific ones such as `model`. Cancelling a losing call only
+    stops it on the async path; with generate() the losing thread runs to
+    completion in the background and its result is discarded.
+    """
+
+    provider = "router"
+
+    def __init__(self, clients: List[BaseLLMClient], hedge: bool = True, hedge_percentile: float = 95,
+                 min_samples: int = 20, initial_hedge_delay: Optional[float] = None, window: int = 200,
+                 prefer_fastest: bool = False, max_workers: int = 32):
+        """
+        Initialize the router.
+
+        Args:
+            clients (List[BaseLLMClient]): Clients in priority order, e.g. [OpenAIClient(), ClaudeClient()].
+            hedge (bool): Send hedged requests when the primary is slow.
+            hedge_percentile (float): Latency percentile of the primary after which to hedge.
+            min_samples (int): Latency samples needed before the percentile is trusted.
+            initial_hedge_delay (float, optional): Hedge delay until then; None disables hedging meanwhile.
+            window (int): Number of recent latencies kept per client.
+            prefer_fastest (bool): Order clients by rolling median latency instead of list order.
+            max_workers (int): Threads used by the synchronous generate().
+        """
+        if not clients:
+            raise ValueError("RouterClient needs at least one client.")
+        self.clients = list(clients)
+        self.model = getattr(self.clients[0], "model", None)
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.min_samples = min_samples
+        self.initial_hedge_delay = initial_hedge_delay
+        self.prefer_fastest = prefer_fastest
+        self.latencies = [LatencyTracker(window) for _ in self.clients]
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="router")
+        self.counters = {"requests": 0, "hedges": 0, "hedge_wins": 0, "failovers": 0}
+        self.lock = threading.Lock()
+
+    def _count(self, name: str, amount: int = 1):
+        with self.lock:
+            self.counters[name] += amount
+
+    def _order(self) -> List[int]:
+        """Return client indices in the order they should be tried."""
+        indices = list(range(len(self.clients)))
+        if self.prefer_fastest:
+            # Clients without samples sort first so they get measured.
+            indices.sort(key=lambda i: self.latencies[i].percentile(50, self.min_samples) or 0.0)
+        return indices
+
+    def _hedge_delay(self, index: int) -> Optional[float]:
+        """Return how long to wait for a client before hedging, or None not to hedge."""
+        if not self.hedge:
+            return None
+        delay = self.latencies[index].percentile(self.hedge_percentile, self.min_samples)
+        return delay if delay is not None else self.initial_hedge_delay
+
+    def _call_kwargs(self, kwargs: Dict[str, Any], is_last: bool) -> Dict[str, Any]:
+        # Coalescing shields calls from cancellation, so it is turned off for hedged calls.
+        return {**kwargs, "retry": is_last and kwargs.get("retry", True), "coalesce": False}
+
+    def _finish(self, pending: Dict[Any, tuple]):
+        """Cancel the calls still in flight once a request is decided."""
+        for call, (index, position, started) in pending.items():
+            call.cancel()
+            # A primary that lost to a hedge took at least this long; recording
+            # it keeps a slow provider from looking fast.
+            if position == 0:
+                self.latencies[index].record(time.perf_counter() - started)
+
+    def generate(self, prompt: str, **kwargs) -> str:
+        """
+        Generate a response from the fastest healthy provider.
+        """
+        order = self._order()
+        self._count("requests")
+        pending: Dict[Future, tuple] = {}
+        errors: List[Exception] = []
+        launched = 0
+        # Position of the hedged call, once one is sent.
+        hedged: Optional[int] = None
+
+        def launch():
+            nonlocal launched
+            index = order[launched]
+            call_kwargs = self._call_kwargs(kwargs, launched == len(order) - 1)
+            future = self.executor.submit(self.clients[index].generate, prompt, **call_kwargs)
+            pending[future] = (index, launched, time.perf_counter())
+            launched += 1
+
+        launch()
+        try:
+            while pending:
+                timeout = None
+                if hedged is None and launched < len(order) and len(pending) == 1:
+                    # The call in flight: the primary, or the client we failed over to.
+                    timeout = self._hedge_delay(next(iter(pending.values()))[0])
+                done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    logger.info(f"Hedging request to client {order[launched]} after {timeout:.2f}s.")
+                    self._count("hedges")
+                    hedged = launched
+                    launch()
+                    continue
+                for future in done:
+                    index, position, started = pending.pop(future)
+                    error = future.exception()
+                    if error is None:
+                        self.latencies[index].record(time.perf_counter() - started)
+                        if position == hedged:
+                            self._count("hedge_wins")
+                        return future.result()
+                    errors.append(error)
+                if not pending and launched < len(order):
+                    logger.warning(f"Failing over to client {order[launched]} after error: {errors[-1]}")
+                    self._count("failovers")
+                    launch()
+        finally:
+            self._finish(pending)
+        raise errors[-1]
+
+    async def generate_async(self, prompt: str, **kwargs) -> str:
+        """
+        Asynchronously generate a response from the fastest healthy provider.
+        """
+        order = self._order()
+        self._count("requests")
+        pending: Dict["asyncio.Task[str]", tuple] = {}
+        errors: List[Exception] = []
+        launched = 0
+        # Position of the hedged call, once one is sent.
+        hedged: Optional[int] = None
+
+        def launch():
+            nonlocal launched
+            index = order[launched]
+            call_kwargs = self._call_kwargs(kwargs, launched == len(order) - 1)
+            task = asyncio.ensure_future(self.clients[index].generate_async(prompt, **call_kwargs))
+            pending[task] = (index, launched, time.perf_counter())
+            launched += 1
+
+        launch()
+        try:
+            while pending:
+                timeout = None
+                if hedged is None and launched < len(order) and len(pending) == 1:
+                    # The call in flight: the primary, or the client we failed over to.
+                    timeout = self._hedge_delay(next(iter(pending.values()))[0])
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    logger.info(f"Hedging request to client {order[launched]} after {timeout:.2f}s.")
+                    self._count("hedges")
+                    hedged = launched
+                    launch()
+                    continue
+                for task in done:
+                    index, position, started = pending.pop(task)
+                    error = task.exception()
+                    if error is None:
+                        self.latencies[index].record(time.perf_counter() - started)
+                        if position == hedged:
+                            self._count("hedge_wins")
+                        return task.result()
+                    errors.append(error)
+                if not pending and launched < len(order):
+                    logger.warning(f"Failing over to client {order[launched]} after error: {errors[-1]}")
+                    self._count("failovers")
+                    launch()
+        finally:
+            self._finish(pending)
+        raise errors[-1]
+
+    def get_token_count(self, text: str) -> int:
+        """
+        Count tokens with the primary client's tokenizer.
+        """
+        return self.clients[0].get_token_count(text)
+
+    def close(self):
+        """
+        Close every routed client's sync client and stop the hedging threads.
+
+        Calls still queued are cancelled; the router must not be used afterwards.
+        """
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        for client in self.clients:
+            client.close()
+
+    async def aclose(self):
+        """
+        Close every routed client's async client for the running event loop.
+        """
+        for client in self.clients:
+            await client.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return routing counters and per-client latency percentiles.
+        """
+        clients = []
+        for client, tracker in zip(self.clients, self.latencies):
+            clients.append({
+                "client": type(client).__name__,
+                "p50": tracker.percentile(50),
+                "p95": tracker.percentile(95),
+                "samples": len(tracker.samples),
+            })
+        with self.lock:
+            counters = dict(self.counters)
+        return {**counters, "clients": clients}
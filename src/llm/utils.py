@@ -1 +1,43 @@
+import hashlib
+import json
+from typing import Any, Dict, Optional
 
+
+def stable_hash(payload: Any) -> str:
+    """
+    Compute a hash of a JSON-serializable payload that is stable across processes.
+
+    Unlike the built-in ``hash()``, the result does not depend on hash
+    randomization, so it can be used for on-disk cache keys.
+
+    Args:
+        payload (Any): JSON-serializable data (dict keys are sorted before hashing).
+
+    Returns:
+        str: Hex digest of the canonical JSON encoding.
+    """
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def request_cache_key(provider: str, request: Dict[str, Any], base_url: Optional[str] = None) -> str:
+    """
+    Build a deterministic cache key for an LLM request.
+
+    The key covers the provider, the endpoint and every request parameter
+    (model, messages, system prompt, temperature, max_tokens, ...), so any
+    change to what would be sent, or where, produces a different key.
+
+    Args:
+        provider (str): Provider name, e.g. "openai" or "anthropic".
+        request (Dict[str, Any]): The request parameters sent to the provider.
+        base_url (str, optional): The API endpoint, if not the provider's default.
+
+    Returns:
+        str: A key of the form "<provider>:<sha256>".
+    """
+    payload: Dict[str, Any] = {"provider": provider, "request": request}
+    # Left out for the default endpoint, so those keys match the ones cached before base_url was hashed.
+    if base_url:
+        payload["base_url"] = base_url
+    return f"{provider}:{stable_hash(payload)}"
@@ -1 +1,237 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Union
 
+from src.llm.base import BaseLLMClient
+from src.prompt_engineering.templates import PromptTemplate
+from src.utils.cache import Cache
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+PromptSpec = Union[str, PromptTemplate, Callable[[Dict[str, Any]], str]]
+
+
+@dataclass
+class Step:
+    """
+    One LLM call in a chain.
+
+    `prompt` is a template whose `{name}` placeholders are filled from the
+    chain inputs and the outputs of the steps in `depends_on`, or a function
+    that receives those values and returns the prompt.
+    """
+    name: str
+    prompt: PromptSpec
+    depends_on: List[str] = field(default_factory=list)
+    client: Optional[BaseLLMClient] = None
+    params: Dict[str, Any] = field(default_factory=dict)
+
+    def render(self, values: Dict[str, Any]) -> str:
+        if callable(self.prompt) and not isinstance(self.prompt, PromptTemplate):
+            return self.prompt(values)
+        return self.prompt.render(**values)
+
+
+@dataclass
+class StepResult:
+    """
+    Outcome and timing of one step; times are seconds since the chain started.
+    """
+    name: str
+    output: Optional[str] = None
+    error: Optional[Exception] = None
+    cached: bool = False
+    started: float = 0.0
+    finished: float = 0.0
+
+    @property
+    def duration(self) -> float:
+        return self.finished - self.started
+
+    @property
+    def success(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class ChainResult:
+    """
+    Outputs and per-step timings of a chain run.
+    """
+    steps: Dict[str, StepResult]
+    dependencies: Dict[str, List[str]]
+    elapsed: float
+
+    @property
+    def outputs(self) -> Dict[str, Optional[str]]:
+        return {name: result.output for name, result in self.steps.items()}
+
+    @property
+    def success(self) -> bool:
+        return all(result.success for result in self.steps.values())
+
+    def critical_path(self) -> List[str]:
+        """
+        Return the chain of steps that determined the total run time.
+
+        Starts from the step that finished last and walks back through the
+        dependency each step waited on longest.
+        """
+        if not self.steps:
+            return []
+        path = [max(self.steps.values(), key=lambda r: r.finished).name]
+        while self.dependencies[path[-1]]:
+            path.append(max(self.dependencies[path[-1]], key=lambda d: self.steps[d].finished))
+        return path[::-1]
+
+    def summary(self) -> str:
+        """Return a table of step timings with the critical path marked."""
+        critical = set(self.critical_path())
+        lines = [f"{'step':<24} {'start':>8} {'duration':>9}  status"]
+        for result in sorted(self.steps.values(), key=lambda r: r.started):
+            status = "cached" if result.cached else ("ok" if result.success else f"error: {result.error}")
+            marker = " *" if result.name in critical else ""
+            lines.append(f"{result.name:<24} {result.started:>7.2f}s {result.duration:>8.2f}s  {status}{marker}")
+        lines.append(f"total {self.elapsed:.2f}s; * = critical path")
+        return "\n".join(lines)
+
+
+class PromptChain:
+    """
+    DAG of prompt steps executed concurrently on asyncio.
+
+    Each step starts as soon as the steps it depends on have finished, so
+    independent branches run in parallel. With a `cache`, every step's output
+    is memoized under a hash of its model request (rendered prompt, model and
+    parameters). Re-running a chain after editing one step only calls the
+    LLM for that step and for the steps whose inputs changed as a result.
+    """
+
+    def __init__(self, client: BaseLLMClient, cache: Optional[Cache] = None, concurrency: Optional[int] = None):
+        """
+        Initialize the chain.
+
+        Args:
+            client (BaseLLMClient): Default client for the steps.
+            cache (Cache, optional): Cache for step outputs.
+            concurrency (int, optional): Maximum number of steps calling the LLM at once.
+        """
+        self.client = client
+        self.cache = cache
+        self.concurrency = concurrency
+        self.steps: Dict[str, Step] = {}
+
+    def add_step(self, name: str, prompt: PromptSpec, depends_on: Optional[List[str]] = None,
+                 client: Optional[BaseLLMClient] = None, **params) -> "PromptChain":
+        """
+        Add a step.
+
+        Args:
+            name (str): Unique step name; later steps refer to its output by this name.
+            prompt: Template text, PromptTemplate, or function of the input values.
+            depends_on (List[str], optional): Steps whose outputs this step needs.
+            client (BaseLLMClient, optional): Client for this step; the chain's default if omitted.
+            **params: Additional parameters passed to generate_async() (temperature, max_tokens, etc.).
+
+        Returns:
+            PromptChain: The chain, for chaining calls.
+        """
+        if name in self.steps:
+            raise ValueError(f"Duplicate step name '{name}'.")
+        if isinstance(prompt, str):
+            prompt = PromptTemplate(name, prompt)
+        self.steps[name] = Step(name, prompt, list(depends_on or []), client, params)
+        return self
+
+    def _order(self) -> List[str]:
+        """Return the steps in dependency order, validating the graph."""
+        order, state = [], {}
+
+        def visit(name: str, trail: List[str]):
+            if state.get(name) == "done":
+                return
+            if state.get(name) == "visiting":
+                raise ValueError(f"Cycle in chain: {' -> '.join(trail + [name])}")
+            state[name] = "visiting"
+            for dep in self.steps[name].depends_on:
+                if dep not in self.steps:
+                    raise ValueError(f"Step '{name}' depends on unknown step '{dep}'.")
+                visit(dep, trail + [name])
+            state[name] = "done"
+            order.append(name)
+
+        for name in self.steps:
+            visit(name, [])
+        return order
+
+    def _cache_key(self, client: BaseLLMClient, prompt: str, params: Dict[str, Any]) -> str:
+        return f"chain:{client._cache_key(client._build_request(prompt, **params))}"
+
+    async def _run_step(self, step: Step, inputs: Dict[str, Any], tasks: Dict[str, "asyncio.Task[StepResult]"],
+                        semaphore: Optional[asyncio.Semaphore], start: float) -> StepResult:
+        deps = [await tasks[dep] for dep in step.depends_on]
+        result = StepResult(step.name, started=time.perf_counter() - start)
+        failed = [dep.name for dep in deps if not dep.success]
+        if failed:
+            result.error = RuntimeError(f"Skipped: dependency {', '.join(failed)} failed")
+            result.finished = result.started
+            return result
+
+        client = step.client or self.client
+        try:
+            values = {**inputs, **{dep.name: dep.output for dep in deps}}
+            prompt = step.render(values)
+            key = self._cache_key(client, prompt, step.params) if self.cache is not None else None
+            cached = self.cache.get(key) if key is not None else None
+            if cached is not None:
+                result.output, result.cached = cached, True
+            else:
+                if semaphore is not None:
+                    async with semaphore:
+                        result.started = time.perf_counter() - start
+                        result.output = await client.generate_async(prompt, **step.params)
+                else:
+                    result.output = await client.generate_async(prompt, **step.params)
+                if key is not None:
+                    self.cache.set(key, result.output)
+        except Exception as e:
+            logger.error(f"Chain step '{step.name}' failed: {e}")
+            result.error = e
+        result.finished = time.perf_counter() - start
+        return result
+
+    async def run_async(self, inputs: Optional[Dict[str, Any]] = None) -> ChainResult:
+        """
+        Run the chain.
+
+        Args:
+            inputs (Dict[str, Any], optional): Values for placeholders that are not step names.
+
+        Returns:
+            ChainResult: Outputs and timings. Failed steps (and the steps that
+            depend on them) carry their error instead of an output.
+        """
+        order = self._order()
+        inputs = dict(inputs or {})
+        semaphore = asyncio.Semaphore(self.concurrency) if self.concurrency else None
+        start = time.perf_counter()
+        tasks: Dict[str, "asyncio.Task[StepResult]"] = {}
+        for name in order:
+            tasks[name] = asyncio.ensure_future(self._run_step(self.steps[name], inputs, tasks, semaphore, start))
+        results = await asyncio.gather(*tasks.values())
+        elapsed = time.perf_counter() - start
+        cached = sum(1 for r in results if r.cached)
+        logger.info(f"Chain finished in {elapsed:.2f}s ({len(results)} steps, {cached} from cache).")
+        return ChainResult(
+            steps={r.name: r for r in results},
+            dependencies={name: step.depends_on for name, step in self.steps.items()},
+            elapsed=elapsed,
+        )
+
+    def run(self, inputs: Optional[Dict[str, Any]] = None) -> ChainResult:
+        """
+        Run the chain from synchronous code.
+        """
+        return asyncio.run(self.run_async(inputs))
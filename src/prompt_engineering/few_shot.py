@@ -1 +1,225 @@
+import json
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
 
+import numpy as np
+
+from src.prompt_engineering.templates import PromptTemplate
+from src.utils.logger import setup_logger
+from src.utils.token_counter import get_token_counter
+
+logger = setup_logger(__name__)
+
+_TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokenizer used for indexing and queries."""
+    return _TOKEN.findall(text.lower())
+
+
+class BM25Index:
+    """
+    Okapi BM25 index stored as a compressed sparse inverted index in NumPy arrays.
+
+    Each term's posting list holds document ids and precomputed BM25 weights,
+    so scoring a query is one vectorized add per query term followed by a
+    partial sort. Posting lists are ordered by weight, and only the first
+    `max_postings` of each are scored. That bounds the cost of very common
+    terms, which add little to the ranking anyway. The arrays can be saved as
+    .npy files and memory-mapped back.
+    """
+
+    def __init__(self, vocab: Dict[str, int], indptr: np.ndarray, doc_ids: np.ndarray,
+                 weights: np.ndarray, num_docs: int, max_postings: Optional[int] = 2048):
+        self.vocab = vocab
+        self.indptr = indptr
+        self.doc_ids = doc_ids
+        self.weights = weights
+        self.num_docs = num_docs
+        self.max_postings = max_postings
+
+    @classmethod
+    def build(cls, texts: Sequence[str], k1: float = 1.5, b: float = 0.75, **kwargs) -> "BM25Index":
+        """
+        Build an index over a list of texts.
+
+        Args:
+            texts (Sequence[str]): Documents to index.
+            k1 (float): Term-frequency saturation.
+            b (float): Length normalization.
+            **kwargs: Query options (max_postings).
+        """
+        vocab: Dict[str, int] = {}
+        term_ids, doc_ids, tfs = [], [], []
+        lengths = np.zeros(len(texts), dtype=np.float32)
+        for doc_id, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            lengths[doc_id] = sum(counts.values())
+            for term, tf in counts.items():
+                term_ids.append(vocab.setdefault(term, len(vocab)))
+                doc_ids.append(doc_id)
+                tfs.append(tf)
+
+        term_ids = np.asarray(term_ids, dtype=np.int64)
+        doc_ids = np.asarray(doc_ids, dtype=np.int32)
+        tfs = np.asarray(tfs, dtype=np.float32)
+
+        df = np.bincount(term_ids, minlength=len(vocab)).astype(np.float32)
+        n = len(texts)
+        idf = np.log1p((n - df + 0.5) / (df + 0.5))
+        avg_length = lengths.mean() if n else 0.0
+        norm = k1 * (1 - b + b * lengths[doc_ids] / max(avg_length, 1e-9))
+        weights = (idf[term_ids] * tfs * (k1 + 1) / (tfs + norm)).astype(np.float32)
+
+        # Group postings by term, highest weight first within each term.
+        order = np.lexsort((-weights, term_ids))
+        indptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum(df, out=indptr[1:])
+        return cls(vocab, indptr, doc_ids[order], weights[order], n, **kwargs)
+
+    def scores(self, query: str) -> np.ndarray:
+        """Return the BM25 score of every document for a query."""
+        scores = np.zeros(self.num_docs, dtype=np.float32)
+        for term in set(tokenize(query)):
+            term_id = self.vocab.get(term)
+            if term_id is None:
+                continue
+            start, end = self.indptr[term_id], self.indptr[term_id + 1]
+            if self.max_postings is not None:
+                end = min(end, start + self.max_postings)
+            # Document ids are unique within a posting list, so a plain add is safe.
+            scores[self.doc_ids[start:end]] += self.weights[start:end]
+        return scores
+
+    def top(self, query: str, n: int) -> List[int]:
+        """Return the ids of the `n` best-scoring documents with a positive score, best first."""
+        scores = self.scores(query)
+        n = min(n, self.num_docs)
+        if n <= 0:
+            return []
+        candidates = np.argpartition(-scores, n - 1)[:n] if n < self.num_docs else np.arange(self.num_docs)
+        candidates = candidates[scores[candidates] > 0]
+        return candidates[np.argsort(-scores[candidates], kind="stable")].tolist()
+
+    def save(self, path: Path):
+        np.save(path / "indptr.npy", self.indptr)
+        np.save(path / "doc_ids.npy", self.doc_ids)
+        np.save(path / "weights.npy", self.weights)
+        (path / "vocab.json").write_text(json.dumps(self.vocab), encoding="utf-8")
+
+    @classmethod
+    def load(cls, path: Path, num_docs: int, mmap: bool = True, **kwargs) -> "BM25Index":
+        mode = "r" if mmap else None
+        vocab = json.loads((path / "vocab.json").read_text(encoding="utf-8"))
+        return cls(vocab, np.load(path / "indptr.npy", mmap_mode=mode), np.load(path / "doc_ids.npy", mmap_mode=mode),
+                   np.load(path / "weights.npy", mmap_mode=mode), num_docs, **kwargs)
+
+
+class FewShotSelector:
+    """
+    Picks the most relevant few-shot examples for a query under a token budget.
+
+    Examples are dicts rendered with `example_template`. Their `text_key`
+    field is indexed with BM25, and each rendered example's token count is
+    computed once at build time. A selection is one index lookup plus a
+    greedy pass that takes examples in relevance order while they fit the
+    budget.
+    """
+
+    def __init__(self, examples: List[Dict[str, Any]], text_key: str = "input",
+                 example_template: str = "Input: {input}\nOutput: {output}", model: str = "gpt-4o",
+                 index: Optional[BM25Index] = None, token_counts: Optional[np.ndarray] = None):
+        """
+        Build (or wrap a loaded) selector.
+
+        Args:
+            examples (List[Dict[str, Any]]): Example records.
+            text_key (str): Field matched against queries.
+            example_template (str): Template used to render each example.
+            model (str): Model whose tokenizer sizes the examples.
+            index (BM25Index, optional): Prebuilt index (used by load()).
+            token_counts (np.ndarray, optional): Precomputed token counts (used by load()).
+        """
+        self.examples = examples
+        self.text_key = text_key
+        self.template = PromptTemplate("few_shot_example", example_template)
+        self.model = model
+        self.index = index or BM25Index.build([str(e.get(text_key, "")) for e in examples])
+        if token_counts is None:
+            token_counts = np.asarray(get_token_counter(model).count_many(self.format_example(e) for e in examples),
+                                      dtype=np.int32)
+        self.token_counts = token_counts
+
+    def format_example(self, example: Dict[str, Any]) -> str:
+        return self.template.render(**example)
+
+    def select(self, query: str, k: int = 3, max_tokens: Optional[int] = None,
+               candidates: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Return up to `k` relevant examples, most relevant first, fitting `max_tokens`.
+
+        Args:
+            query (str): The input to find examples for.
+            k (int): Maximum number of examples.
+            max_tokens (int, optional): Token budget for the rendered examples.
+            candidates (int, optional): How many top-ranked examples to consider
+                when packing (defaults to 4 * k).
+
+        Returns:
+            List[Dict[str, Any]]: The selected examples.
+        """
+        ranked = self.index.top(query, candidates or 4 * k)
+        selected, used = [], 0
+        for doc_id in ranked:
+            cost = int(self.token_counts[doc_id])
+            if max_tokens is not None and used + cost > max_tokens:
+                continue
+            selected.append(self.examples[doc_id])
+            used += cost
+            if len(selected) == k:
+                break
+        return selected
+
+    def build_prompt(self, query: str, k: int = 3, max_tokens: Optional[int] = None,
+                     instruction: str = "") -> str:
+        """
+        Build a few-shot prompt: the instruction, the selected examples, then the query.
+
+        The query is rendered with the example template and an empty `output`.
+        """
+        shots = [self.format_example(e) for e in self.select(query, k, max_tokens)]
+        final = self.format_example({**{f: "" for f in self.template.variables}, self.text_key: query}).rstrip()
+        return "\n\n".join(part for part in (instruction, *shots, final) if part)
+
+    def save(self, path: str):
+        """
+        Save the examples, index and token counts to a directory.
+        """
+        directory = Path(path)
+        directory.mkdir(parents=True, exist_ok=True)
+        self.index.save(directory)
+        np.save(directory / "token_counts.npy", self.token_counts)
+        with open(directory / "examples.jsonl", "w", encoding="utf-8") as f:
+            for example in self.examples:
+                f.write(json.dumps(example) + "\n")
+        meta = {"text_key": self.text_key, "example_template": self.template.template,
+                "model": self.model, "count": len(self.examples)}
+        (directory / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+        logger.info(f"Saved few-shot index with {len(self.examples)} examples to {path}.")
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "FewShotSelector":
+        """
+        Load a saved selector, memory-mapping the index arrays.
+        """
+        directory = Path(path)
+        meta = json.loads((directory / "meta.json").read_text(encoding="utf-8"))
+        with open(directory / "examples.jsonl", "r", encoding="utf-8") as f:
+            examples = [json.loads(line) for line in f]
+        index = BM25Index.load(directory, len(examples), mmap=mmap)
+        token_counts = np.load(directory / "token_counts.npy", mmap_mode="r" if mmap else None)
+        return cls(examples, meta["text_key"], meta["example_template"], meta["model"],
+                   index=index, token_counts=token_counts)
@@ -1 +1,251 @@
+import threading
+from string import Formatter
+from typing import Any, Dict, List, Optional, Tuple
 
+from src.utils.logger import setup_logger
+from src.utils.token_counter import get_token_counter
+
+logger = setup_logger(__name__)
+
+_registries: Dict[str, "TemplateRegistry"] = {}
+_registry_lock = threading.Lock()
+
+
+class PromptTemplate:
+    """
+    A prompt template compiled once into a render function.
+
+    Templates use `{name}` placeholders (`{{` and `}}` for literal braces).
+    They are parsed and validated at load time. Rendering is then a single
+    C-level `str.format_map` call, with no parsing.
+    """
+
+    def __init__(self, name: str, template: str, system: Optional[str] = None,
+                 defaults: Optional[Dict[str, Any]] = None, variables: Optional[List[str]] = None,
+                 description: str = ""):
+        """
+        Compile and validate a template.
+
+        Args:
+            name (str): Template name.
+            template (str): Template text with `{name}` placeholders.
+            system (str, optional): System prompt to send with the rendered prompt.
+            defaults (Dict[str, Any], optional): Default values for variables.
+            variables (List[str], optional): Declared variables; if given, the
+                placeholders must match them exactly.
+            description (str): Human-readable description.
+
+        Raises:
+            ValueError: If the template is malformed or its variables do not validate.
+        """
+        self.name = name
+        self.template = template
+        self.system = system
+        self.description = description
+        self.defaults = dict(defaults or {})
+
+        literals, fields = self._parse(name, template)
+        self.literals: Tuple[str, ...] = tuple(literals)
+        # Placeholders in order of appearance (a variable may appear several times).
+        self.fields: Tuple[str, ...] = tuple(fields)
+        self.variables = frozenset(fields)
+        self.required = self.variables - set(self.defaults)
+
+        if variables is not None and set(variables) != self.variables:
+            raise ValueError(f"Template '{name}' declares variables {sorted(variables)} "
+                             f"but uses {sorted(self.variables)}.")
+        unknown = set(self.defaults) - self.variables
+        if unknown:
+            raise ValueError(f"Template '{name}' has defaults for unused variables {sorted(unknown)}.")
+
+        # Literal braces are re-escaped so the compiled string is safe for format_map.
+        escaped = [literal.replace("{", "{{").replace("}", "}}") for literal in literals]
+        compiled = "".join(lit + "{" + field + "}" for lit, field in zip(escaped, fields)) + escaped[-1]
+        self._format_map = compiled.format_map
+        self._static_tokens: Dict[str, int] = {}
+
+    @staticmethod
+    def _parse(name: str, template: str) -> Tuple[List[str], List[str]]:
+        """Split a template into literal parts and placeholder names."""
+        literals, fields = [], []
+        pending = ""
+        try:
+            parsed = list(Formatter().parse(template))
+        except ValueError as e:
+            raise ValueError(f"Template '{name}' is malformed: {e}") from None
+        for literal, field, spec, conversion in parsed:
+            pending += literal
+            if field is None:
+                continue
+            if not field.isidentifier() or spec or conversion:
+                raise ValueError(f"Template '{name}' has an invalid placeholder '{{{field}}}'; "
+                                 "only plain {name} placeholders are supported.")
+            literals.append(pending)
+            fields.append(field)
+            pending = ""
+        literals.append(pending)
+        return literals, fields
+
+    def render(self, **values: Any) -> str:
+        """
+        Render the template.
+
+        Args:
+            **values: Variable values; defaults fill in missing ones.
+
+        Returns:
+            str: The rendered prompt.
+
+        Raises:
+            KeyError: If a required variable is missing.
+        """
+        if self.defaults:
+            values = {**self.defaults, **values}
+        try:
+            return self._format_map(values)
+        except KeyError as e:
+            raise KeyError(f"Template '{self.name}' is missing variable {e}") from None
+
+    def static_tokens(self, model: str = "gpt-4o") -> int:
+        """
+        Return the token count of the template's literal text, counted once per model.
+        """
+        count = self._static_tokens.get(model)
+        if count is None:
+            count = sum(get_token_counter(model).count_many(self.literals))
+            self._static_tokens[model] = count
+        return count
+
+    def count_tokens(self, model: str = "gpt-4o", **values: Any) -> int:
+        """
+        Estimate the token count of the rendered prompt without tokenizing it.
+
+        Adds the cached static count to the counts of the (memoized) variable
+        values, so it can differ from an exact count by a token or so at each
+        placeholder boundary.
+
+        Args:
+            model (str): Model whose tokenizer to use.
+            **values: Variable values; defaults fill in missing ones.
+
+        Returns:
+            int: The estimated number of tokens.
+        """
+        if self.defaults:
+            values = {**self.defaults, **values}
+        counts = get_token_counter(model).count_many(str(values[field]) for field in self.fields)
+        return self.static_tokens(model) + sum(counts)
+
+    def __call__(self, **values: Any) -> str:
+        return self.render(**values)
+
+    def __repr__(self) -> str:
+        return f"PromptTemplate(name={self.name!r}, variables={sorted(self.variables)})"
+
+
+class TemplateRegistry:
+    """
+    Named prompt templates loaded from a YAML file.
+
+    The file is parsed once and every template is compiled and validated at
+    load time, so a broken template fails at startup rather than mid-batch.
+    Expected format:
+
+        templates:
+          summarize:
+            description: Summarize a text
+            system: You are a concise assistant.
+            template: "Summarize in {max_words} words:\\n{text}"
+            defaults:
+              max_words: 100
+    """
+
+    def __init__(self, path: Optional[str] = "config/prompt_templates.yaml"):
+        """
+        Args:
+            path (str, optional): YAML file to load; None for an empty registry.
+        """
+        self.path = path
+        self.templates: Dict[str, PromptTemplate] = {}
+        if path:
+            self.load(path)
+
+    def load(self, path: str):
+        """
+        Load (or reload) templates from a YAML file.
+
+        Raises:
+            ValueError: If the file or any template in it is invalid.
+        """
+        import yaml
+
+        with open(path, "r", encoding="utf-8") as f:
+            data = yaml.safe_load(f) or {}
+        entries = data.get("templates", {}) if isinstance(data, dict) else None
+        if not isinstance(entries, dict):
+            raise ValueError(f"{path} must contain a 'templates' mapping.")
+        templates = {}
+        for name, spec in entries.items():
+            if isinstance(spec, str):
+                spec = {"template": spec}
+            if not isinstance(spec, dict) or "template" not in spec:
+                raise ValueError(f"Template '{name}' in {path} has no 'template' text.")
+            templates[name] = PromptTemplate(
+                name,
+                spec["template"],
+                system=spec.get("system"),
+                defaults=spec.get("defaults"),
+                variables=spec.get("variables"),
+                description=spec.get("description", ""),
+            )
+        self.templates = templates
+        logger.info(f"Loaded {len(templates)} prompt templates from {path}.")
+
+    def register(self, template: PromptTemplate):
+        """Add or replace a template."""
+        self.templates[template.name] = template
+
+    def get(self, name: str) -> PromptTemplate:
+        """
+        Return a template by name.
+
+        Raises:
+            KeyError: If no template has that name.
+        """
+        try:
+            return self.templates[name]
+        except KeyError:
+            raise KeyError(f"Unknown prompt template '{name}'. Available: {sorted(self.templates)}") from None
+
+    def render(self, name: str, **values: Any) -> str:
+        """Render the named template."""
+        return self.get(name).render(**values)
+
+    def names(self) -> List[str]:
+        return sorted(self.templates)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.templates
+
+    def __len__(self) -> int:
+        return len(self.templates)
+
+
+def get_registry(path: str = "config/prompt_templates.yaml") -> TemplateRegistry:
+    """
+    Return the shared registry for a templates file, loading it on first use.
+    """
+    registry = _registries.get(path)
+    if registry is None:
+        with _registry_lock:
+            registry = _registries.get(path)
+            if registry is None:
+                registry = _registries[path] = TemplateRegistry(path)
+    return registry
+
+
+def render(name: str, **values: Any) -> str:
+    """
+    Render a template from the default registry.
+    """
+    return get_registry().render(name, **values)
@@ -1,50 +1,466 @@
 import json
+import logging
 import hashlib
 import os
-from typing import Optional, Any
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Optional, Any, Dict, Iterable, Iterator, List, Tuple
 from pathlib import Path
 from src.utils.logger import setup_logger
+from src.utils.metrics import registry
 
 logger = setup_logger(__name__)
 
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    expires_at REAL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_entries_accessed_at ON entries(accessed_at);
+CREATE INDEX IF NOT EXISTS idx_entries_expires_at ON entries(expires_at);
+CREATE TABLE IF NOT EXISTS stats (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    total_size INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO stats (id, total_size) VALUES (0, 0);
+CREATE TRIGGER IF NOT EXISTS entries_after_insert AFTER INSERT ON entries BEGIN
+    UPDATE stats SET total_size = total_size + NEW.size WHERE id = 0;
+END;
+CREATE TRIGGER IF NOT EXISTS entries_after_delete AFTER DELETE ON entries BEGIN
+    UPDATE stats SET total_size = total_size - OLD.size WHERE id = 0;
+END;
+CREATE TRIGGER IF NOT EXISTS entries_after_update AFTER UPDATE OF size ON entries BEGIN
+    UPDATE stats SET total_size = total_size - OLD.size + NEW.size WHERE id = 0;
+END;
+"""
+
+# SQLite's default limit on host parameters per statement.
+_MAX_PARAMS = 900
+
+
+@dataclass
+class CacheStats:
+    """
+    Counters for a single cache tier.
+    """
+    hits: int = 0
+    misses: int = 0
+    sets: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def as_dict(self) -> Dict[str, float]:
+        data = asdict(self)
+        data["hit_ratio"] = self.hit_ratio
+        return data
+
+
 class Cache:
     """
-    Simple file-based cache mechanism.
+    Single-file cache backed by SQLite in WAL mode.
+
+    All entries live in one database file, so lookups are a single indexed
+    query instead of a stat + open per key. Writes are transactional and safe
+    to share between threads and processes. The cache can optionally be
+    bounded by total value size (least recently used entries are evicted
+    first) and entries can expire after a TTL.
     """
-    
-    def __init__(self, cache_dir: str = "data/cache"):
+
+    def __init__(self, cache_dir: str = "data/cache", max_size_bytes: Optional[int] = None,
+                 ttl: Optional[float] = None, db_name: str = "cache.db", touch_interval: float = 60.0):
+        """
+        Initialize the cache.
+
+        Args:
+            cache_dir (str): Directory holding the cache database.
+            max_size_bytes (int, optional): Upper bound on the total size of stored values.
+            ttl (float, optional): Default time-to-live in seconds for new entries.
+            db_name (str): File name of the database inside `cache_dir`.
+            touch_interval (float): Seconds a hit leaves an entry's access time alone before
+                refreshing it. Eviction order is only as fine as this, but hot keys don't
+                turn every read into a write.
+        """
         self.cache_dir = Path(cache_dir)
         self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.cache_dir / db_name
+        self.max_size_bytes = max_size_bytes
+        self.ttl = ttl
+        self.touch_interval = touch_interval
+        self.stats = CacheStats()
+        self._stats_lock = threading.Lock()
+        registry.track_cache(self, str(self.db_path))
+        self._local = threading.local()
+        self._connect().executescript(f"BEGIN IMMEDIATE;{_SCHEMA}COMMIT;")
+
+    def _connect(self) -> sqlite3.Connection:
+        """Return this thread's connection, reopening it after a fork."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run statements in a write transaction that other processes wait on."""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
 
     def _get_cache_key(self, key: str) -> str:
-        """Generate a hashed filename for the cache key."""
+        """Generate a hashed identifier for the cache key."""
         return hashlib.md5(key.encode('utf-8')).hexdigest()
 
     def get(self, key: str) -> Optional[Any]:
         """Retrieve a value from the cache."""
-        cache_file = self.cache_dir / f"{self._get_cache_key(key)}.json"
-        if cache_file.exists():
-            try:
-                with open(cache_file, 'r') as f:
-                    data = json.load(f)
-                logger.debug(f"Cache hit for key: {key[:20]}...")
-                return data['value']
-            except Exception as e:
-                logger.error(f"Error reading cache: {e}")
-        return None
-
-    def set(self, key: str, value: Any):
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """
+        Retrieve several values with one query per chunk of keys.
+
+        Returns:
+            Dict[str, Any]: Values for the keys that were found and not expired.
+        """
+        hashed = {self._get_cache_key(key): key for key in keys}
+        if not hashed:
+            return {}
+
+        now = time.time()
+        found: Dict[str, Any] = {}
+        expired: List[str] = []
+        stale: List[str] = []
+        ids = list(hashed)
+        try:
+            conn = self._connect()
+            for start in range(0, len(ids), _MAX_PARAMS):
+                chunk = ids[start:start + _MAX_PARAMS]
+                rows = conn.execute(
+                    f"SELECT key, value, expires_at, accessed_at FROM entries "
+                    f"WHERE key IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                for hashed_key, value, expires_at, accessed_at in rows:
+                    if expires_at is not None and expires_at <= now:
+                        expired.append(hashed_key)
+                    else:
+                        found[hashed[hashed_key]] = json.loads(value)
+                        if now - accessed_at >= self.touch_interval:
+                            stale.append(hashed_key)
+
+            if expired:
+                self._delete_hashed(expired)
+            # Access times only matter when there is a size bound to enforce, and
+            # only need refreshing once they are older than the touch interval.
+            if stale and self.max_size_bytes is not None:
+                with self._transaction() as conn:
+                    conn.executemany(
+                        "UPDATE entries SET accessed_at = ? WHERE key = ?",
+                        [(now, hashed_key) for hashed_key in stale],
+                    )
+        except Exception as e:
+            logger.error(f"Error reading cache: {e}")
+            return {}
+
+        with self._stats_lock:
+            self.stats.hits += len(found)
+            self.stats.misses += len(hashed) - len(found)
+        if logger.isEnabledFor(logging.DEBUG):
+            for key in found:
+                logger.debug("Cache hit for key: %.20s...", key)
+        return found
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
         """Save a value to the cache."""
-        cache_file = self.cache_dir / f"{self._get_cache_key(key)}.json"
+        self.set_many({key: value}, ttl=ttl)
+        logger.debug("Cache set for key: %.20s...", key)
+
+    def set_many(self, items: Dict[str, Any], ttl: Optional[float] = None):
+        """
+        Save several values in a single transaction.
+
+        Args:
+            items (Dict[str, Any]): JSON-serializable values by key.
+            ttl (float, optional): Time-to-live in seconds; defaults to the cache's `ttl`.
+        """
+        if not items:
+            return
+        now = time.time()
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = now + ttl if ttl is not None else None
         try:
-            with open(cache_file, 'w') as f:
-                json.dump({'value': value}, f)
-            logger.debug(f"Cache set for key: {key[:20]}...")
+            rows = []
+            for key, value in items.items():
+                encoded = json.dumps(value)
+                rows.append((self._get_cache_key(key), encoded, len(encoded), expires_at, now))
+            with self._transaction() as conn:
+                conn.executemany(
+                    "INSERT INTO entries (key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET value = excluded.value, size = excluded.size, "
+                    "expires_at = excluded.expires_at, accessed_at = excluded.accessed_at",
+                    rows,
+                )
+                if self.max_size_bytes is not None:
+                    self._evict(conn, now)
+            with self._stats_lock:
+                self.stats.sets += len(rows)
         except Exception as e:
             logger.error(f"Error writing to cache: {e}")
 
+    def delete(self, key: str):
+        """Remove a value from the cache."""
+        self._delete_hashed([self._get_cache_key(key)])
+
+    def _delete_hashed(self, hashed_keys: List[str]):
+        with self._transaction() as conn:
+            conn.executemany("DELETE FROM entries WHERE key = ?", [(k,) for k in hashed_keys])
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        """Drop expired entries, then least recently used ones, until under the size bound."""
+        total = conn.execute("SELECT total_size FROM stats WHERE id = 0").fetchone()[0]
+        if total <= self.max_size_bytes:
+            return
+        conn.execute("DELETE FROM entries WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+        excess = conn.execute("SELECT total_size FROM stats WHERE id = 0").fetchone()[0] - self.max_size_bytes
+        evicted = 0
+        while excess > 0:
+            rows = conn.execute("SELECT key, size FROM entries ORDER BY accessed_at LIMIT 64").fetchall()
+            if not rows:
+                break
+            victims = []
+            for hashed_key, size in rows:
+                victims.append((hashed_key,))
+                excess -= size
+                if excess <= 0:
+                    break
+            conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+            evicted += len(victims)
+        with self._stats_lock:
+            self.stats.evictions += evicted
+        if evicted:
+            logger.debug("Evicted %d cache entries to stay under %d bytes.", evicted, self.max_size_bytes)
+
+    def purge_expired(self) -> int:
+        """
+        Delete all expired entries.
+
+        Returns:
+            int: Number of entries removed.
+        """
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "DELETE FROM entries WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),)
+            )
+        return cursor.rowcount
+
+    @property
+    def size_bytes(self) -> int:
+        """Total size of the stored values in bytes."""
+        return self._connect().execute("SELECT total_size FROM stats WHERE id = 0").fetchone()[0]
+
+    def __len__(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
     def clear(self):
-        """Clear all cache files."""
-        for file in self.cache_dir.glob("*.json"):
-            file.unlink()
+        """Remove every entry from the cache."""
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM entries")
         logger.info("Cache cleared.")
+
+    def close(self):
+        """Close the calling thread's database connection."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class MemoryCache:
+    """
+    Thread-safe in-process LRU cache bounded by entry count and approximate size.
+
+    Lookups are a dictionary access under a lock, with no I/O, hashing of the
+    key beyond Python's own, or deserialization. Values are stored as-is, so
+    callers should not mutate objects they get back.
+    """
+
+    def __init__(self, max_entries: int = 10000, max_bytes: int = 64 * 1024 * 1024,
+                 ttl: Optional[float] = None):
+        """
+        Initialize the memory cache.
+
+        Args:
+            max_entries (int): Maximum number of entries kept.
+            max_bytes (int): Maximum approximate total size of the stored values.
+            ttl (float, optional): Default time-to-live in seconds for new entries.
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stats = CacheStats()
+        registry.track_cache(self, "memory")
+        self.size_bytes = 0
+        # key -> (value, size, expires_at); most recently used entries at the end
+        self._entries: "OrderedDict[str, Tuple[Any, int, Optional[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _sizeof(value: Any) -> int:
+        """Approximate the size of a value as its text/JSON length."""
+        if isinstance(value, (str, bytes)):
+            return len(value)
+        return len(json.dumps(value))
+
+    def get(self, key: str) -> Optional[Any]:
+        """Retrieve a value from the cache."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, size, expires_at = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.stats.hits += 1
+                    return value
+                del self._entries[key]
+                self.size_bytes -= size
+            self.stats.misses += 1
+            return None
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """Retrieve several values; missing keys are left out of the result."""
+        found = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                found[key] = value
+        return found
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """Save a value, evicting least recently used entries if over a bound."""
+        size = self._sizeof(value)
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size_bytes -= previous[1]
+            self.stats.sets += 1
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (value, size, expires_at)
+            self.size_bytes += size
+            while len(self._entries) > self.max_entries or self.size_bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self.size_bytes -= evicted_size
+                self.stats.evictions += 1
+
+    def set_many(self, items: Dict[str, Any], ttl: Optional[float] = None):
+        """Save several values."""
+        for key, value in items.items():
+            self.set(key, value, ttl=ttl)
+
+    def delete(self, key: str):
+        """Remove a value from the cache."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.size_bytes -= entry[1]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self):
+        """Remove every entry from the cache."""
+        with self._lock:
+            self._entries.clear()
+            self.size_bytes = 0
+
+
+class TieredCache:
+    """
+    Two-tier cache: an in-process MemoryCache in front of the on-disk Cache.
+
+    Reads go to memory first and fall through to disk, promoting disk hits
+    into memory. Writes go to both tiers. Hot keys are served from memory
+    without touching the database.
+    """
+
+    def __init__(self, disk: Optional[Cache] = None, memory: Optional[MemoryCache] = None):
+        """
+        Initialize the tiered cache.
+
+        Args:
+            disk (Cache, optional): Backing on-disk cache. Defaults to Cache().
+            memory (MemoryCache, optional): Front memory tier. Defaults to MemoryCache().
+        """
+        self.disk = disk if disk is not None else Cache()
+        self.memory = memory if memory is not None else MemoryCache()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Retrieve a value, reading through to disk on a memory miss."""
+        value = self.memory.get(key)
+        if value is not None:
+            return value
+        value = self.disk.get(key)
+        if value is not None:
+            self.memory.set(key, value)
+        return value
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """Retrieve several values, fetching memory misses from disk in one query."""
+        keys = list(keys)
+        found = self.memory.get_many(keys)
+        missing = [key for key in keys if key not in found]
+        if missing:
+            from_disk = self.disk.get_many(missing)
+            self.memory.set_many(from_disk)
+            found.update(from_disk)
+        return found
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """Save a value to both tiers."""
+        self.memory.set(key, value, ttl=ttl)
+        self.disk.set(key, value, ttl=ttl)
+
+    def set_many(self, items: Dict[str, Any], ttl: Optional[float] = None):
+        """Save several values to both tiers."""
+        self.memory.set_many(items, ttl=ttl)
+        self.disk.set_many(items, ttl=ttl)
+
+    def delete(self, key: str):
+        """Remove a value from both tiers."""
+        self.memory.delete(key)
+        self.disk.delete(key)
+
+    def clear(self):
+        """Remove every entry from both tiers."""
+        self.memory.clear()
+        self.disk.clear()
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Return per-tier counters.
+
+        Returns:
+            Dict[str, Dict[str, float]]: hits, misses, sets, evictions and hit_ratio for each tier.
+        """
+        return {"memory": self.memory.stats.as_dict(), "disk": self.disk.stats.as_dict()}
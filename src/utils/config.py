@@ -0,0 +1,44 @@
+import os
+import re
+import threading
+from typing import Any, Dict
+
+_ENV_VAR = re.compile(r"\$\{(\w+)\}")
+_configs: Dict[str, Dict[str, Any]] = {}
+_config_lock = threading.Lock()
+
+
+def _expand(value: Any) -> Any:
+    """Replace ${NAME} with the environment variable NAME (empty if unset), recursively."""
+    if isinstance(value, str):
+        return _ENV_VAR.sub(lambda m: os.getenv(m.group(1), ""), value)
+    if isinstance(value, dict):
+        return {key: _expand(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_expand(item) for item in value]
+    return value
+
+
+def load_config(path: str = "config/model_config.yaml", reload: bool = False) -> Dict[str, Any]:
+    """
+    Load a YAML config file with ${ENV_VAR} references expanded.
+
+    The file is parsed once per path and the result is shared, so treat it as read-only.
+
+    Args:
+        path (str): Path to the YAML file.
+        reload (bool): Re-read the file instead of returning the cached copy.
+
+    Returns:
+        Dict[str, Any]: The parsed config (empty if the file is empty).
+    """
+    config = None if reload else _configs.get(path)
+    if config is None:
+        with _config_lock:
+            config = None if reload else _configs.get(path)
+            if config is None:
+                import yaml
+
+                with open(path, "r", encoding="utf-8") as f:
+                    config = _configs[path] = _expand(yaml.safe_load(f) or {})
+    return config
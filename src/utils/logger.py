@@ -1,44 +1,212 @@
+import atexit
+import copy
+import json
 import logging
 import os
+import queue
 import sys
+import threading
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
-import yaml
+from typing import Any, Dict, List, Optional
+
+DEFAULT_CONFIG: Dict[str, Any] = {
+    "level": "INFO",
+    "console": {
+        "enabled": True,
+        "level": "INFO",
+        "format": "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        "json": False,
+    },
+    "file": {
+        "enabled": True,
+        "path": "logs/app.log",
+        "level": "DEBUG",
+        "format": "%(asctime)s - %(name)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s",
+        "json": False,
+    },
+}
+
+# One queue and listener thread per process, shared by every logger. The
+# listener, its handlers and the config file are only set up when the first
+# record is logged (see _PipelineHandler), so importing a module that calls
+# setup_logger() does no file I/O.
+_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+_listener: Optional[QueueListener] = None
+_config_path = "config/logging_config.yaml"
+_loggers: List[logging.Logger] = []
+_lock = threading.Lock()
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats records as one JSON object per line.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "module": record.module,
+            "line": record.lineno,
+            "thread": record.threadName,
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def load_logging_config(config_path: str = "config/logging_config.yaml") -> Dict[str, Any]:
+    """
+    Read logging settings, falling back to DEFAULT_CONFIG for anything not set.
+
+    The LOG_LEVEL environment variable overrides `level`.
+    """
+    import yaml
+
+    config = {key: dict(value) if isinstance(value, dict) else value for key, value in DEFAULT_CONFIG.items()}
+    try:
+        with open(config_path, "r", encoding="utf-8") as f:
+            loaded = yaml.safe_load(f) or {}
+    except FileNotFoundError:
+        loaded = {}
+    for key, value in loaded.items():
+        if isinstance(value, dict) and isinstance(config.get(key), dict):
+            config[key].update(value)
+        else:
+            config[key] = value
+    config["level"] = os.getenv("LOG_LEVEL", config["level"])
+    return config
+
+
+def _build_handler(handler: logging.Handler, settings: Dict[str, Any]) -> logging.Handler:
+    handler.setLevel(str(settings["level"]).upper())
+    handler.setFormatter(JsonFormatter() if settings.get("json") else logging.Formatter(settings["format"]))
+    return handler
+
+
+def _start_pipeline():
+    """Create the output handlers and the background listener that writes to them (once per process)."""
+    global _listener
+    config = load_logging_config(_config_path)
+    handlers = []
+    if config["console"].get("enabled", True):
+        handlers.append(_build_handler(logging.StreamHandler(sys.stdout), config["console"]))
+    if config["file"].get("enabled", True):
+        path = Path(config["file"]["path"])
+        path.parent.mkdir(parents=True, exist_ok=True)
+        handlers.append(_build_handler(logging.FileHandler(path, encoding="utf-8"), config["file"]))
+
+    level = logging.getLevelName(str(config["level"]).upper())
+    _queue_handler.setLevel(level)
+    for logger in _loggers:
+        logger.setLevel(level)
+
+    # Callers only format the record and put it on the queue; console and
+    # file I/O happen on the listener thread, off the request path.
+    listener = QueueListener(_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    # Flush what is still queued when the interpreter exits.
+    atexit.register(listener.stop)
+    _listener = listener
+
+
+class _PipelineHandler(QueueHandler):
+    """
+    QueueHandler that starts the logging pipeline when the first record arrives.
+    """
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        if _listener is None:
+            with _lock:
+                if _listener is None:
+                    _start_pipeline()
+            # Loggers let everything through until the configured level was known.
+            if record.levelno < self.level:
+                return False
+        return super().handle(record)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        Make a copy of the record that is safe to format on the listener thread.
+
+        The message is merged with its args now, and the traceback is rendered
+        into `exc_text` while it still describes the current exception. Unlike
+        QueueHandler.prepare(), this does not fold them into the message, so
+        the output formatters still see the exception (JsonFormatter writes
+        it as its own field).
+        """
+        record = copy.copy(record)
+        record.msg = record.message = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+            # The traceback holds on to every frame's locals; the text is all the listener needs.
+            record.exc_info = None
+        return record
+
+
+_queue_handler = _PipelineHandler(_queue)
+
+
+def _reset_after_fork():
+    """
+    Start over in a forked child (multiprocessing, gunicorn workers).
+
+    The child inherits the parent's listener object but not its thread, so
+    nothing would drain the queue. It gets a fresh queue instead, and its
+    first record starts a listener of its own.
+    """
+    global _queue, _listener, _lock
+    _queue = queue.SimpleQueue()
+    _queue_handler.queue = _queue
+    _listener = None
+    # Another thread may have held the lock at the moment of the fork.
+    _lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
 
 def setup_logger(name: str = "genai_project", config_path: str = "config/logging_config.yaml") -> logging.Logger:
     """
     Set up and return a logger instance.
-    
+
+    All loggers share one queue: records are handed to a background thread
+    that writes them to the console and `logs/app.log`, so logging never
+    blocks the caller on I/O. The configuration file is read once, when the
+    first record is logged, from the `config_path` of the first call.
+
     Args:
         name (str): Name of the logger.
         config_path (str): Path to the logging configuration file.
-        
+
     Returns:
         logging.Logger: Configured logger instance.
     """
-    # Create logs directory if it doesn't exist
-    log_dir = Path("logs")
-    log_dir.mkdir(exist_ok=True)
-
+    global _config_path
     logger = logging.getLogger(name)
-    
+
     # If logger already has handlers, assume it's configured and return it
     if logger.handlers:
         return logger
 
-    logger.setLevel(logging.INFO)
-
-    # Console Handler
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(logging.INFO)
-    console_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    console_handler.setFormatter(console_formatter)
-    logger.addHandler(console_handler)
-
-    # File Handler
-    file_handler = logging.FileHandler(log_dir / "app.log")
-    file_handler.setLevel(logging.DEBUG)
-    file_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s')
-    file_handler.setFormatter(file_formatter)
-    logger.addHandler(file_handler)
-
+    with _lock:
+        if _listener is None:
+            if not _loggers:
+                _config_path = config_path
+            _loggers.append(logger)
+            # Until the pipeline starts only LOG_LEVEL is known; the configured level is applied then.
+            logger.setLevel(os.getenv("LOG_LEVEL", "DEBUG").upper())
+        else:
+            logger.setLevel(_queue_handler.level)
+    logger.addHandler(_queue_handler)
     return logger
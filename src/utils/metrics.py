@@ -0,0 +1,269 @@
+import threading
+import weakref
+from bisect import bisect_left
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+# Upper bounds in seconds; sized for LLM calls from tens of milliseconds to minutes.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    """
+    Monotonic counter with positional label values, e.g. `counter.inc("openai", "gpt-4", "ok")`.
+    """
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self.values: Dict[Tuple[str, ...], float] = {}
+        self.lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self.values.get(labels, 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            items = list(self.values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self.lock:
+            items = list(self.values.items())
+        return [{"labels": dict(zip(self.labelnames, labels)), "value": value} for labels, value in items]
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram with positional label values, e.g. `histogram.observe(0.42, "openai", "gpt-4")`.
+
+    Recording is one bisect and a few additions under a lock; cumulative
+    bucket counts and quantile estimates are only computed when exported.
+    """
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (last one is +Inf), sum of observations]
+        self.series: Dict[Tuple[str, ...], list] = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str):
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def _copy(self) -> List[Tuple[Tuple[str, ...], List[int], float]]:
+        with self.lock:
+            return [(labels, list(counts), total) for labels, (counts, total) in self.series.items()]
+
+    def quantile(self, q: float, *labels: str) -> Optional[float]:
+        """Estimate the q-quantile (0-1) by interpolating within buckets; None without observations."""
+        series = self.series.get(labels)
+        if series is None:
+            return None
+        return self._quantile(q, list(series[0]))
+
+    def _quantile(self, q: float, counts: List[int]) -> Optional[float]:
+        total = sum(counts)
+        if not total:
+            return None
+        rank, seen = q * total, 0
+        for index, count in enumerate(counts):
+            if count and seen + count >= rank:
+                if index == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[index - 1] if index else 0.0
+                return lower + (self.buckets[index] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        for labels, counts, total in self._copy():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                label_text = _format_labels(self.labelnames, labels, 'le="' + le + '"')
+                lines.append(f"{self.name}_bucket{label_text} {cumulative}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(total)}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        result = []
+        for labels, counts, total in self._copy():
+            count = sum(counts)
+            result.append({
+                "labels": dict(zip(self.labelnames, labels)),
+                "count": count,
+                "sum": total,
+                "mean": total / count if count else None,
+                "p50": self._quantile(0.5, counts),
+                "p95": self._quantile(0.95, counts),
+                "p99": self._quantile(0.99, counts),
+            })
+        return result
+
+
+class MetricsRegistry:
+    """
+    Collection of metrics exported together as Prometheus text or a snapshot dict.
+
+    Caches are not instrumented per event: their existing CacheStats
+    counters are read when metrics are exported.
+    """
+
+    def __init__(self):
+        self.metrics: Dict[str, Any] = {}
+        self.caches: "weakref.WeakKeyDictionary[Any, str]" = weakref.WeakKeyDictionary()
+        self.lock = threading.Lock()
+
+    def _register(self, metric):
+        with self.lock:
+            existing = self.metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self.metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, description: str, labelnames: Sequence[str] = ()) -> Counter:
+        """Return the counter called `name`, creating it on first use."""
+        return self._register(Counter(name, description, labelnames))
+
+    def histogram(self, name: str, description: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        """Return the histogram called `name`, creating it on first use."""
+        return self._register(Histogram(name, description, labelnames, buckets))
+
+    def track_cache(self, cache: Any, name: str):
+        """Export the `stats` (CacheStats) of a cache under the label cache=`name` for as long as it lives."""
+        self.caches[cache] = name
+
+    def _cache_stats(self) -> Dict[str, Dict[str, float]]:
+        """Sum CacheStats per cache label."""
+        totals: Dict[str, Dict[str, float]] = {}
+        for cache, name in list(self.caches.items()):
+            entry = totals.setdefault(name, {"hits": 0, "misses": 0, "sets": 0, "evictions": 0})
+            for field in entry:
+                entry[field] += getattr(cache.stats, field)
+        for entry in totals.values():
+            lookups = entry["hits"] + entry["misses"]
+            entry["hit_ratio"] = entry["hits"] / lookups if lookups else 0.0
+        return totals
+
+    def render_prometheus(self) -> str:
+        """
+        Return all metrics in the Prometheus text exposition format.
+        """
+        lines: List[str] = []
+        for metric in list(self.metrics.values()):
+            lines.extend(metric.render())
+        caches = self._cache_stats()
+        for field in ("hits", "misses", "sets", "evictions"):
+            lines.append(f"# HELP cache_{field}_total Cache {field} per cache.")
+            lines.append(f"# TYPE cache_{field}_total counter")
+            for name, entry in caches.items():
+                lines.append(f'cache_{field}_total{{cache="{_escape(name)}"}} {_format_value(entry[field])}')
+        lines.append("# HELP cache_hit_ratio Fraction of cache lookups that were hits.")
+        lines.append("# TYPE cache_hit_ratio gauge")
+        for name, entry in caches.items():
+            lines.append(f'cache_hit_ratio{{cache="{_escape(name)}"}} {_format_value(entry["hit_ratio"])}')
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Return all metrics as plain data: per-label values for counters,
+        count/sum/mean/p50/p95/p99 for histograms, and per-cache stats.
+        """
+        data = {name: metric.snapshot() for name, metric in list(self.metrics.items())}
+        data["caches"] = self._cache_stats()
+        return data
+
+    def reset(self):
+        """Clear all recorded values (metrics stay registered)."""
+        for metric in list(self.metrics.values()):
+            with metric.lock:
+                if isinstance(metric, Histogram):
+                    metric.series.clear()
+                else:
+                    metric.values.clear()
+
+
+registry = MetricsRegistry()
+
+LLM_REQUESTS = registry.counter(
+    "llm_requests_total", "LLM requests by outcome (ok, error, cached).", ("provider", "model", "status"))
+LLM_LATENCY = registry.histogram(
+    "llm_request_duration_seconds", "End-to-end latency of upstream LLM requests, including retries.",
+    ("provider", "model"))
+LLM_TIME_TO_FIRST_TOKEN = registry.histogram(
+    "llm_time_to_first_token_seconds", "Time until the first text delta of a streamed response.",
+    ("provider", "model"))
+LLM_TOKENS = registry.counter(
+    "llm_tokens_total", "Tokens reported by the provider (kind=input or output).", ("provider", "model", "kind"))
+LLM_RETRIES = registry.counter("llm_retries_total", "Retried upstream calls per endpoint.", ("endpoint",))
+RATE_LIMITER_WAIT = registry.histogram(
+    "rate_limiter_wait_seconds", "Time calls waited for the rate limiter.",
+    buckets=(0.0, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0))
+
+
+def start_http_server(port: int = 9100, host: str = "127.0.0.1") -> "ThreadingHTTPServer":
+    """
+    Serve the default registry at http://host:port/metrics from a daemon thread.
+
+    Returns:
+        ThreadingHTTPServer: The running server; call shutdown() to stop it.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = registry.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
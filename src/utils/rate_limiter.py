@@ -1,54 +1,438 @@
+import asyncio
+import mmap
+import os
+import re
+import struct
 import time
 import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 from functools import wraps
-from typing import Callable, Any
+from pathlib import Path
+from typing import Callable, Any, ContextManager, Dict, Iterator, Mapping, Optional
 from src.utils.logger import setup_logger
+from src.utils.metrics import RATE_LIMITER_WAIT
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
 
 logger = setup_logger(__name__)
 
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def _seconds_until(value: str) -> Optional[float]:
+    """
+    Parse a reset/retry value into seconds from now.
+
+    Accepts plain seconds ("12"), Go-style durations as sent by OpenAI
+    ("6m0s", "20ms"), RFC 3339 timestamps as sent by Anthropic and HTTP dates.
+    """
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if parts and "".join(n + u for n, u in parts) == value:
+        return sum(float(n) * _DURATION_UNITS[u] for n, u in parts)
+    try:
+        when = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        try:
+            when = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def parse_retry_after(headers: Optional[Mapping[str, str]]) -> Optional[float]:
+    """
+    Read the server-requested delay from `retry-after-ms` or `retry-after`.
+
+    Returns:
+        float: Seconds to wait, or None if the headers do not say.
+    """
+    if not headers:
+        return None
+    headers = {k.lower(): v for k, v in headers.items()}
+    if "retry-after-ms" in headers:
+        try:
+            return float(headers["retry-after-ms"]) / 1000.0
+        except ValueError:
+            pass
+    if "retry-after" in headers:
+        return _seconds_until(headers["retry-after"])
+    return None
+
+
+def parse_rate_limit_headers(headers: Optional[Mapping[str, str]]) -> Dict[str, Dict[str, float]]:
+    """
+    Normalize OpenAI (`x-ratelimit-*`) and Anthropic (`anthropic-ratelimit-*`) headers.
+
+    Returns:
+        Dict[str, Dict[str, float]]: For "requests" and "tokens", whichever of
+        "limit", "remaining" and "reset" (seconds from now) were present.
+    """
+    if not headers:
+        return {}
+    headers = {k.lower(): v for k, v in headers.items()}
+    info: Dict[str, Dict[str, float]] = {}
+    for kind in ("requests", "tokens"):
+        fields = {}
+        for field in ("limit", "remaining", "reset"):
+            value = headers.get(f"x-ratelimit-{field}-{kind}") or headers.get(f"anthropic-ratelimit-{kind}-{field}")
+            if value is None:
+                continue
+            if field == "reset":
+                seconds = _seconds_until(value)
+                if seconds is not None:
+                    fields[field] = seconds
+            else:
+                try:
+                    fields[field] = float(value)
+                except ValueError:
+                    continue
+        if fields:
+            info[kind] = fields
+    return info
+
+
+class TokenBucket:
+    """
+    Token bucket holding up to `capacity` units, refilled at `rate` units per second.
+
+    The level may go negative: a caller that takes more than is available
+    reserves its share of future refill and is told how long to wait for it.
+    Not thread-safe on its own; RateLimiter guards it with a lock.
+    """
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        # Highest rate an adaptive limiter may ramp back up to.
+        self.max_rate = rate
+        self.level = capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, amount: float, now: float) -> float:
+        """
+        Take `amount` units and return the seconds until they are covered.
+        """
+        self.refill(now)
+        self.level -= amount
+        return -self.level / self.rate if self.level < 0 else 0.0
+
+    def give(self, amount: float, now: float):
+        """Return (or, if negative, additionally charge) `amount` units."""
+        self.refill(now)
+        self.level = min(self.capacity, self.level + amount)
+
+
 class RateLimiter:
     """
-    Thread-safe rate limiter using a token bucket or simple time-window approach.
+    Thread-safe token-bucket rate limiter with request and token budgets.
+
+    Requests are limited to `max_calls` per `period` seconds (bursts of up
+    to `max_calls` are allowed). If `tokens_per_minute` is set, callers also
+    spend an estimated token cost per request, which can be corrected once
+    the actual usage is known. Every operation is O(1), and callers sleep
+    outside the lock, so waiting threads never block each other.
+
+    A `Retry-After` reported through on_rate_limited() always pauses new
+    calls. With `adaptive=True` the limiter also tunes its rates at runtime
+    (AIMD): a 429 multiplies them by `decrease_factor` (once per burst of
+    429s from requests already in flight), and each response whose
+    rate-limit headers show headroom adds back a fraction of the ceiling. The ceiling starts at the configured rate and follows the
+    limits the provider reports, so an overly conservative configuration
+    is corrected too.
     """
-    
-    def __init__(self, max_calls: int, period: float):
+
+    def __init__(self, max_calls: int, period: float, tokens_per_minute: Optional[int] = None,
+                 adaptive: bool = False, decrease_factor: float = 0.5, increase_fraction: float = 0.05,
+                 min_fraction: float = 0.05, headroom: float = 0.1):
         """
         Initialize the rate limiter.
-        
+
         Args:
             max_calls (int): Maximum number of calls allowed.
             period (float): Time period in seconds.
+            tokens_per_minute (int, optional): Token budget per minute.
+            adaptive (bool): Adjust rates from 429s and provider rate-limit headers.
+            decrease_factor (float): Multiplier applied to the rates on a 429.
+            increase_fraction (float): Fraction of the ceiling added back per healthy response.
+            min_fraction (float): Lowest rate, as a fraction of the ceiling.
+            headroom (float): Remaining/limit ratio below which rates stop increasing.
         """
         self.max_calls = max_calls
         self.period = period
-        self.calls = []
+        self.tokens_per_minute = tokens_per_minute
+        self.adaptive = adaptive
+        self.decrease_factor = decrease_factor
+        self.increase_fraction = increase_fraction
+        self.min_fraction = min_fraction
+        self.headroom = headroom
         self.lock = threading.Lock()
+        self.requests = TokenBucket(max_calls, max_calls / period)
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60.0) if tokens_per_minute else None
+        self.blocked_until = 0.0
+        # 429s for requests already in flight when we backed off do not back off again.
+        self.backoff_until = 0.0
+
+    def _state(self) -> ContextManager:
+        """Guard a read-modify-write of the buckets."""
+        return self.lock
+
+    def _reserve(self, cost: int) -> float:
+        """Reserve one request and `cost` tokens; return the seconds to wait."""
+        with self._state():
+            now = time.monotonic()
+            wait = max(self.requests.take(1, now), self.blocked_until - now)
+            if self.tokens is not None and cost:
+                wait = max(wait, self.tokens.take(cost, now))
+        return wait
+
+    def acquire(self, cost: int = 0):
+        """
+        Block until a call costing `cost` tokens is allowed.
+
+        Args:
+            cost (int): Estimated tokens for the call (ignored without a token budget).
+        """
+        wait = self._reserve(cost)
+        RATE_LIMITER_WAIT.observe(wait)
+        if wait > 0:
+            logger.warning(f"Rate limit reached. Sleeping for {wait:.2f} seconds.")
+            time.sleep(wait)
+
+    async def acquire_async(self, cost: int = 0):
+        """
+        Wait, without blocking the event loop, until a call costing `cost` tokens is allowed.
+
+        Args:
+            cost (int): Estimated tokens for the call (ignored without a token budget).
+        """
+        wait = self._reserve(cost)
+        RATE_LIMITER_WAIT.observe(wait)
+        if wait > 0:
+            logger.warning(f"Rate limit reached. Sleeping for {wait:.2f} seconds.")
+            await asyncio.sleep(wait)
+
+    def reconcile(self, estimated: int, actual: int):
+        """
+        Correct the token budget once a call's actual usage is known.
+
+        Args:
+            estimated (int): Tokens reserved by acquire().
+            actual (int): Tokens the call actually used.
+        """
+        if self.tokens is None:
+            return
+        with self._state():
+            self.tokens.give(estimated - actual, time.monotonic())
+
+    def on_rate_limited(self, retry_after: Optional[float] = None):
+        """
+        Record a 429 response: pause until `retry_after` and, if adaptive, back off.
+
+        Args:
+            retry_after (float, optional): Seconds the provider asked us to wait.
+        """
+        with self._state():
+            now = time.monotonic()
+            if retry_after:
+                self.blocked_until = max(self.blocked_until, now + retry_after)
+            if self.adaptive and now >= self.backoff_until:
+                for bucket in (self.requests, self.tokens):
+                    if bucket is None:
+                        continue
+                    bucket.refill(now)
+                    bucket.rate = max(bucket.max_rate * self.min_fraction, bucket.rate * self.decrease_factor)
+                    bucket.level = min(bucket.level, 0.0)
+                self.backoff_until = max(self.blocked_until, now + 1.0 / self.requests.rate)
+            rate = self.requests.rate
+        logger.warning(f"Rate limited by provider (retry after {retry_after}s). Request rate now {rate * 60:.1f}/min.")
+
+    def update_from_headers(self, headers: Optional[Mapping[str, str]]):
+        """
+        Adapt to the rate-limit headers of a successful response (adaptive limiters only).
+
+        The provider's limit becomes the ceiling, the local budget is capped
+        at what the provider says remains, and the rate ramps up additively
+        while there is headroom.
+
+        Args:
+            headers (Mapping[str, str]): Response headers from OpenAI or Anthropic.
+        """
+        if self.adaptive:
+            self.update_from_limits(parse_rate_limit_headers(headers))
+
+    def update_from_limits(self, info: Dict[str, Dict[str, float]]):
+        """
+        Same as update_from_headers(), for headers already parsed by parse_rate_limit_headers().
+        """
+        if not self.adaptive:
+            return
+        with self._state():
+            now = time.monotonic()
+            for kind, bucket in (("requests", self.requests), ("tokens", self.tokens)):
+                fields = info.get(kind)
+                if bucket is None:
+                    continue
+                bucket.refill(now)
+                has_headroom = True
+                if fields:
+                    # Provider limits are per minute.
+                    if fields.get("limit"):
+                        bucket.max_rate = fields["limit"] / 60.0
+                    if "remaining" in fields:
+                        bucket.level = min(bucket.level, fields["remaining"])
+                        if fields.get("limit"):
+                            has_headroom = fields["remaining"] / fields["limit"] >= self.headroom
+                if has_headroom:
+                    bucket.rate = min(bucket.max_rate, bucket.rate + bucket.max_rate * self.increase_fraction)
+                else:
+                    bucket.rate = min(bucket.rate, bucket.max_rate)
 
     def __call__(self, func: Callable) -> Callable:
         """
-        Decorator to apply rate limiting to a function.
+        Decorator to apply rate limiting to a function or coroutine function.
         """
+        if asyncio.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs) -> Any:
+                await self.acquire_async()
+                return await func(*args, **kwargs)
+            return async_wrapper
+
         @wraps(func)
         def wrapper(*args, **kwargs) -> Any:
-            with self.lock:
-                current_time = time.time()
-                # Remove calls outside the current window
-                self.calls = [t for t in self.calls if current_time - t < self.period]
-                
-                if len(self.calls) >= self.max_calls:
-                    sleep_time = self.period - (current_time - self.calls[0])
-                    logger.warning(f"Rate limit reached. Sleeping for {sleep_time:.2f} seconds.")
-                    time.sleep(sleep_time)
-                    # Update current time after sleep
-                    current_time = time.time()
-                    # Clean up again
-                    self.calls = [t for t in self.calls if current_time - t < self.period]
-
-                self.calls.append(time.time())
-            
+            self.acquire()
             return func(*args, **kwargs)
         return wrapper
 
+class SharedRateLimiter(RateLimiter):
+    """
+    RateLimiter whose state is shared by every process on the host.
+
+    The bucket state lives in a small memory-mapped file. Each operation
+    takes an exclusive `flock` on it, reads the state, updates it and writes
+    it back, so all workers (gunicorn, multiprocessing, separate scripts)
+    pointing at the same path draw from one budget. That is a couple of
+    syscalls and a few struct copies, a few microseconds per acquire. Sleeping
+    still happens outside the lock. Requires a POSIX system.
+    """
+
+    _MAGIC = 0x524C4D31  # "RLM1"
+    # magic, then max_calls, period, tokens_per_minute (to detect config changes),
+    # blocked_until, backoff_until, then (capacity, rate, max_rate, level, updated)
+    # for the request and token buckets.
+    _LAYOUT = struct.Struct("<Q5d10d")
+
+    def __init__(self, max_calls: int, period: float, tokens_per_minute: Optional[int] = None,
+                 path: str = "data/rate_limits/default.bin", **kwargs):
+        """
+        Initialize the shared rate limiter, creating the state file if needed.
+
+        Args:
+            max_calls (int): Maximum number of calls allowed.
+            period (float): Time period in seconds.
+            tokens_per_minute (int, optional): Token budget per minute.
+            path (str): State file; limiters using the same path share one budget.
+            **kwargs: Adaptive options, as for RateLimiter.
+        """
+        if fcntl is None:
+            raise RuntimeError("SharedRateLimiter requires fcntl and is not supported on this platform.")
+        super().__init__(max_calls, period, tokens_per_minute, **kwargs)
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._open()
+        with self._state():
+            pass
+
+    def _open(self):
+        """Open and map the state file for this process."""
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        if os.fstat(fd).st_size < self._LAYOUT.size:
+            os.ftruncate(fd, self._LAYOUT.size)
+        self._fd = fd
+        self._map = mmap.mmap(fd, self._LAYOUT.size)
+        # flock is tied to the open file description, which a forked child
+        # shares with its parent, so each process needs its own.
+        self._pid = os.getpid()
+
+    def _config(self):
+        return (float(self.max_calls), float(self.period), float(self.tokens_per_minute or 0))
+
+    def _load(self) -> bool:
+        """Copy the shared state into the local buckets; False if it is missing or stale."""
+        values = self._LAYOUT.unpack_from(self._map)
+        if values[0] != self._MAGIC or values[1:4] != self._config():
+            return False
+        # time.monotonic() restarts at boot, so state from before a reboot is stale.
+        if values[10] > time.monotonic():
+            return False
+        self.blocked_until, self.backoff_until = values[4:6]
+        (self.requests.capacity, self.requests.rate, self.requests.max_rate,
+         self.requests.level, self.requests.updated) = values[6:11]
+        if self.tokens is not None:
+            (self.tokens.capacity, self.tokens.rate, self.tokens.max_rate,
+             self.tokens.level, self.tokens.updated) = values[11:16]
+        return True
+
+    def _store(self):
+        """Write the local buckets back to the shared state."""
+        tokens = self.tokens or TokenBucket(0, 1)
+        self._LAYOUT.pack_into(
+            self._map, 0, self._MAGIC, *self._config(), self.blocked_until, self.backoff_until,
+            self.requests.capacity, self.requests.rate, self.requests.max_rate,
+            self.requests.level, self.requests.updated,
+            tokens.capacity, tokens.rate, tokens.max_rate, tokens.level, tokens.updated,
+        )
+
+    @contextmanager
+    def _state(self) -> Iterator[None]:
+        with self.lock:
+            if self._pid != os.getpid():
+                self._open()
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                if not self._load():
+                    logger.info(f"Initializing shared rate limit state at {self.path}.")
+                    self.requests = TokenBucket(self.max_calls, self.max_calls / self.period)
+                    if self.tokens is not None:
+                        self.tokens = TokenBucket(self.tokens_per_minute, self.tokens_per_minute / 60.0)
+                    self.blocked_until = self.backoff_until = 0.0
+                yield
+                self._store()
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def close(self):
+        """Unmap and close the state file."""
+        self._map.close()
+        os.close(self._fd)
+
+
 # Example usage/factory
-def limit_calls(max_calls: int, period: float):
-    return RateLimiter(max_calls, period)
+def limit_calls(max_calls: int, period: float, tokens_per_minute: Optional[int] = None,
+                adaptive: bool = False, shared_path: Optional[str] = None):
+    """
+    Create a rate limiter usable as a decorator.
+
+    Args:
+        shared_path (str, optional): Share the budget across processes through this state file.
+    """
+    if shared_path:
+        return SharedRateLimiter(max_calls, period, tokens_per_minute, path=shared_path, adaptive=adaptive)
+    return RateLimiter(max_calls, period, tokens_per_minute, adaptive=adaptive)
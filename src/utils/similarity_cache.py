@@ -0,0 +1,255 @@
+import json
+import re
+import threading
+import zlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.utils.cache import Cache, CacheStats
+from src.utils.logger import setup_logger
+from src.utils.metrics import registry
+
+logger = setup_logger(__name__)
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_NON_WORD = re.compile(r"[^\w\s]+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_prompt(text: str) -> str:
+    """
+    Normalize a prompt so trivially different variants compare equal.
+
+    Lowercases, drops punctuation and collapses runs of whitespace.
+    """
+    return _WHITESPACE.sub(" ", _NON_WORD.sub(" ", text.lower())).strip()
+
+
+class SimilarityCache:
+    """
+    Near-duplicate prompt cache using MinHash signatures and LSH banding.
+
+    Prompts are normalized and split into character shingles. Each prompt gets
+    a MinHash signature. The signature is cut into bands, and every band is
+    hashed into one sorted index. A lookup is therefore a handful of binary
+    searches plus a vectorized comparison with the few candidates found, and it
+    stays fast as the number of entries grows. The stored response with the
+    highest estimated Jaccard similarity is returned if it reaches `threshold`.
+
+    Signatures are appended to a binary file and responses are kept in a
+    SQLite `Cache` next to it, so the index survives restarts. Only one
+    process should write to a given directory.
+    """
+
+    def __init__(self, cache_dir: str = "data/cache/similarity", threshold: float = 0.8,
+                 num_perm: int = 64, bands: int = 16, shingle_size: int = 5, seed: int = 1,
+                 merge_every: int = 10000):
+        """
+        Initialize the similarity cache, loading any persisted index.
+
+        Args:
+            cache_dir (str): Directory holding the signature file and response store.
+            threshold (float): Minimum estimated Jaccard similarity for a hit.
+            num_perm (int): Number of MinHash permutations per signature.
+            bands (int): Number of LSH bands; must divide `num_perm`. More bands
+                find more distant matches at the cost of more candidates.
+            shingle_size (int): Length of the character shingles.
+            seed (int): Seed for the hash permutations.
+            merge_every (int): Number of new entries buffered before they are
+                merged into the sorted band index.
+        """
+        if num_perm % bands:
+            raise ValueError(f"bands ({bands}) must divide num_perm ({num_perm}).")
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.merge_every = merge_every
+        self.stats = CacheStats()
+        registry.track_cache(self, f"similarity:{self.cache_dir}")
+
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, 1 << 61, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, 1 << 61, size=num_perm, dtype=np.uint64)
+        # Odd multipliers that fold each band's rows into one 64-bit key; they
+        # differ per band, so all bands can share a single sorted index.
+        self._band_coeffs = rng.randint(1, 1 << 62, size=(bands, self.rows), dtype=np.uint64) | np.uint64(1)
+
+        self._lock = threading.Lock()
+        self._store = Cache(str(self.cache_dir), db_name="responses.db")
+        self._check_meta(seed)
+        self._sig_path = self.cache_dir / "signatures.bin"
+        self._load()
+
+    def _check_meta(self, seed: int):
+        """Refuse to open an index built with different hashing parameters."""
+        meta_path = self.cache_dir / "meta.json"
+        meta = {"num_perm": self.num_perm, "bands": self.bands,
+                "shingle_size": self.shingle_size, "seed": seed}
+        if meta_path.exists():
+            stored = json.loads(meta_path.read_text())
+            if stored != meta:
+                raise ValueError(f"Similarity index at {self.cache_dir} was built with {stored}, not {meta}.")
+        else:
+            meta_path.write_text(json.dumps(meta))
+
+    def _load(self):
+        """Load persisted signatures and build the band index."""
+        record = self.num_perm * 4
+        sigs = np.zeros((0, self.num_perm), dtype=np.uint32)
+        if self._sig_path.exists():
+            raw = self._sig_path.read_bytes()
+            usable = len(raw) - len(raw) % record
+            if usable != len(raw):
+                logger.warning("Discarding a partially written signature record.")
+                with open(self._sig_path, "r+b") as f:
+                    f.truncate(usable)
+            sigs = np.frombuffer(raw[:usable], dtype=np.uint32).reshape(-1, self.num_perm)
+
+        self._count = len(sigs)
+        capacity = max(1024, self._count * 2)
+        self._sigs = np.zeros((capacity, self.num_perm), dtype=np.uint32)
+        self._sigs[:self._count] = sigs
+        self._band_keys = np.zeros((capacity, self.bands), dtype=np.uint64)
+        if self._count:
+            self._band_keys[:self._count] = self._keys_for(sigs)
+        self._index_keys = np.zeros(0, dtype=np.uint64)
+        self._index_ids = np.zeros(0, dtype=np.uint32)
+        self._indexed = 0
+        self._pending: Dict[int, List[int]] = {}
+        self._merge()
+        self._sig_file = open(self._sig_path, "ab")
+        if self._count:
+            logger.info(f"Loaded {self._count} similarity cache entries.")
+
+    def _signature(self, normalized: str) -> np.ndarray:
+        """Compute the MinHash signature of a normalized prompt."""
+        k = self.shingle_size
+        if len(normalized) <= k:
+            shingles = {normalized}
+        else:
+            shingles = {normalized[i:i + k] for i in range(len(normalized) - k + 1)}
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles),
+                             dtype=np.uint64, count=len(shingles))
+        permuted = (np.outer(hashes, self._a) + self._b) % _MERSENNE_PRIME & _MAX_HASH
+        return permuted.min(axis=0).astype(np.uint32)
+
+    def _keys_for(self, sigs: np.ndarray) -> np.ndarray:
+        """Hash each band of one or more signatures into a 64-bit key."""
+        banded = sigs.reshape(-1, self.bands, self.rows).astype(np.uint64)
+        return (banded * self._band_coeffs).sum(axis=2, dtype=np.uint64)
+
+    def _merge(self):
+        """Fold pending entries into the sorted band index."""
+        if self._indexed == self._count:
+            return
+        new_keys = self._band_keys[self._indexed:self._count].ravel()
+        new_ids = np.repeat(np.arange(self._indexed, self._count, dtype=np.uint32), self.bands)
+        order = np.argsort(new_keys)
+        new_keys, new_ids = new_keys[order], new_ids[order]
+        # Inserting a sorted run is a linear copy rather than a full re-sort.
+        positions = np.searchsorted(self._index_keys, new_keys)
+        self._index_keys = np.insert(self._index_keys, positions, new_keys)
+        self._index_ids = np.insert(self._index_ids, positions, new_ids)
+        self._indexed = self._count
+        self._pending = {}
+
+    def _candidates(self, keys: np.ndarray) -> np.ndarray:
+        """Return ids of entries sharing at least one band with `keys`."""
+        lo = np.searchsorted(self._index_keys, keys, side="left")
+        hi = np.searchsorted(self._index_keys, keys, side="right")
+        found = [self._index_ids[l:h] for l, h in zip(lo, hi) if h > l]
+        for key in keys.tolist():
+            if key in self._pending:
+                found.append(np.asarray(self._pending[key], dtype=np.uint32))
+        if not found:
+            return np.zeros(0, dtype=np.uint32)
+        return np.unique(np.concatenate(found))
+
+    def _best_match(self, sig: np.ndarray, keys: np.ndarray) -> Tuple[Optional[int], float]:
+        """Return the candidate id with the highest estimated similarity."""
+        with self._lock:
+            candidates = self._candidates(keys)
+            if not len(candidates):
+                return None, 0.0
+            similarity = (self._sigs[candidates] == sig).mean(axis=1)
+        best = int(similarity.argmax())
+        return int(candidates[best]), float(similarity[best])
+
+    def lookup(self, prompt: str) -> Tuple[Optional[Any], float]:
+        """
+        Find the stored response for the most similar prompt.
+
+        Returns:
+            Tuple[Any, float]: The response (None on a miss) and its estimated
+            Jaccard similarity to `prompt`.
+        """
+        sig = self._signature(normalize_prompt(prompt))
+        entry_id, similarity = self._best_match(sig, self._keys_for(sig)[0])
+        if entry_id is not None and similarity >= self.threshold:
+            entry = self._store.get(str(entry_id))
+            if entry is not None:
+                self.stats.hits += 1
+                return entry["response"], similarity
+        self.stats.misses += 1
+        return None, similarity
+
+    def get(self, prompt: str) -> Optional[Any]:
+        """Retrieve the response stored for a near-duplicate of `prompt`."""
+        return self.lookup(prompt)[0]
+
+    def set(self, prompt: str, response: Any):
+        """
+        Store a response for a prompt.
+
+        A prompt whose signature matches an existing entry exactly overwrites
+        that entry instead of growing the index.
+        """
+        normalized = normalize_prompt(prompt)
+        sig = self._signature(normalized)
+        keys = self._keys_for(sig)[0]
+        entry_id, similarity = self._best_match(sig, keys)
+        if entry_id is not None and similarity == 1.0:
+            self._store.set(str(entry_id), {"prompt": normalized, "response": response})
+            return
+
+        with self._lock:
+            entry_id = self._count
+            if entry_id == len(self._sigs):
+                self._sigs = np.concatenate([self._sigs, np.zeros_like(self._sigs)])
+                self._band_keys = np.concatenate([self._band_keys, np.zeros_like(self._band_keys)])
+            # Store the response before publishing the signature, so a crash
+            # never leaves a signature without its response.
+            self._store.set(str(entry_id), {"prompt": normalized, "response": response})
+            self._sig_file.write(sig.tobytes())
+            self._sig_file.flush()
+            self._sigs[entry_id] = sig
+            self._band_keys[entry_id] = keys
+            self._count += 1
+            for key in keys.tolist():
+                self._pending.setdefault(key, []).append(entry_id)
+            if self._count - self._indexed >= self.merge_every:
+                self._merge()
+        self.stats.sets += 1
+
+    def __len__(self) -> int:
+        return self._count
+
+    def clear(self):
+        """Remove every entry and the persisted index."""
+        with self._lock:
+            self._sig_file.close()
+            self._sig_path.unlink()
+            self._store.clear()
+            self._load()
+        logger.info("Similarity cache cleared.")
+
+    def close(self):
+        """Close the signature file."""
+        self._sig_file.close()
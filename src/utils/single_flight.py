@@ -0,0 +1,111 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into one execution.
+
+    The first caller for a key runs the function; callers arriving while it is
+    in flight wait for it and receive the same result or exception. Works for
+    threads (`do`) and asyncio tasks (`do_async`).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls: Dict[str, Future] = {}
+        self.tasks: Dict[Tuple[int, str], "asyncio.Task[Any]"] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key: str, func: Callable[[], Any]) -> Any:
+        """
+        Run `func`, or wait for the in-flight call with the same key.
+
+        Args:
+            key (str): Identity of the call.
+            func (Callable): Zero-argument function to run.
+
+        Returns:
+            Any: The result of the single execution.
+        """
+        with self.lock:
+            future = self.calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self.calls[key] = future
+                self.executed += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            logger.debug("Coalesced call for key: %.20s...", key)
+            return future.result()
+
+        try:
+            result = func()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self.lock:
+                del self.calls[key]
+
+    async def do_async(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Await `func()`, or the in-flight call with the same key.
+
+        The call runs in its own task, so cancelling one waiter does not
+        cancel the upstream call for the others.
+
+        Args:
+            key (str): Identity of the call.
+            func (Callable): Zero-argument coroutine function to run.
+
+        Returns:
+            Any: The result of the single execution.
+        """
+        # Tasks belong to one event loop, so calls are only shared within a loop.
+        task_key = (id(asyncio.get_running_loop()), key)
+        # Other threads may be running their own loops against this instance.
+        with self.lock:
+            task = self.tasks.get(task_key)
+            leader = task is None
+            if leader:
+                task = asyncio.ensure_future(func())
+                self.tasks[task_key] = task
+                self.executed += 1
+            else:
+                self.coalesced += 1
+        if leader:
+            task.add_done_callback(lambda t: self._finish(task_key, t))
+        else:
+            logger.debug("Coalesced async call for key: %.20s...", key)
+        return await asyncio.shield(task)
+
+    def _finish(self, task_key: Tuple[int, str], task: "asyncio.Task[Any]"):
+        with self.lock:
+            if self.tasks.get(task_key) is task:
+                del self.tasks[task_key]
+        # Mark the exception as retrieved in case every waiter was cancelled.
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Return call counters.
+
+        Returns:
+            Dict[str, int]: Number of executed and coalesced calls.
+        """
+        return {"executed": self.executed, "coalesced": self.coalesced}
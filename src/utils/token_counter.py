@@ -1 +1,314 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
 
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Chat formatting overhead for OpenAI chat models: each message is wrapped in
+# <|start|>{role}\n{content}<|end|>\n, a `name` costs one more token, and every
+# reply is primed with <|start|>assistant<|message|>.
+OPENAI_TOKENS_PER_MESSAGE = 3
+OPENAI_TOKENS_PER_NAME = 1
+OPENAI_REPLY_PRIMING = 3
+
+_encoders: Dict[str, Any] = {}
+_counters: Dict[str, "TokenCounter"] = {}
+_registry_lock = threading.Lock()
+
+
+def _message_text(content: Any) -> str:
+    """Return the text of a message content (a string or a list of content parts)."""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return ""
+
+
+def get_encoding(model: str) -> Optional[Any]:
+    """
+    Return the tiktoken encoding for a model, loading it only once per process.
+
+    Unknown models fall back to the o200k_base encoding. Returns None (and
+    remembers that) when tiktoken is not installed or the encoding cannot be
+    loaded, so callers can fall back to an estimate without retrying.
+
+    Args:
+        model (str): Model name, e.g. "gpt-4o".
+
+    Returns:
+        tiktoken.Encoding: The encoding, or None if unavailable.
+    """
+    if model in _encoders:
+        return _encoders[model]
+    with _registry_lock:
+        if model not in _encoders:
+            try:
+                import tiktoken
+                try:
+                    encoding = tiktoken.encoding_for_model(model)
+                except KeyError:
+                    encoding = tiktoken.get_encoding("o200k_base")
+            except ImportError:
+                logger.warning("tiktoken not installed. Falling back to estimated token counts.")
+                encoding = None
+            except Exception as e:
+                logger.error(f"Error loading tiktoken encoding for {model}: {e}. Falling back to estimated token counts.")
+                encoding = None
+            _encoders[model] = encoding
+        return _encoders[model]
+
+
+class TokenCounter:
+    """
+    Base token counter with a thread-safe LRU memo of recent strings.
+
+    Prompts are counted before every request, and the same system prompts,
+    templates and conversation turns come back again and again, so repeated
+    strings are answered from the memo. Subclasses implement `_count` and
+    `count_message`.
+    """
+
+    # Formatting tokens added once per request, on top of the per-message counts.
+    request_overhead = 0
+
+    def __init__(self, memo_size: int = 4096, memo_max_chars: int = 65536):
+        """
+        Args:
+            memo_size (int): Maximum number of memoized strings.
+            memo_max_chars (int): Longer strings are counted but not memoized.
+        """
+        self.memo_size = memo_size
+        self.memo_max_chars = memo_max_chars
+        self._memo: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _count(self, text: str) -> int:
+        raise NotImplementedError
+
+    def _count_batch(self, texts: List[str]) -> List[int]:
+        return [self._count(text) for text in texts]
+
+    def _remember(self, text: str, count: int):
+        if len(text) > self.memo_max_chars:
+            return
+        with self._lock:
+            self._memo[text] = count
+            if len(self._memo) > self.memo_size:
+                self._memo.popitem(last=False)
+
+    def count(self, text: str) -> int:
+        """
+        Count the tokens in a string.
+
+        Args:
+            text (str): The input text.
+
+        Returns:
+            int: The number of tokens.
+        """
+        if not text:
+            return 0
+        with self._lock:
+            count = self._memo.get(text)
+            if count is not None:
+                self._memo.move_to_end(text)
+                return count
+        count = self._count(text)
+        self._remember(text, count)
+        return count
+
+    def count_many(self, texts: Iterable[str]) -> List[int]:
+        """
+        Count the tokens in several strings, encoding the unmemoized ones in one batch.
+
+        Args:
+            texts (Iterable[str]): The input texts.
+
+        Returns:
+            List[int]: Token counts in input order.
+        """
+        texts = list(texts)
+        counts: Dict[str, int] = {"": 0}
+        with self._lock:
+            for text in texts:
+                count = self._memo.get(text)
+                if count is not None:
+                    self._memo.move_to_end(text)
+                    counts[text] = count
+        missing = list(dict.fromkeys(text for text in texts if text not in counts))
+        if missing:
+            for text, count in zip(missing, self._count_batch(missing)):
+                counts[text] = count
+                self._remember(text, count)
+        return [counts[text] for text in texts]
+
+    def count_message(self, message: Dict[str, Any]) -> int:
+        """
+        Count the tokens one chat message adds to a request, including its formatting overhead.
+
+        Args:
+            message (Dict[str, Any]): Message with "role" and "content".
+
+        Returns:
+            int: The number of tokens.
+        """
+        raise NotImplementedError
+
+    def count_messages(self, messages: List[Dict[str, Any]]) -> int:
+        """
+        Count the prompt tokens of a list of chat messages, including formatting overhead.
+
+        Args:
+            messages (List[Dict[str, Any]]): Messages with "role" and "content".
+
+        Returns:
+            int: The number of prompt tokens.
+        """
+        return self.request_overhead + sum(self.count_message(message) for message in messages)
+
+
+class TiktokenCounter(TokenCounter):
+    """
+    Exact token counter for OpenAI models using a shared tiktoken encoding.
+    """
+
+    request_overhead = OPENAI_REPLY_PRIMING
+
+    def __init__(self, encoding: Any, **kwargs):
+        """
+        Args:
+            encoding (tiktoken.Encoding): Encoding from get_encoding().
+            **kwargs: Memo options, as for TokenCounter.
+        """
+        super().__init__(**kwargs)
+        self.encoding = encoding
+
+    def _count(self, text: str) -> int:
+        # Special-token markers in user text are counted as plain text rather than raising.
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+    def _count_batch(self, texts: List[str]) -> List[int]:
+        return [len(tokens) for tokens in self.encoding.encode_batch(texts, disallowed_special=())]
+
+    def count_message(self, message: Dict[str, Any]) -> int:
+        total = OPENAI_TOKENS_PER_MESSAGE + self.count(message.get("role", ""))
+        total += self.count(_message_text(message.get("content")))
+        if message.get("name"):
+            total += OPENAI_TOKENS_PER_NAME + self.count(message["name"])
+        return total
+
+    def count_messages(self, messages: List[Dict[str, Any]]) -> int:
+        texts = []
+        total = OPENAI_REPLY_PRIMING
+        for message in messages:
+            total += OPENAI_TOKENS_PER_MESSAGE
+            texts.append(message.get("role", ""))
+            texts.append(_message_text(message.get("content")))
+            if message.get("name"):
+                total += OPENAI_TOKENS_PER_NAME
+                texts.append(message["name"])
+        return total + sum(self.count_many(texts))
+
+
+class HeuristicTokenCounter(TokenCounter):
+    """
+    Fast character-ratio token estimator, calibrated from recorded usage.
+
+    Used for Claude, whose tokenizer is not public, and whenever tiktoken is
+    unavailable. Counting is O(1) per string. Each call to `calibrate` with
+    the provider-reported input tokens of a request nudges the
+    characters-per-token ratio (an exponential moving average), so estimates
+    converge on the model's real tokenization of your traffic.
+    """
+
+    def __init__(self, chars_per_token: float = 3.5, tokens_per_message: int = 3,
+                 base_overhead: int = 0, smoothing: float = 0.1, **kwargs):
+        """
+        Args:
+            chars_per_token (float): Initial characters-per-token ratio.
+            tokens_per_message (int): Formatting tokens added per chat message.
+            base_overhead (int): Formatting tokens added once per request.
+            smoothing (float): Weight of each new observation in the ratio average.
+            **kwargs: Memo options, as for TokenCounter.
+        """
+        super().__init__(**kwargs)
+        self.chars_per_token = chars_per_token
+        self.tokens_per_message = tokens_per_message
+        self.base_overhead = base_overhead
+        self.smoothing = smoothing
+        self.samples = 0
+
+    def count(self, text: str) -> int:
+        # Cheaper than a memo lookup, so bypass it.
+        return self._count(text) if text else 0
+
+    def _count(self, text: str) -> int:
+        return max(1, round(len(text) / self.chars_per_token))
+
+    @property
+    def request_overhead(self) -> int:
+        return self.base_overhead
+
+    def _overhead(self, messages: List[Dict[str, Any]]) -> int:
+        return self.base_overhead + self.tokens_per_message * len(messages)
+
+    def count_message(self, message: Dict[str, Any]) -> int:
+        return self.tokens_per_message + round(len(_message_text(message.get("content"))) / self.chars_per_token)
+
+    def count_messages(self, messages: List[Dict[str, Any]]) -> int:
+        chars = sum(len(_message_text(m.get("content"))) for m in messages)
+        return self._overhead(messages) + round(chars / self.chars_per_token)
+
+    def calibrate(self, messages: List[Dict[str, Any]], input_tokens: int):
+        """
+        Update the ratio from a request's actual input token count.
+
+        Args:
+            messages (List[Dict[str, Any]]): The request's messages (including any system prompt).
+            input_tokens (int): Input tokens reported by the provider.
+        """
+        chars = sum(len(_message_text(m.get("content"))) for m in messages)
+        content_tokens = input_tokens - self._overhead(messages)
+        # Tiny requests are dominated by overhead and tell us little about the ratio.
+        if chars < 64 or content_tokens <= 0:
+            return
+        ratio = min(8.0, max(1.0, chars / content_tokens))
+        with self._lock:
+            weight = max(self.smoothing, 1.0 / (self.samples + 1))
+            self.chars_per_token += weight * (ratio - self.chars_per_token)
+            self.samples += 1
+
+
+def get_token_counter(model: str) -> TokenCounter:
+    """
+    Return the shared token counter for a model.
+
+    OpenAI models get an exact tiktoken counter; Claude models (and any model
+    when tiktoken is unavailable) get a calibrated HeuristicTokenCounter.
+    Counters are created once per model, so clients using the same model share
+    the memo and the calibration.
+
+    Args:
+        model (str): Model name.
+
+    Returns:
+        TokenCounter: The counter.
+    """
+    counter = _counters.get(model)
+    if counter is not None:
+        return counter
+    encoding = None if model.startswith("claude") else get_encoding(model)
+    with _registry_lock:
+        if model not in _counters:
+            _counters[model] = TiktokenCounter(encoding) if encoding is not None else HeuristicTokenCounter()
+        return _counters[model]
+
+
+def count_tokens(text: str, model: str = "gpt-4o") -> int:
+    """
+    Count the tokens in a string for a model.
+    """
+    return get_token_counter(model).count(text)
@@ -40,10 +40,10 @@ try:
     start = time.time()
     limited_func()
     limited_func()
-    limited_func() # This should trigger sleep
+    limited_func() # This should wait for the bucket to refill (0.5s at 2/sec)
     duration = time.time() - start
     
-    if duration >= 1.0:
+    if duration >= 0.5:
         logger.info(f"✅ Rate limiter working (took {duration:.2f}s for 3 calls with limit 2/sec).")
     else:
         logger.warning(f"⚠️ Rate limiter might not be working strictly (took {duration:.2f}s).")
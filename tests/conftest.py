@@ -0,0 +1,15 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from examples.mock_server import MockLLMServer
+
+
+@pytest.fixture(scope="module")
+def mock_server():
+    """A mock OpenAI/Anthropic server shared by the tests of a module."""
+    with MockLLMServer() as server:
+        yield server
@@ -0,0 +1,47 @@
+import asyncio
+import time
+from typing import Optional
+
+from src.llm.base import BaseLLMClient
+
+
+class FakeClient(BaseLLMClient):
+    """
+    Answers with its name after `delay` seconds, or raises `error` if one is set.
+
+    Both can be changed between calls; `calls` counts the calls started.
+    """
+
+    provider = "fake"
+
+    def __init__(self, name: str, delay: float = 0.0, error: Optional[Exception] = None):
+        self.name = name
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.rate_limits = {}
+
+    def generate(self, prompt: str, **kwargs) -> str:
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return self.name
+
+    async def generate_async(self, prompt: str, **kwargs) -> str:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return self.name
+
+    def get_token_count(self, text: str) -> int:
+        return len(text.split())
+
+
+class StatusError(Exception):
+    """An API error with an HTTP status, like the SDKs' APIStatusError."""
+
+    def __init__(self, status_code: int, message: str = "error"):
+        super().__init__(f"{status_code}: {message}")
+        self.status_code = status_code
@@ -0,0 +1,203 @@
+import asyncio
+import threading
+
+import pytest
+
+from examples.mock_server import MockLLMServer
+from src.handlers.error_handler import ErrorHandler
+from src.llm.claude_client import ClaudeClient
+from src.llm.http_pool import HTTPPool
+from src.llm.openai_client import OpenAIClient
+
+
+@pytest.fixture(params=["openai", "anthropic"])
+def make_client(request, mock_server):
+    def make(server=mock_server, **kwargs):
+        if request.param == "openai":
+            return OpenAIClient(api_key="mock", model="gpt-4o-mini", base_url=server.openai_base_url, **kwargs)
+        return ClaudeClient(api_key="mock", model="claude-3-5-haiku-20241022",
+                            base_url=server.anthropic_base_url, **kwargs)
+    return make
+
+
+def test_generate_async(make_client):
+    client = make_client()
+    assert asyncio.run(client.generate_async("hello")) == "Echo: hello"
+
+
+def test_generate_batch_async_keeps_input_order(make_client):
+    client = make_client()
+    prompts = [f"prompt {i}" for i in range(20)]
+
+    results = asyncio.run(client.generate_batch_async(prompts, concurrency=4))
+
+    assert [r.index for r in results] == list(range(20))
+    assert [r.response for r in results] == [f"Echo: {p}" for p in prompts]
+    assert all(r.success for r in results)
+
+
+def test_generate_batch_async_reports_failures_per_prompt(make_client):
+    with MockLLMServer(error_rate=1.0) as server:
+        client = make_client(server, error_handler=ErrorHandler(max_attempts=1))
+        results = asyncio.run(client.generate_batch_async(["a", "b", "c"]))
+
+    assert [r.prompt for r in results] == ["a", "b", "c"]
+    assert not any(r.success for r in results)
+    assert all(r.error is not None for r in results)
+
+
+def test_one_async_client_per_event_loop(make_client):
+    client = make_client()
+
+    async def clients_used():
+        first = client.async_client
+        await asyncio.gather(*(client.generate_async(f"p{i}") for i in range(5)))
+        return first, client.async_client
+
+    first, second = asyncio.run(clients_used())
+    other, _ = asyncio.run(clients_used())
+
+    assert first is second
+    assert other is not first
+
+
+def test_async_client_is_closed_with_its_loop(make_client):
+    client = make_client()
+
+    async def use():
+        await client.generate_async("hello")
+        return client.async_client
+
+    sdk_client = asyncio.run(use())
+
+    assert sdk_client.is_closed()
+    assert asyncio.run(use()) is not sdk_client
+
+
+def test_aclose_closes_the_loops_client(make_client):
+    client = make_client()
+
+    async def use_and_close():
+        await client.generate_async("hello")
+        sdk_client = client.async_client
+        await client.aclose()
+        await client.aclose()
+        return sdk_client, client.async_client
+
+    closed, fresh = asyncio.run(use_and_close())
+
+    assert closed.is_closed()
+    assert fresh is not closed
+
+
+def test_aclose_leaves_a_shared_pool_open(make_client):
+    pool = HTTPPool()
+    client = make_client(http_pool=pool)
+    other = make_client(http_pool=pool)
+
+    async def run():
+        await client.generate_async("a")
+        await client.aclose()
+        return await other.generate_async("b")
+
+    assert asyncio.run(run()) == "Echo: b"
+    pool.close()
+
+
+def test_close_closes_the_sync_client(make_client):
+    client = make_client()
+    assert client.generate("hello") == "Echo: hello"
+    sdk_client = client.client
+
+    client.close()
+
+    assert sdk_client.is_closed()
+    assert client.generate("again") == "Echo: again"
+
+
+async def current_client(client):
+    return client.async_client
+
+def test_each_asyncio_run_closes_its_own_client(make_client):
+    client = make_client()
+
+    async def use():
+        await client.generate_async("hello")
+        return client.async_client
+
+    first = asyncio.run(use())
+    second = asyncio.run(use())
+
+    assert first is not second
+    assert first.is_closed() and second.is_closed()
+    assert not client.__dict__["_async_clients"]
+
+
+def test_close_closes_clients_on_idle_loops(make_client):
+    client = make_client()
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(client.generate_async("hello"))
+        sdk_client = loop.run_until_complete(current_client(client))
+
+        client.close()
+
+        assert sdk_client.is_closed()
+        assert not client.__dict__["_async_clients"]
+    finally:
+        loop.close()
+
+
+def test_aclose_closes_clients_on_other_loops(make_client):
+    client = make_client()
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(client.generate_async("hello"))
+        other = loop.run_until_complete(current_client(client))
+
+        async def use_and_close():
+            await client.generate_async("again")
+            current = client.async_client
+            await client.aclose()
+            return current
+
+        current = asyncio.run(use_and_close())
+
+        assert current.is_closed() and other.is_closed()
+    finally:
+        loop.close()
+
+
+def test_close_from_another_thread_closes_on_the_running_loop(make_client):
+    client = make_client()
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever)
+    thread.start()
+    try:
+        asyncio.run_coroutine_threadsafe(client.generate_async("hello"), loop).result(5)
+        sdk_client = asyncio.run_coroutine_threadsafe(current_client(client), loop).result(5)
+
+        client.close()
+        asyncio.run_coroutine_threadsafe(asyncio.sleep(0.1), loop).result(5)
+
+        assert sdk_client.is_closed()
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+
+def test_pool_close_closes_async_pools_on_idle_loops():
+    pool = HTTPPool()
+    loop = asyncio.new_event_loop()
+    try:
+        async def open_pool():
+            return pool.async_client()
+
+        http_client = loop.run_until_complete(open_pool())
+
+        pool.close()
+
+        assert http_client.is_closed
+    finally:
+        loop.close()
@@ -0,0 +1,102 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src.utils.cache import Cache
+from tests.fakes import FakeClient
+
+
+class EchoClient(FakeClient):
+    """
+    Echoes prompts, fails the ones containing "fail", and records the peak
+    number of calls in flight. Earlier prompts take longer, so finishing
+    order is the reverse of input order.
+    """
+
+    def __init__(self, prompts, delay=0.02):
+        super().__init__("echo")
+        self.delays = {prompt: delay * (len(prompts) - i) / len(prompts) for i, prompt in enumerate(prompts)}
+        self.in_flight = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def _enter(self, prompt):
+        with self.lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+
+    def _exit(self, prompt):
+        with self.lock:
+            self.in_flight -= 1
+        if "fail" in prompt:
+            raise ValueError(prompt)
+        return f"Echo: {prompt}"
+
+    def generate(self, prompt, **kwargs):
+        self._enter(prompt)
+        time.sleep(self.delays[prompt])
+        return self._exit(prompt)
+
+    async def generate_async(self, prompt, **kwargs):
+        self._enter(prompt)
+        await asyncio.sleep(self.delays[prompt])
+        return self._exit(prompt)
+
+
+PROMPTS = [f"prompt {i}" if i % 4 else f"fail {i}" for i in range(16)]
+
+
+@pytest.fixture(params=["sync", "async"])
+def run_batch(request):
+    def run(client, prompts, **kwargs):
+        if request.param == "sync":
+            return client.generate_batch(prompts, **kwargs)
+        return asyncio.run(client.generate_batch_async(prompts, **kwargs))
+    return run
+
+
+def test_results_keep_input_order(run_batch):
+    client = EchoClient(PROMPTS)
+    results = run_batch(client, PROMPTS, concurrency=8)
+
+    assert [r.index for r in results] == list(range(len(PROMPTS)))
+    assert [r.prompt for r in results] == PROMPTS
+
+
+def test_failures_are_isolated_per_prompt(run_batch):
+    client = EchoClient(PROMPTS)
+    results = run_batch(client, PROMPTS, concurrency=8)
+
+    failed = [r for r in results if not r.success]
+    assert [r.prompt for r in failed] == [p for p in PROMPTS if "fail" in p]
+    assert all(isinstance(r.error, ValueError) and r.response is None for r in failed)
+    assert [r.response for r in results if r.success] == [f"Echo: {p}" for p in PROMPTS if "fail" not in p]
+    assert client.calls == len(PROMPTS)
+
+
+@pytest.mark.parametrize("concurrency", [1, 3])
+def test_concurrency_bound_is_respected(run_batch, concurrency):
+    client = EchoClient(PROMPTS)
+    run_batch(client, PROMPTS, concurrency=concurrency)
+
+    assert client.peak == concurrency
+
+
+def test_cached_prompts_skip_the_call(run_batch, tmp_path):
+    cache = Cache(cache_dir=str(tmp_path))
+    client = EchoClient(PROMPTS)
+    prompts = [p for p in PROMPTS if "fail" not in p]
+    run_batch(client, prompts, cache=cache)
+
+    results = run_batch(client, prompts, cache=cache)
+
+    assert all(r.cached and r.success for r in results)
+    assert client.calls == len(prompts)
+    cache.close()
+
+
+def test_empty_batch(run_batch):
+    assert run_batch(EchoClient([]), []) == []
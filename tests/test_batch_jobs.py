@@ -0,0 +1,238 @@
+import json
+
+import pytest
+
+from examples.mock_server import MockLLMServer
+from src.llm.batch_jobs import MANIFEST_NAME, AnthropicBatchAPI, BatchJob, BatchJobError, OpenAIBatchAPI
+from src.llm.claude_client import ClaudeClient
+from src.llm.openai_client import OpenAIClient
+
+PROMPTS = [f"Summarize ticket #{i}" for i in range(25)]
+
+
+class Crash(Exception):
+    """Stands in for the process dying."""
+
+
+@pytest.fixture(params=["openai", "anthropic"])
+def provider(request):
+    return request.param
+
+
+@pytest.fixture
+def server():
+    with MockLLMServer() as server:
+        yield server
+
+
+def make_client(provider, server):
+    if provider == "openai":
+        return OpenAIClient(api_key="mock", model="gpt-4o-mini", base_url=server.openai_base_url)
+    return ClaudeClient(api_key="mock", model="claude-3-5-haiku-20241022", base_url=server.anthropic_base_url)
+
+
+def make_job(provider, server, job_dir, prompts=PROMPTS, **kwargs):
+    kwargs.setdefault("poll_interval", 0.01)
+    return BatchJob(make_client(provider, server), prompts, str(job_dir), **kwargs)
+
+
+def read_lines(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_chunks_respect_the_request_limit(provider, server, tmp_path):
+    job = make_job(provider, server, tmp_path, max_requests=10)
+
+    assert [chunk["count"] for chunk in job.chunks] == [10, 10, 5]
+    assert [chunk["start"] for chunk in job.chunks] == [0, 10, 20]
+    for chunk in job.chunks:
+        assert len(read_lines(tmp_path / chunk["input"])) == chunk["count"]
+
+
+def test_chunks_respect_the_byte_limit(provider, server, tmp_path):
+    probe = make_job(provider, server, tmp_path / "probe")
+    line_bytes = len((tmp_path / "probe" / probe.chunks[0]["input"]).read_bytes().splitlines(keepends=True)[0])
+    max_bytes = 3 * line_bytes + line_bytes // 2
+
+    job = make_job(provider, server, tmp_path / "job", max_bytes=max_bytes)
+
+    assert all(chunk["bytes"] <= max_bytes for chunk in job.chunks)
+    assert all(chunk["count"] == 3 for chunk in job.chunks[:-1])
+    assert sum(chunk["count"] for chunk in job.chunks) == len(PROMPTS)
+    for chunk in job.chunks:
+        assert (tmp_path / "job" / chunk["input"]).stat().st_size == chunk["bytes"]
+
+
+def test_request_over_the_byte_limit_is_rejected(provider, server, tmp_path):
+    with pytest.raises(ValueError):
+        make_job(provider, server, tmp_path, max_bytes=100)
+
+
+def test_results_are_ordered_by_custom_id(provider, server, tmp_path):
+    job = make_job(provider, server, tmp_path, max_requests=10)
+    job.wait()
+    # Providers return results in any order.
+    for chunk in job.chunks:
+        path = tmp_path / chunk["results"]
+        lines = path.read_text(encoding="utf-8").splitlines(keepends=True)
+        path.write_text("".join(reversed(lines)), encoding="utf-8")
+
+    results = make_job(provider, server, tmp_path, max_requests=10).run()
+
+    assert [r.index for r in results] == list(range(len(PROMPTS)))
+    assert [r.response for r in results] == [f"Echo: {prompt}" for prompt in PROMPTS]
+
+
+def test_per_request_failures_keep_their_place(provider, tmp_path):
+    with MockLLMServer(error_rate=0.3, seed=7) as server:
+        results = make_job(provider, server, tmp_path, max_requests=10).run()
+
+    assert [r.index for r in results] == list(range(len(PROMPTS)))
+    failed = [r for r in results if not r.success]
+    assert 0 < len(failed) < len(PROMPTS)
+    assert all(isinstance(r.error, BatchJobError) for r in failed)
+    assert all(r.response == f"Echo: {r.prompt}" for r in results if r.success)
+
+
+def test_rerun_resumes_from_the_manifest(provider, server, tmp_path):
+    first = make_job(provider, server, tmp_path, max_requests=10).run()
+    batches = server.stats["batches"]
+
+    again = make_job(provider, server, tmp_path, max_requests=10).run()
+
+    assert server.stats["batches"] == batches == 3
+    assert [r.response for r in again] == [r.response for r in first]
+
+
+def test_resume_polls_submitted_batches(provider, tmp_path):
+    with MockLLMServer(batch_latency=0.2) as server:
+        job = make_job(provider, server, tmp_path, max_requests=10)
+        job.submit()
+        assert {chunk["status"] for chunk in job.chunks} == {"running"}
+
+        resumed = make_job(provider, server, tmp_path, max_requests=10)
+        results = resumed.run()
+
+        assert server.stats["batches"] == 3
+    assert resumed.stats()["done"] == 3
+    assert all(r.success for r in results)
+
+
+def test_directory_of_another_job_is_refused(provider, server, tmp_path):
+    make_job(provider, server, tmp_path)
+    with pytest.raises(ValueError):
+        make_job(provider, server, tmp_path, prompts=PROMPTS[:5])
+
+
+def test_recovers_from_a_crash_between_submit_and_manifest_write(provider, server, tmp_path, monkeypatch):
+    job = make_job(provider, server, tmp_path)
+    save = BatchJob._save
+
+    def crash_once_submitted(self):
+        if any(chunk["status"] == "running" for chunk in self.chunks):
+            raise Crash()
+        save(self)
+
+    monkeypatch.setattr(BatchJob, "_save", crash_once_submitted)
+    with pytest.raises(Crash):
+        job.submit()
+    monkeypatch.setattr(BatchJob, "_save", save)
+    assert server.stats["batches"] == 1
+    with open(tmp_path / MANIFEST_NAME, "r", encoding="utf-8") as f:
+        assert json.load(f)["chunks"][0]["status"] == "submitting"
+
+    results = make_job(provider, server, tmp_path).run()
+
+    assert all(r.success for r in results)
+    if provider == "openai":
+        # The batch is found by its metadata rather than submitted twice.
+        assert server.stats["batches"] == 1
+    else:
+        # Message batches have no metadata to match, so the chunk is resubmitted.
+        assert server.stats["batches"] == 2
+
+
+def test_failed_batch_fails_its_requests(server, tmp_path, monkeypatch):
+    # The mock rejects lines whose url does not match the batch endpoint.
+    monkeypatch.setattr(OpenAIBatchAPI, "line", lambda self, custom_id, request: {
+        "custom_id": custom_id, "method": "POST", "url": "/v1/embeddings", "body": request})
+
+    results = make_job("openai", server, tmp_path, max_requests=10).run()
+
+    assert len(results) == len(PROMPTS)
+    assert not any(r.success for r in results)
+    assert all(isinstance(r.error, BatchJobError) and "Batch failed" in str(r.error) for r in results)
+
+
+def test_expired_batch_fails_its_requests(provider, tmp_path):
+    with MockLLMServer(batch_latency=1.0, batch_window=0.1) as server:
+        job = make_job(provider, server, tmp_path, max_requests=10)
+        results = job.run()
+
+    assert job.stats()["done"] == 3
+    assert len(results) == len(PROMPTS)
+    assert not any(r.success for r in results)
+    assert all(isinstance(r.error, BatchJobError) and "expired" in str(r.error) for r in results)
+
+
+def timeout_after_accepting(monkeypatch, api_cls):
+    """Make the next submit reach the server and then time out, as a dropped response would."""
+    submit = api_cls.submit
+    calls = []
+
+    def flaky_submit(self, sdk, payload, metadata):
+        calls.append(metadata)
+        batch_id = submit(self, sdk, payload, metadata)
+        if len(calls) == 1:
+            raise TimeoutError("timed out after the batch was created")
+        return batch_id
+
+    monkeypatch.setattr(api_cls, "submit", flaky_submit)
+    return calls
+
+
+def test_submit_timeout_finds_the_accepted_batch(server, tmp_path, monkeypatch):
+    calls = timeout_after_accepting(monkeypatch, OpenAIBatchAPI)
+
+    results = make_job("openai", server, tmp_path).run()
+
+    assert len(calls) == 1
+    assert server.stats["batches"] == 1
+    assert all(r.success for r in results)
+
+
+def test_submit_timeout_is_not_retried_without_lookup(server, tmp_path, monkeypatch):
+    calls = timeout_after_accepting(monkeypatch, AnthropicBatchAPI)
+    job = make_job("anthropic", server, tmp_path)
+
+    with pytest.raises(TimeoutError):
+        job.submit()
+
+    assert len(calls) == 1
+    assert server.stats["batches"] == 1
+    assert job.chunks[0]["status"] == "submitting"
+
+
+def test_crash_recovery_finds_batches_beyond_the_first_page(server, tmp_path, monkeypatch):
+    job = make_job("openai", server, tmp_path)
+    save = BatchJob._save
+
+    def crash_once_submitted(self):
+        if any(chunk["status"] == "running" for chunk in self.chunks):
+            raise Crash()
+        save(self)
+
+    monkeypatch.setattr(BatchJob, "_save", crash_once_submitted)
+    with pytest.raises(Crash):
+        job.submit()
+    monkeypatch.setattr(BatchJob, "_save", save)
+    # Newer batches from other jobs push ours off the first page of the list.
+    for i in range(250):
+        server.create_batch(False, [], endpoint=OpenAIBatchAPI.endpoint, input_file_id="file_other",
+                            metadata={"batch_job": "other", "chunk": str(i)})
+
+    results = make_job("openai", server, tmp_path).run()
+
+    assert server.stats["batches"] == 251
+    assert all(r.success for r in results)
@@ -0,0 +1,206 @@
+import threading
+
+import pytest
+
+from src.utils import cache as cache_module
+from src.utils.cache import Cache, MemoryCache, TieredCache
+
+
+@pytest.fixture
+def make_cache(tmp_path):
+    caches = []
+
+    def make(**kwargs):
+        cache = Cache(cache_dir=str(tmp_path), **kwargs)
+        caches.append(cache)
+        return cache
+
+    yield make
+    for cache in caches:
+        cache.close()
+
+
+def accessed_at(cache, key):
+    return cache._connect().execute(
+        "SELECT accessed_at FROM entries WHERE key = ?", (cache._get_cache_key(key),)
+    ).fetchone()[0]
+
+
+def backdate(cache, key, seconds):
+    with cache._transaction() as conn:
+        conn.execute("UPDATE entries SET accessed_at = accessed_at - ? WHERE key = ?",
+                     (seconds, cache._get_cache_key(key)))
+
+
+def test_size_cap_is_enforced(make_cache):
+    cache = make_cache(max_size_bytes=100)
+    for i in range(20):
+        cache.set(f"key-{i}", "x" * 20)
+
+    assert cache.size_bytes <= 100
+    assert len(cache) == 4
+    assert cache.stats.evictions == 16
+    # The newest entries survive.
+    assert set(cache.get_many([f"key-{i}" for i in range(20)])) == {f"key-{i}" for i in range(16, 20)}
+
+
+def test_least_recently_used_entry_is_evicted(make_cache):
+    cache = make_cache(max_size_bytes=70, touch_interval=0)
+    for key in ("a", "b", "c"):
+        cache.set(key, "x" * 20)
+        backdate(cache, key, 10)
+    assert cache.get("a") is not None
+
+    cache.set("d", "x" * 20)
+
+    assert cache.get("b") is None
+    assert set(cache.get_many(["a", "c", "d"])) == {"a", "c", "d"}
+
+
+def test_hits_within_the_touch_interval_do_not_write(make_cache):
+    cache = make_cache(max_size_bytes=1000, touch_interval=60)
+    cache.set("hot", "value")
+    first = accessed_at(cache, "hot")
+
+    for _ in range(10):
+        assert cache.get("hot") == "value"
+    assert accessed_at(cache, "hot") == first
+
+    backdate(cache, "hot", 120)
+    cache.get("hot")
+    assert accessed_at(cache, "hot") > first
+
+
+def test_unbounded_cache_never_touches_entries(make_cache):
+    cache = make_cache(touch_interval=0)
+    cache.set("key", "value")
+    backdate(cache, "key", 120)
+    stored = accessed_at(cache, "key")
+
+    cache.get("key")
+
+    assert accessed_at(cache, "key") == stored
+
+
+def test_concurrent_readers_count_every_lookup(make_cache):
+    cache = make_cache(max_size_bytes=10_000, touch_interval=0)
+    cache.set_many({f"key-{i}": i for i in range(10)})
+    errors = []
+
+    def read():
+        try:
+            for _ in range(50):
+                found = cache.get_many([f"key-{i}" for i in range(12)])
+                assert found == {f"key-{i}": i for i in range(10)}
+        except Exception as e:
+            errors.append(e)
+        finally:
+            cache.close()
+
+    threads = [threading.Thread(target=read) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert cache.stats.hits == 8 * 50 * 10
+    assert cache.stats.misses == 8 * 50 * 2
+
+
+class FakeClock:
+    """Stands in for the `time` module: time only moves when advance() is called."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def time(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache_module, "time", clock)
+    return clock
+
+
+def test_memory_cache_evicts_least_recently_used_entries():
+    cache = MemoryCache(max_entries=3)
+    for key in ("a", "b", "c"):
+        cache.set(key, key)
+    cache.get("a")
+
+    cache.set("d", "d")
+
+    assert cache.get("b") is None
+    assert cache.get_many(["a", "c", "d"]) == {"a": "a", "c": "c", "d": "d"}
+    assert cache.stats.evictions == 1
+
+
+def test_memory_cache_stays_under_its_byte_bound():
+    cache = MemoryCache(max_bytes=100)
+    for i in range(10):
+        cache.set(f"key-{i}", "x" * 30)
+
+    assert cache.size_bytes == 90
+    assert len(cache) == 3
+
+    cache.set("huge", "x" * 101)
+    assert cache.get("huge") is None
+    assert len(cache) == 3
+
+
+def test_memory_cache_replacing_a_value_keeps_the_size_exact():
+    cache = MemoryCache()
+    cache.set("key", "x" * 10)
+    cache.set("key", "x" * 4)
+    cache.set("other", {"a": 1})
+
+    assert cache.size_bytes == 4 + len('{"a": 1}')
+    cache.delete("key")
+    assert cache.size_bytes == len('{"a": 1}')
+
+
+def test_memory_cache_entries_expire(clock):
+    cache = MemoryCache(ttl=10)
+    cache.set("default", 1)
+    cache.set("longer", 2, ttl=60)
+
+    clock.advance(30)
+
+    assert cache.get("default") is None
+    assert cache.get("longer") == 2
+    assert cache.size_bytes == 1
+    assert (cache.stats.hits, cache.stats.misses) == (1, 1)
+
+
+def test_tiered_cache_promotes_disk_hits(make_cache):
+    disk = make_cache()
+    disk.set_many({"a": 1, "b": 2})
+    tiered = TieredCache(disk, MemoryCache())
+
+    assert tiered.get("a") == 1
+    assert tiered.get_many(["a", "b", "c"]) == {"a": 1, "b": 2}
+    assert tiered.get("b") == 2
+
+    assert tiered.stats()["disk"]["hits"] == 2
+    assert tiered.stats()["memory"]["hits"] == 2
+    assert tiered.stats()["disk"]["misses"] == 1
+
+
+def test_tiered_cache_writes_and_deletes_both_tiers(make_cache):
+    tiered = TieredCache(make_cache(), MemoryCache())
+    tiered.set("key", "value")
+    assert tiered.memory.get("key") == tiered.disk.get("key") == "value"
+
+    tiered.delete("key")
+
+    assert tiered.get("key") is None
+    assert len(tiered.memory) == len(tiered.disk) == 0
@@ -0,0 +1,129 @@
+import asyncio
+
+import pytest
+
+from src.prompt_engineering.chain import PromptChain
+from src.prompt_engineering.templates import PromptTemplate
+from src.utils.cache import Cache
+from tests.fakes import FakeClient
+
+
+class TemplateClient(FakeClient):
+    """Answers `[prompt]` after `delay`, fails prompts containing "fail", and records prompts and concurrency."""
+
+    def __init__(self, delay=0.0):
+        super().__init__("chain", delay=delay)
+        self.prompts = []
+        self.in_flight = 0
+        self.peak = 0
+
+    async def generate_async(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        if "fail" in prompt:
+            raise RuntimeError(f"cannot answer {prompt}")
+        return f"[{prompt}]"
+
+
+def diamond(client, **kwargs):
+    return (PromptChain(client, **kwargs)
+            .add_step("outline", "outline {topic}")
+            .add_step("intro", "intro for {outline}", depends_on=["outline"])
+            .add_step("body", "body for {outline}", depends_on=["outline"])
+            .add_step("final", "join {intro} and {body}", depends_on=["intro", "body"]))
+
+
+def test_outputs_flow_into_dependent_steps():
+    result = diamond(TemplateClient()).run({"topic": "bees"})
+
+    assert result.success
+    assert result.outputs["final"] == "[join [intro for [outline bees]] and [body for [outline bees]]]"
+
+
+def test_independent_steps_run_concurrently():
+    client = TemplateClient(delay=0.1)
+    chain = PromptChain(client)
+    for i in range(4):
+        chain.add_step(f"step{i}", f"prompt {i}")
+
+    result = chain.run()
+
+    assert client.peak == 4
+    assert result.elapsed < 0.3
+
+
+def test_concurrency_limit_is_respected():
+    client = TemplateClient(delay=0.02)
+    chain = PromptChain(client, concurrency=2)
+    for i in range(6):
+        chain.add_step(f"step{i}", f"prompt {i}")
+
+    assert chain.run().success
+    assert client.peak == 2
+
+
+def test_cycle_is_rejected():
+    chain = (PromptChain(TemplateClient())
+             .add_step("a", "{c}", depends_on=["c"])
+             .add_step("b", "{a}", depends_on=["a"])
+             .add_step("c", "{b}", depends_on=["b"]))
+
+    with pytest.raises(ValueError, match="Cycle"):
+        chain.run()
+
+
+def test_unknown_dependency_and_duplicate_names_are_rejected():
+    chain = PromptChain(TemplateClient()).add_step("a", "{missing}", depends_on=["missing"])
+    with pytest.raises(ValueError, match="unknown step 'missing'"):
+        chain.run()
+    with pytest.raises(ValueError, match="Duplicate"):
+        chain.add_step("a", "again")
+
+
+def test_failed_dependency_skips_its_dependents():
+    client = TemplateClient()
+    chain = (PromptChain(client)
+             .add_step("broken", "fail here")
+             .add_step("uses_broken", "use {broken}", depends_on=["broken"])
+             .add_step("independent", "still fine"))
+
+    result = chain.run()
+
+    assert not result.success
+    assert isinstance(result.steps["broken"].error, RuntimeError)
+    assert "Skipped" in str(result.steps["uses_broken"].error)
+    assert result.steps["independent"].output == "[still fine]"
+    assert sorted(client.prompts) == ["fail here", "still fine"]
+
+
+def test_rerun_only_calls_changed_steps(tmp_path):
+    cache = Cache(cache_dir=str(tmp_path))
+    client = TemplateClient()
+    diamond(client, cache=cache).run({"topic": "bees"})
+    calls = len(client.prompts)
+
+    chain = diamond(client, cache=cache)
+    chain.steps["body"].prompt = PromptTemplate("body", "longer body for {outline}")
+    result = chain.run({"topic": "bees"})
+
+    assert calls == 4
+    assert client.prompts[calls:] == ["longer body for [outline bees]",
+                                      "join [intro for [outline bees]] and [longer body for [outline bees]]"]
+    assert [name for name, step in result.steps.items() if step.cached] == ["outline", "intro"]
+    cache.close()
+
+
+def test_critical_path_follows_the_slowest_branch():
+    slow = TemplateClient(delay=0.1)
+    chain = diamond(TemplateClient())
+    chain.steps["body"].client = slow
+
+    result = chain.run({"topic": "bees"})
+
+    assert result.critical_path() == ["outline", "body", "final"]
+    assert "body" in result.summary()
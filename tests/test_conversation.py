@@ -0,0 +1,128 @@
+import asyncio
+
+import pytest
+
+from src.llm.conversation import SUMMARY_SYSTEM_PROMPT, Conversation
+from tests.fakes import FakeClient
+
+# 35 characters: 10 tokens of content plus 3 of message formatting for the heuristic counter.
+TURN = "x" * 35
+TURN_TOKENS = 13
+
+
+class ChatClient(FakeClient):
+    """Replies with TURN and records every request; summary requests answer "summary N"."""
+
+    model = "claude-conversation-test"
+
+    def __init__(self, summary_error=None):
+        super().__init__("chat")
+        self.requests = []
+        self.summary_error = summary_error
+
+    def _reply(self, prompt, kwargs):
+        self.requests.append((prompt, kwargs))
+        if kwargs.get("system_prompt") == SUMMARY_SYSTEM_PROMPT:
+            if self.summary_error is not None:
+                raise self.summary_error
+            return f"summary {len(self.requests)}"
+        return TURN
+
+    def generate(self, prompt, **kwargs):
+        return self._reply(prompt, kwargs)
+
+    async def generate_async(self, prompt, **kwargs):
+        return self._reply(prompt, kwargs)
+
+
+@pytest.fixture(params=["sync", "async"])
+def send(request):
+    def send(conversation, content, **kwargs):
+        if request.param == "sync":
+            return conversation.send(content, **kwargs)
+        return asyncio.run(conversation.send_async(content, **kwargs))
+    return send
+
+
+def test_running_total_matches_a_full_count(send):
+    conversation = Conversation(ChatClient(), system_prompt="Be brief.", max_context_tokens=10_000)
+    for _ in range(5):
+        send(conversation, TURN)
+
+    messages = [{"role": "system", "content": "Be brief."}, *conversation.messages]
+    assert conversation.history_tokens == 10 * TURN_TOKENS
+    assert conversation.total_tokens == conversation.counter.count_messages(messages)
+
+
+def test_requests_carry_the_history_and_system_prompt(send):
+    client = ChatClient()
+    conversation = Conversation(client, system_prompt="Be brief.")
+    send(conversation, "first")
+    send(conversation, "second", temperature=0)
+
+    prompt, kwargs = client.requests[-1]
+    assert prompt == "second"
+    assert kwargs["system_prompt"] == "Be brief."
+    assert kwargs["temperature"] == 0
+    assert kwargs["messages"] == [{"role": "user", "content": "first"}, {"role": "assistant", "content": TURN}]
+
+
+def test_oldest_turns_are_dropped_down_to_low_water(send):
+    # Four turns fit; the fifth message overflows and trimming goes down to half the budget.
+    conversation = Conversation(ChatClient(), max_context_tokens=8 * TURN_TOKENS, low_water=0.5)
+    for i in range(4):
+        send(conversation, f"{i:035d}")
+    assert len(conversation) == 8
+
+    send(conversation, f"{4:035d}")
+
+    users = [m["content"] for m in conversation.messages if m["role"] == "user"]
+    assert users == [f"{3:035d}", f"{4:035d}"]
+    assert conversation.history_tokens == 4 * TURN_TOKENS
+
+
+def test_no_trimming_within_the_budget(send):
+    client = ChatClient()
+    conversation = Conversation(client, max_context_tokens=8 * TURN_TOKENS, summarize=True)
+    for _ in range(4):
+        send(conversation, TURN)
+
+    assert len(conversation) == 8
+    assert len(client.requests) == 4
+
+
+def test_dropped_turns_are_folded_into_the_summary(send):
+    client = ChatClient()
+    conversation = Conversation(client, system_prompt="Be brief.", max_context_tokens=8 * TURN_TOKENS,
+                                low_water=0.5, summarize=True)
+    for i in range(5):
+        send(conversation, f"question {i:026d}")
+
+    summary_prompt, summary_kwargs = client.requests[-2]
+    assert summary_kwargs["system_prompt"] == SUMMARY_SYSTEM_PROMPT
+    assert f"User: question {0:026d}" in summary_prompt
+    assert conversation.summary == "summary 5"
+    system = client.requests[-1][1]["system_prompt"]
+    assert system.startswith("Be brief.") and system.endswith("summary 5")
+
+
+def test_failed_summary_discards_the_dropped_turns(send):
+    client = ChatClient(summary_error=RuntimeError("down"))
+    conversation = Conversation(client, max_context_tokens=8 * TURN_TOKENS, low_water=0.5, summarize=True)
+    for i in range(5):
+        assert send(conversation, f"question {i:026d}") == TURN
+
+    assert conversation.summary is None
+    assert len(conversation) == 4
+
+
+def test_clear_forgets_history_and_summary():
+    conversation = Conversation(ChatClient(), system_prompt="Be brief.")
+    conversation.add_message("user", TURN)
+    conversation.summary = "old"
+    conversation.clear()
+
+    assert len(conversation) == 0
+    assert conversation.summary is None
+    assert conversation.total_tokens == conversation.counter.count_messages([{"role": "system",
+                                                                              "content": "Be brief."}])
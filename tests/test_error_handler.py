@@ -0,0 +1,218 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from src.handlers import error_handler
+from src.handlers.error_handler import (CircuitBreaker, CircuitOpenError, ErrorHandler, RetryBudget,
+                                        is_provider_failure, is_retryable)
+from tests.fakes import StatusError
+
+
+class FakeClock:
+    """Stands in for the `time` module: monotonic() only moves when sleep() or advance() is called."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(error_handler, "time", clock)
+    return clock
+
+
+def with_retry_after(status_code, seconds):
+    error = StatusError(status_code)
+    error.response = SimpleNamespace(headers={"retry-after": str(seconds)})
+    return error
+
+
+class Flaky:
+    """Raises the given errors in turn, then returns "ok"."""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+
+def unlimited_budget():
+    return RetryBudget(ratio=0.0, min_per_second=1000.0)
+
+
+@pytest.mark.parametrize("error, retryable, provider_failure", [
+    (ConnectionError(), True, True),
+    (TimeoutError(), True, True),
+    (StatusError(500), True, True),
+    (StatusError(503), True, True),
+    (StatusError(408), True, True),
+    (StatusError(429), True, False),
+    (StatusError(409), True, False),
+    (StatusError(400), False, False),
+    (StatusError(401), False, False),
+    (ValueError(), False, False),
+])
+def test_errors_are_classified(error, retryable, provider_failure):
+    assert is_retryable(error) is retryable
+    assert is_provider_failure(error) is provider_failure
+
+
+def test_transient_errors_are_retried_with_jittered_backoff(clock):
+    handler = ErrorHandler(budget=unlimited_budget(), max_attempts=3, base_delay=0.5)
+    func = Flaky(StatusError(503), ConnectionError())
+
+    assert handler.call(func) == "ok"
+    assert func.calls == 3
+    assert len(clock.sleeps) == 2
+    assert 0 <= clock.sleeps[0] <= 0.5 and 0 <= clock.sleeps[1] <= 1.0
+
+
+def test_attempts_are_capped(clock):
+    handler = ErrorHandler(budget=unlimited_budget(), max_attempts=2)
+    func = Flaky(StatusError(500), StatusError(502), StatusError(503))
+
+    with pytest.raises(StatusError) as raised:
+        handler.call(func)
+    assert raised.value.status_code == 502
+    assert func.calls == 2
+
+
+def test_client_errors_are_not_retried(clock):
+    func = Flaky(StatusError(400))
+
+    with pytest.raises(StatusError):
+        ErrorHandler(budget=unlimited_budget()).call(func)
+    assert func.calls == 1
+    assert clock.sleeps == []
+
+
+def test_retry_false_makes_one_attempt(clock):
+    func = Flaky(StatusError(503))
+
+    with pytest.raises(StatusError):
+        ErrorHandler(budget=unlimited_budget()).call(func, retry=False)
+    assert func.calls == 1
+
+
+def test_retry_after_is_honoured_up_to_a_limit(clock):
+    handler = ErrorHandler(budget=unlimited_budget(), max_retry_after=10.0)
+
+    assert handler.call(Flaky(with_retry_after(429, 4))) == "ok"
+    assert clock.sleeps == [4.0]
+
+    func = Flaky(with_retry_after(429, 30))
+    with pytest.raises(StatusError):
+        handler.call(func)
+    assert func.calls == 1
+
+
+def test_retry_budget_caps_retries_at_a_fraction_of_requests(clock):
+    budget = RetryBudget(ratio=0.5, min_per_second=0.0, window=10.0)
+    for _ in range(4):
+        budget.record_request()
+
+    assert [budget.try_retry() for _ in range(3)] == [True, True, False]
+
+    clock.advance(11)
+    assert budget.try_retry() is False
+    budget.record_request()
+    budget.record_request()
+    assert budget.try_retry() is True
+
+
+def test_exhausted_budget_stops_retrying(clock):
+    budget = RetryBudget(ratio=0.0, min_per_second=0.0)
+    func = Flaky(StatusError(503))
+
+    with pytest.raises(StatusError):
+        ErrorHandler(budget=budget).call(func)
+    assert func.calls == 1
+
+
+def test_breaker_opens_after_consecutive_failures_and_probes_after_recovery(clock):
+    breaker = CircuitBreaker("test", failure_threshold=3, recovery_time=30.0)
+    for _ in range(3):
+        breaker.before_call()
+        breaker.record(StatusError(503))
+    assert breaker.state == CircuitBreaker.OPEN
+
+    with pytest.raises(CircuitOpenError) as raised:
+        breaker.before_call()
+    assert raised.value.retry_after == pytest.approx(30.0)
+
+    clock.advance(30)
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record(None)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_failed_probe_reopens_the_breaker(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_time=5.0)
+    breaker.record(ConnectionError())
+    clock.advance(5)
+    breaker.before_call()
+
+    breaker.record(TimeoutError())
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.opened_at == clock.now
+
+
+def test_responses_from_a_live_provider_reset_the_failure_count(clock):
+    breaker = CircuitBreaker("test", failure_threshold=2)
+    breaker.record(StatusError(500))
+    breaker.record(StatusError(429))
+    breaker.record(StatusError(500))
+
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_handler_fails_fast_while_the_breaker_is_open(clock):
+    breaker = CircuitBreaker("test", failure_threshold=2, recovery_time=30.0)
+    handler = ErrorHandler(breaker=breaker, budget=unlimited_budget(), max_attempts=5, base_delay=0.0)
+    func = Flaky(*[StatusError(503)] * 5)
+
+    with pytest.raises(CircuitOpenError):
+        handler.call(func)
+    assert func.calls == 2
+
+
+def test_cancelled_async_call_frees_the_probe_slot(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_time=1.0)
+    breaker.record(ConnectionError())
+    clock.advance(1)
+    handler = ErrorHandler(breaker=breaker, budget=unlimited_budget())
+
+    async def cancelled():
+        task = asyncio.ensure_future(handler.acall(asyncio.sleep, 10))
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancelled())
+
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.before_call()
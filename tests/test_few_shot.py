@@ -0,0 +1,101 @@
+import math
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from src.prompt_engineering.few_shot import BM25Index, FewShotSelector, tokenize
+
+MODEL = "claude-few-shot-test"
+DOCS = [
+    "the cat sat on the mat",
+    "dogs chase the cat",
+    "stock prices fell sharply today",
+    "the cat and the dog are friends",
+    "interest rates and stock markets",
+]
+EXAMPLES = [
+    {"input": "Is the cat on the mat?", "output": "yes"},
+    {"input": "Did stock prices fall?", "output": "yes, sharply"},
+    {"input": "Do dogs chase cats?", "output": "often"},
+    {"input": "What moves stock markets? " + "rates " * 60, "output": "many things"},
+]
+
+
+def reference_bm25(docs, query, k1=1.5, b=0.75):
+    tokenized = [tokenize(doc) for doc in docs]
+    avg_length = sum(map(len, tokenized)) / len(tokenized)
+    scores = []
+    for tokens in tokenized:
+        counts = Counter(tokens)
+        score = 0.0
+        for term in set(tokenize(query)):
+            df = sum(term in doc for doc in tokenized)
+            tf = counts[term]
+            if not tf:
+                continue
+            idf = math.log(1 + (len(docs) - df + 0.5) / (df + 0.5))
+            score += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * len(tokens) / avg_length))
+        scores.append(score)
+    return scores
+
+
+@pytest.mark.parametrize("query", ["cat", "the cat", "stock rates", "Dog friends!", "unknown words"])
+def test_scores_match_the_bm25_formula(query):
+    index = BM25Index.build(DOCS)
+
+    np.testing.assert_allclose(index.scores(query), reference_bm25(DOCS, query), rtol=1e-5)
+
+
+def test_top_ranks_best_first_and_drops_non_matches():
+    index = BM25Index.build(DOCS)
+
+    # The shorter document outranks the longer one matching the same term.
+    assert index.top("cat mat", 10) == [0, 1, 3]
+    assert index.top("cat mat", 1) == [0]
+    assert index.top("nothing matches", 3) == []
+
+
+def test_max_postings_bounds_common_terms():
+    docs = ["common"] * 5 + ["common rare"]
+    full = BM25Index.build(docs, max_postings=None)
+    capped = BM25Index.build(docs, max_postings=2)
+
+    assert np.count_nonzero(full.scores("common")) == 6
+    assert np.count_nonzero(capped.scores("common")) == 2
+    assert capped.top("rare", 1) == [5]
+
+
+@pytest.fixture
+def selector():
+    return FewShotSelector(EXAMPLES, model=MODEL)
+
+
+def test_select_returns_the_most_relevant_examples(selector):
+    assert selector.select("do dogs chase the cat", k=2) == [EXAMPLES[2], EXAMPLES[0]]
+    assert selector.select("where is the cat", k=2) == [EXAMPLES[0]]
+    assert selector.select("stock", k=1) == [EXAMPLES[1]]
+
+
+def test_select_skips_examples_over_the_budget(selector):
+    budget = int(selector.token_counts[1]) + 5
+    assert int(selector.token_counts[3]) > budget
+
+    assert selector.select("stock markets rates", k=2, max_tokens=budget) == [EXAMPLES[1]]
+
+
+def test_build_prompt_puts_examples_before_the_query(selector):
+    prompt = selector.build_prompt("is the cat here?", k=1, instruction="Answer briefly.")
+
+    assert prompt == "Answer briefly.\n\nInput: Is the cat on the mat?\nOutput: yes\n\nInput: is the cat here?\nOutput:"
+
+
+def test_saved_selector_loads_memory_mapped(selector, tmp_path):
+    selector.save(str(tmp_path / "shots"))
+
+    loaded = FewShotSelector.load(str(tmp_path / "shots"))
+
+    assert isinstance(loaded.index.weights, np.memmap)
+    assert loaded.examples == EXAMPLES
+    for query in ("cat", "stock rates", "dogs"):
+        assert loaded.select(query, k=3, max_tokens=100) == selector.select(query, k=3, max_tokens=100)
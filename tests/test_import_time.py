@@ -0,0 +1,58 @@
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Importing the package and its clients must stay cheap: provider SDKs, tiktoken,
+# YAML and numpy are only imported when first used.
+IMPORT_BUDGET_SECONDS = 0.5
+LAZY_MODULES = ("openai", "anthropic", "tiktoken", "yaml", "numpy")
+IMPORT_CHECK = f"""
+import json, sys
+import src
+from src import Cache, ClaudeClient, ClientPool, OpenAIClient, RateLimiter, RouterClient
+print(json.dumps([m for m in {LAZY_MODULES!r} if m in sys.modules]))
+"""
+
+
+def import_package():
+    """
+    Import the package in a fresh interpreter under `-X importtime`.
+
+    Returns:
+        tuple: (lazy modules that got loaded, [(seconds, module)] of each top-level
+        import made after interpreter startup).
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", IMPORT_CHECK], cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    loaded = json.loads(result.stdout.strip().splitlines()[-1])
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Nested imports are indented and already counted in their parent's cumulative time.
+        if name.startswith(" ") and not name.startswith("  "):
+            name = name.strip()
+            if name == "site":
+                # Everything up to here is interpreter startup.
+                imports = []
+            else:
+                imports.append((int(cumulative) / 1e6, name))
+    return loaded, imports
+
+
+def test_package_import_does_not_load_heavy_dependencies():
+    loaded, _ = import_package()
+
+    assert loaded == []
+
+
+def test_package_import_stays_within_budget():
+    _, imports = import_package()
+
+    elapsed = sum(seconds for seconds, _ in imports)
+    slowest = ", ".join(f"{name} {seconds * 1000:.0f} ms" for seconds, name in sorted(imports, reverse=True)[:5])
+    assert elapsed <= IMPORT_BUDGET_SECONDS, f"Importing the package took {elapsed:.3f}s; slowest: {slowest}"
@@ -0,0 +1,110 @@
+import io
+import json
+import logging
+import os
+import queue
+import sys
+from logging.handlers import QueueListener
+
+import pytest
+
+from src.utils import logger as logger_module
+from src.utils.logger import JsonFormatter, _PipelineHandler, _queue_handler, setup_logger
+
+
+def log_through_queue(formatter: logging.Formatter, **record_args) -> str:
+    """Send one record through the queue pipeline and return what the listener wrote."""
+    records: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    output = io.StringIO()
+    handler = logging.StreamHandler(output)
+    handler.setFormatter(formatter)
+    listener = QueueListener(records, handler)
+    listener.start()
+    try:
+        record = logging.getLogger("tests.logger").makeRecord(
+            "tests.logger", logging.ERROR, __file__, 1, "request %s failed", ("abc",), **record_args)
+        # emit() skips handle(), which would start the process-wide pipeline.
+        _PipelineHandler(records).emit(record)
+    finally:
+        listener.stop()
+    return output.getvalue()
+
+
+def fail():
+    raise ValueError("bad response")
+
+
+def current_exc_info():
+    try:
+        fail()
+    except ValueError:
+        return sys.exc_info()
+
+
+def test_json_output_includes_the_traceback():
+    entry = json.loads(log_through_queue(JsonFormatter(), exc_info=current_exc_info()))
+
+    assert entry["message"] == "request abc failed"
+    assert entry["level"] == "ERROR"
+    assert entry["exception"].startswith("Traceback (most recent call last):")
+    assert "in fail" in entry["exception"]
+    assert entry["exception"].endswith("ValueError: bad response")
+
+
+def test_json_output_without_an_exception_has_no_exception_field():
+    entry = json.loads(log_through_queue(JsonFormatter(), exc_info=None))
+
+    assert entry["message"] == "request abc failed"
+    assert "exception" not in entry
+
+
+def test_text_output_includes_the_traceback_once():
+    text = log_through_queue(logging.Formatter("%(levelname)s %(message)s"), exc_info=current_exc_info())
+
+    assert text.startswith("ERROR request abc failed\nTraceback (most recent call last):")
+    assert text.count("ValueError: bad response") == 1
+
+
+def test_queued_record_does_not_keep_the_traceback_alive():
+    record = logging.getLogger("tests.logger").makeRecord(
+        "tests.logger", logging.ERROR, __file__, 1, "failed", None, current_exc_info())
+
+    prepared = _PipelineHandler(queue.SimpleQueue()).prepare(record)
+
+    assert prepared.exc_info is None
+    assert "ValueError: bad response" in prepared.exc_text
+    assert record.exc_info is not None
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires os.fork")
+def test_forked_child_starts_its_own_pipeline(tmp_path, monkeypatch):
+    log_path = tmp_path / "child.log"
+    config_path = tmp_path / "logging_config.yaml"
+    config_path.write_text(
+        f"console:\n  enabled: false\nfile:\n  path: {log_path}\n  format: '%(process)d %(message)s'\n",
+        encoding="utf-8")
+    parent_logger = setup_logger("tests.logger.fork")
+    parent_logger.info("parent is logging")
+    parent_listener = logger_module._listener
+    assert parent_listener is not None
+    # Only the child reads the config: the parent's pipeline is already running.
+    monkeypatch.setattr(logger_module, "_config_path", str(config_path))
+
+    pid = os.fork()
+    if pid == 0:
+        code = 1
+        try:
+            assert logger_module._listener is None
+            assert _queue_handler.queue is logger_module._queue
+            parent_logger.warning("child warning")
+            listener = logger_module._listener
+            listener.stop()
+            code = 0 if listener is not parent_listener and logger_module._queue.empty() else 2
+        finally:
+            os._exit(code)
+
+    _, status = os.waitpid(pid, 0)
+
+    assert os.WEXITSTATUS(status) == 0
+    assert f"{pid} child warning" in log_path.read_text(encoding="utf-8")
+    assert logger_module._listener is parent_listener
@@ -0,0 +1,137 @@
+import threading
+import urllib.request
+
+import pytest
+
+from src.llm.openai_client import OpenAIClient
+from src.utils.cache import CacheStats
+from src.utils.metrics import LLM_LATENCY, LLM_REQUESTS, MetricsRegistry, start_http_server
+
+
+class StatsHolder:
+    def __init__(self, hits=0, misses=0):
+        self.stats = CacheStats(hits=hits, misses=misses)
+
+
+def test_counter_values_and_exposition():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests.", ("provider", "status"))
+    requests.inc("openai", "ok")
+    requests.inc("openai", "ok", amount=2)
+    requests.inc('we"ird\n', "error")
+
+    assert requests.value("openai", "ok") == 3
+    assert requests.value("anthropic", "ok") == 0
+    assert registry.render_prometheus().splitlines()[:4] == [
+        "# HELP requests_total Requests.",
+        "# TYPE requests_total counter",
+        'requests_total{provider="openai",status="ok"} 3',
+        'requests_total{provider="we\\"ird\\n",status="error"} 1',
+    ]
+
+
+def test_metrics_are_registered_once_per_name():
+    registry = MetricsRegistry()
+    first = registry.counter("calls_total", "Calls.")
+
+    assert registry.counter("calls_total", "Calls.") is first
+
+
+def test_histogram_buckets_are_cumulative_and_upper_inclusive():
+    registry = MetricsRegistry()
+    latency = registry.histogram("latency_seconds", "Latency.", ("model",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        latency.observe(value, "m")
+
+    lines = [line for line in registry.render_prometheus().splitlines() if line.startswith("latency_seconds")]
+
+    assert lines == [
+        'latency_seconds_bucket{model="m",le="0.1"} 2',
+        'latency_seconds_bucket{model="m",le="1"} 3',
+        'latency_seconds_bucket{model="m",le="+Inf"} 4',
+        'latency_seconds_sum{model="m"} 2.65',
+        'latency_seconds_count{model="m"} 4',
+    ]
+
+
+def test_histogram_quantiles_interpolate_within_buckets():
+    registry = MetricsRegistry()
+    latency = registry.histogram("latency_seconds", "Latency.", buckets=(1.0, 2.0, 4.0))
+    for value in [0.5] * 50 + [1.5] * 40 + [3.0] * 10:
+        latency.observe(value)
+
+    assert latency.quantile(0.5) == pytest.approx(1.0)
+    assert latency.quantile(0.7) == pytest.approx(1.5)
+    assert latency.quantile(0.95) == pytest.approx(3.0)
+    assert registry.histogram("empty_seconds", "Empty.").quantile(0.5) is None
+
+    snapshot = registry.snapshot()["latency_seconds"][0]
+    assert (snapshot["count"], snapshot["p50"]) == (100, pytest.approx(1.0))
+    assert snapshot["mean"] == pytest.approx((25 + 60 + 30) / 100)
+
+
+def test_concurrent_observations_are_all_counted():
+    registry = MetricsRegistry()
+    latency = registry.histogram("latency_seconds", "Latency.")
+
+    def observe():
+        for _ in range(1000):
+            latency.observe(0.2)
+
+    threads = [threading.Thread(target=observe) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert registry.snapshot()["latency_seconds"][0]["count"] == 8000
+
+
+def test_cache_stats_are_summed_per_label_while_the_cache_lives():
+    registry = MetricsRegistry()
+    first, second = StatsHolder(hits=3, misses=1), StatsHolder(hits=1, misses=3)
+    registry.track_cache(first, "disk")
+    registry.track_cache(second, "disk")
+
+    assert registry.snapshot()["caches"]["disk"]["hit_ratio"] == 0.5
+    assert 'cache_hits_total{cache="disk"} 4' in registry.render_prometheus()
+
+    del first, second
+    assert registry.snapshot()["caches"] == {}
+
+
+def test_reset_keeps_metrics_registered():
+    registry = MetricsRegistry()
+    counter = registry.counter("calls_total", "Calls.")
+    counter.inc()
+
+    registry.reset()
+
+    assert counter.value() == 0
+    assert registry.counter("calls_total", "Calls.") is counter
+
+
+def test_client_requests_are_recorded(mock_server):
+    client = OpenAIClient(api_key="mock", model="metrics-test-model", base_url=mock_server.openai_base_url)
+    before = LLM_REQUESTS.value("openai", "metrics-test-model", "ok")
+
+    client.generate("hello")
+    client.generate("again")
+
+    assert LLM_REQUESTS.value("openai", "metrics-test-model", "ok") == before + 2
+    assert LLM_LATENCY.quantile(0.5, "openai", "metrics-test-model") is not None
+
+
+def test_http_server_serves_the_default_registry():
+    LLM_REQUESTS.inc("test", "served-model", "ok")
+    server = start_http_server(port=0)
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        with urllib.request.urlopen(url, timeout=5) as response:
+            body = response.read().decode("utf-8")
+            content_type = response.headers["Content-Type"]
+    finally:
+        server.shutdown()
+
+    assert content_type.startswith("text/plain; version=0.0.4")
+    assert 'llm_requests_total{provider="test",model="served-model",status="ok"}' in body
@@ -0,0 +1,192 @@
+import asyncio
+import time
+
+import pytest
+
+from examples.mock_server import MockLLMServer
+from src.llm.claude_client import ClaudeClient
+from src.llm.openai_client import OpenAIClient
+from src.llm.pool import ClientPool, PoolMember
+from tests.fakes import FakeClient, StatusError
+
+
+@pytest.fixture
+def server():
+    with MockLLMServer(requests_per_minute=100) as server:
+        yield server
+
+
+@pytest.mark.parametrize("client_cls", [OpenAIClient, ClaudeClient])
+def test_rate_limits_are_per_client(server, client_cls):
+    if client_cls is OpenAIClient:
+        options = {"model": "gpt-4o-mini", "base_url": server.openai_base_url}
+    else:
+        options = {"model": "claude-3-5-haiku-20241022", "base_url": server.anthropic_base_url}
+    busy = client_cls(api_key="mock", **options)
+    idle = client_cls(api_key="mock", **options)
+
+    for _ in range(10):
+        busy.generate("hi")
+
+    assert busy.rate_limits["requests"]["limit"] == 100
+    assert idle.rate_limits == {}
+    assert PoolMember(busy, "busy").quota_fraction() < 1.0
+    assert PoolMember(idle, "idle").quota_fraction() == 1.0
+
+
+def test_pool_reports_each_members_quota(server):
+    first = OpenAIClient(api_key="mock", base_url=server.openai_base_url)
+    second = OpenAIClient(api_key="mock", base_url=server.openai_base_url)
+    pool = ClientPool([first, second], names=["first", "second"])
+
+    for _ in range(5):
+        first.generate("hi")
+
+    quotas = {member["name"]: member["quota_remaining"] for member in pool.stats()}
+    assert quotas["first"] < 1.0
+    assert quotas["second"] == 1.0
+
+
+def member(pool, name):
+    return next(m for m in pool.members if m.name == name)
+
+
+def test_requests_go_to_the_least_loaded_member():
+    pool = ClientPool([FakeClient("a"), FakeClient("b"), FakeClient("c")], names=["a", "b", "c"])
+
+    picked = [pool._pick([]).name for _ in range(6)]
+
+    assert sorted(picked[:3]) == ["a", "b", "c"]
+    assert sorted(picked[3:]) == ["a", "b", "c"]
+
+
+def test_concurrent_calls_spread_across_members():
+    clients = [FakeClient("a", delay=0.05), FakeClient("b", delay=0.05)]
+    pool = ClientPool(clients, names=["a", "b"])
+
+    async def main():
+        return await asyncio.gather(*(pool.generate_async("hi") for _ in range(10)))
+
+    results = asyncio.run(main())
+
+    assert sorted(results) == ["a"] * 5 + ["b"] * 5
+    assert all(m["in_flight"] == 0 for m in pool.stats())
+
+
+def test_slow_and_low_weight_members_get_less_traffic():
+    pool = ClientPool([FakeClient("fast"), FakeClient("slow"), FakeClient("light")],
+                      names=["fast", "slow", "light"], weights=[1.0, 1.0, 0.25])
+    member(pool, "fast").latency = 0.1
+    member(pool, "slow").latency = 0.4
+    member(pool, "light").latency = 0.1
+
+    picked = [pool._pick([]).name for _ in range(8)]
+
+    # Cost is (in_flight + 1) * latency / weight: 0.1 per slot for "fast", 0.4 for the others.
+    assert picked.count("fast") == 6
+    assert picked.count("slow") == 1
+    assert picked.count("light") == 1
+
+
+def test_failing_member_is_ejected_then_probed_back():
+    flaky = FakeClient("flaky", error=ConnectionError("down"))
+    pool = ClientPool([flaky, FakeClient("steady")], names=["flaky", "steady"], eject_after=2,
+                      ejection_time=0.2)
+    member(pool, "steady").latency = 1.0
+    member(pool, "flaky").latency = 0.01
+
+    # Each failure on "flaky" fails over to "steady".
+    assert [pool.generate("hi") for _ in range(2)] == ["steady", "steady"]
+    stats = {m["name"]: m for m in pool.stats()}
+    assert stats["flaky"]["failures"] == 2
+    assert stats["flaky"]["ejections"] == 1
+    assert stats["flaky"]["ejected_for"] > 0
+
+    # While ejected, it gets nothing.
+    assert pool.generate("hi") == "steady"
+    assert flaky.calls == 2
+
+    # Once the ejection expires, one probe goes to it; a success restores it.
+    time.sleep(0.25)
+    flaky.error = None
+    assert pool.generate("hi") == "flaky"
+    restored = member(pool, "flaky")
+    assert (restored.consecutive_failures, restored.ejections, restored.ejected_until) == (0, 0, 0.0)
+
+
+def test_repeated_ejections_back_off():
+    pool = ClientPool([FakeClient("a", error=ConnectionError("down"))], eject_after=1, ejection_time=0.05,
+                      max_ejection_time=0.15)
+    a = pool.members[0]
+
+    durations = []
+    for _ in range(4):
+        time.sleep(max(0.0, a.ejected_until - time.monotonic()))
+        with pytest.raises(ConnectionError):
+            pool.generate("hi")
+        durations.append(a.ejected_until - time.monotonic())
+
+    assert durations[0] == pytest.approx(0.05, abs=0.02)
+    assert durations[1] == pytest.approx(0.10, abs=0.02)
+    assert durations[2] == pytest.approx(0.15, abs=0.02)
+    assert durations[3] == pytest.approx(0.15, abs=0.02)
+
+
+def test_request_errors_are_raised_without_failover():
+    bad = FakeClient("bad", error=StatusError(400, "invalid request"))
+    other = FakeClient("other")
+    pool = ClientPool([bad, other], names=["bad", "other"])
+    member(pool, "other").latency = 1.0
+    member(pool, "bad").latency = 0.01
+
+    with pytest.raises(StatusError):
+        pool.generate("hi")
+
+    assert other.calls == 0
+    assert member(pool, "bad").failures == 0
+
+
+def test_rate_limited_member_is_skipped_until_retry_after():
+    limited = FakeClient("limited", error=StatusError(429, "rate limited"))
+    pool = ClientPool([limited, FakeClient("other")], names=["limited", "other"])
+    member(pool, "other").latency = 1.0
+    member(pool, "limited").latency = 0.01
+
+    assert pool.generate("hi") == "other"
+    assert member(pool, "limited").is_ejected(time.monotonic())
+
+
+def test_cancelled_calls_release_their_slot():
+    slow = FakeClient("slow", delay=1.0)
+    pool = ClientPool([slow, FakeClient("other", delay=1.0)], names=["slow", "other"])
+
+    async def main():
+        for _ in range(3):
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(pool.generate_async("hi"), timeout=0.02)
+
+    asyncio.run(main())
+
+    for stats in pool.stats():
+        assert (stats["in_flight"], stats["successes"], stats["failures"]) == (0, 0, 0)
+
+
+def test_ejected_member_is_probed_after_a_cancelled_call():
+    flaky = FakeClient("flaky", error=ConnectionError("down"))
+    pool = ClientPool([flaky], eject_after=1, ejection_time=0.05)
+    a = pool.members[0]
+
+    async def main():
+        with pytest.raises(ConnectionError):
+            await pool.generate_async("hi")
+        await asyncio.sleep(0.06)
+        # The probe is cancelled (e.g. a caller's timeout) ...
+        flaky.delay, flaky.error = 1.0, None
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(pool.generate_async("hi"), timeout=0.02)
+        # ... which must not keep the member from being probed again.
+        flaky.delay = 0.0
+        return await pool.generate_async("hi")
+
+    assert asyncio.run(main()) == "flaky"
+    assert (a.in_flight, a.consecutive_failures) == (0, 0)
@@ -0,0 +1,255 @@
+import multiprocessing
+
+import pytest
+
+from src.utils import rate_limiter
+from src.utils.rate_limiter import RateLimiter, SharedRateLimiter, parse_rate_limit_headers, parse_retry_after
+
+
+class FakeClock:
+    """Stands in for the `time` module: monotonic() only moves when sleep() or advance() is called."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter, "time", clock)
+    return clock
+
+
+def test_bursts_up_to_max_calls_then_waits(clock):
+    limiter = RateLimiter(max_calls=2, period=1.0)
+
+    for _ in range(3):
+        limiter.acquire()
+
+    assert clock.sleeps == [pytest.approx(0.5)]
+
+
+def test_token_budget_is_reconciled_with_actual_usage(clock):
+    limiter = RateLimiter(max_calls=100, period=1.0, tokens_per_minute=600)
+    limiter.acquire(cost=600)
+    limiter.reconcile(estimated=600, actual=100)
+
+    limiter.acquire(cost=500)
+
+    assert clock.sleeps == []
+
+
+def test_retry_after_pauses_new_calls(clock):
+    limiter = RateLimiter(max_calls=10, period=1.0)
+
+    limiter.on_rate_limited(retry_after=5.0)
+    limiter.acquire()
+
+    assert clock.sleeps == [pytest.approx(5.0)]
+    assert limiter.requests.rate == 10.0
+
+
+def test_429_decreases_rates_multiplicatively(clock):
+    limiter = RateLimiter(max_calls=60, period=60.0, tokens_per_minute=6000, adaptive=True)
+
+    limiter.on_rate_limited()
+
+    assert limiter.requests.rate == pytest.approx(0.5)
+    assert limiter.tokens.rate == pytest.approx(50.0)
+    # The burst allowance is spent, so the next call waits at the new rate.
+    assert limiter.requests.level <= 0.0
+
+
+def test_429s_from_requests_already_in_flight_back_off_once(clock):
+    limiter = RateLimiter(max_calls=60, period=60.0, adaptive=True)
+
+    limiter.on_rate_limited()
+    limiter.on_rate_limited()
+    assert limiter.requests.rate == pytest.approx(0.5)
+
+    clock.advance(1.0 / 0.5)
+    limiter.on_rate_limited()
+    assert limiter.requests.rate == pytest.approx(0.25)
+
+
+def test_decrease_stops_at_min_fraction(clock):
+    limiter = RateLimiter(max_calls=60, period=60.0, adaptive=True, min_fraction=0.1)
+
+    for _ in range(10):
+        limiter.on_rate_limited()
+        clock.advance(limiter.backoff_until - clock.now)
+
+    assert limiter.requests.rate == pytest.approx(0.1)
+
+
+def test_retry_after_extends_the_backoff_window(clock):
+    limiter = RateLimiter(max_calls=60, period=60.0, adaptive=True)
+
+    limiter.on_rate_limited(retry_after=10.0)
+    clock.advance(5.0)
+    limiter.on_rate_limited()
+
+    assert limiter.blocked_until == pytest.approx(1010.0)
+    assert limiter.requests.rate == pytest.approx(0.5)
+
+
+def test_healthy_responses_increase_rates_additively(clock):
+    limiter = RateLimiter(max_calls=60, period=60.0, adaptive=True, increase_fraction=0.1)
+    limiter.on_rate_limited()
+
+    limiter.update_from_limits({})
+    assert limiter.requests.rate == pytest.approx(0.6)
+    limiter.update_from_limits({})
+    assert limiter.requests.rate == pytest.approx(0.7)
+
+    for _ in range(10):
+        limiter.update_from_limits({})
+    assert limiter.requests.rate == pytest.approx(1.0)
+
+
+def test_provider_limit_becomes_the_ceiling(clock):
+    limiter = RateLimiter(max_calls=60, period=60.0, adaptive=True, increase_fraction=0.5)
+
+    limiter.update_from_limits({"requests": {"limit": 120.0, "remaining": 100.0}})
+    assert limiter.requests.max_rate == pytest.approx(2.0)
+    assert limiter.requests.rate == pytest.approx(2.0)
+
+    limiter.update_from_limits({"requests": {"limit": 30.0, "remaining": 30.0}})
+    assert limiter.requests.rate == pytest.approx(0.5)
+
+
+def test_budget_is_capped_at_what_the_provider_says_remains(clock):
+    limiter = RateLimiter(max_calls=60, period=60.0, adaptive=True)
+
+    limiter.update_from_limits({"requests": {"limit": 60.0, "remaining": 3.0}})
+
+    assert limiter.requests.level == pytest.approx(3.0)
+
+
+def test_no_increase_without_headroom(clock):
+    limiter = RateLimiter(max_calls=60, period=60.0, adaptive=True, headroom=0.1)
+    limiter.on_rate_limited()
+
+    limiter.update_from_limits({"requests": {"limit": 60.0, "remaining": 5.0}})
+
+    assert limiter.requests.rate == pytest.approx(0.5)
+
+
+def test_update_from_headers_reads_provider_headers(clock):
+    limiter = RateLimiter(max_calls=60, period=60.0, tokens_per_minute=1000, adaptive=True)
+
+    limiter.update_from_headers({
+        "anthropic-ratelimit-requests-limit": "120",
+        "anthropic-ratelimit-requests-remaining": "119",
+        "anthropic-ratelimit-tokens-limit": "6000",
+        "anthropic-ratelimit-tokens-remaining": "10",
+    })
+
+    assert limiter.requests.max_rate == pytest.approx(2.0)
+    assert limiter.tokens.max_rate == pytest.approx(100.0)
+    assert limiter.tokens.level == pytest.approx(10.0)
+
+
+def test_non_adaptive_limiter_ignores_limits(clock):
+    limiter = RateLimiter(max_calls=60, period=60.0)
+
+    limiter.on_rate_limited()
+    limiter.update_from_limits({"requests": {"limit": 600.0, "remaining": 1.0}})
+
+    assert limiter.requests.rate == pytest.approx(1.0)
+    assert limiter.requests.max_rate == pytest.approx(1.0)
+
+
+def test_parse_rate_limit_headers_normalizes_both_providers():
+    openai = parse_rate_limit_headers({"x-ratelimit-limit-requests": "500", "x-ratelimit-remaining-requests": "499",
+                                       "x-ratelimit-reset-requests": "1m30s", "x-ratelimit-reset-tokens": "20ms"})
+
+    assert openai == {"requests": {"limit": 500.0, "remaining": 499.0, "reset": 90.0},
+                      "tokens": {"reset": pytest.approx(0.02)}}
+    assert parse_rate_limit_headers({"Anthropic-Ratelimit-Tokens-Remaining": "42"}) == {
+        "tokens": {"remaining": 42.0}}
+
+
+def test_parse_retry_after():
+    assert parse_retry_after({"retry-after-ms": "1500", "retry-after": "9"}) == pytest.approx(1.5)
+    assert parse_retry_after({"Retry-After": "3"}) == 3.0
+    assert parse_retry_after({}) is None
+
+
+@pytest.fixture
+def shared_path(tmp_path):
+    return str(tmp_path / "limits.bin")
+
+
+def test_shared_limiters_draw_from_one_budget(clock, shared_path):
+    first = SharedRateLimiter(max_calls=2, period=1.0, path=shared_path)
+    second = SharedRateLimiter(max_calls=2, period=1.0, path=shared_path)
+
+    first.acquire()
+    first.acquire()
+    second.acquire()
+
+    assert clock.sleeps == [pytest.approx(0.5)]
+    first.close()
+    second.close()
+
+
+def test_shared_limiters_share_retry_after(clock, shared_path):
+    first = SharedRateLimiter(max_calls=10, period=1.0, path=shared_path)
+    second = SharedRateLimiter(max_calls=10, period=1.0, path=shared_path)
+
+    first.on_rate_limited(retry_after=5.0)
+    second.acquire()
+
+    assert clock.sleeps == [pytest.approx(5.0)]
+    first.close()
+    second.close()
+
+
+def test_changed_configuration_resets_the_shared_state(clock, shared_path):
+    old = SharedRateLimiter(max_calls=1, period=1.0, path=shared_path)
+    old.acquire()
+    old.close()
+
+    new = SharedRateLimiter(max_calls=5, period=1.0, path=shared_path)
+    for _ in range(5):
+        new.acquire()
+
+    assert clock.sleeps == []
+    new.close()
+
+
+def _reserve_in_child(limiter, calls, results):
+    results.put([limiter._reserve(0) for _ in range(calls)])
+
+
+def test_forked_processes_share_one_budget(shared_path):
+    # Refill is negligible at this rate, so exactly `max_calls` reservations are free.
+    limiter = SharedRateLimiter(max_calls=10, period=1000.0, path=shared_path)
+    waits = [limiter._reserve(0) for _ in range(2)]
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    children = [context.Process(target=_reserve_in_child, args=(limiter, 6, results)) for _ in range(3)]
+    for child in children:
+        child.start()
+    for _ in children:
+        waits += results.get(timeout=10)
+    for child in children:
+        child.join(timeout=10)
+
+    assert len(waits) == 20
+    assert sum(1 for wait in waits if wait <= 0) == 10
+    # Each further reservation queues one refill interval (100 s) behind the last.
+    assert max(waits) == pytest.approx(1000.0, rel=0.01)
+    limiter.close()
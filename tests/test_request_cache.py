@@ -0,0 +1,46 @@
+import pytest
+
+from examples.mock_server import MockLLMServer
+from src.llm.openai_client import OpenAIClient
+from src.llm.utils import request_cache_key, stable_hash
+from src.utils.cache import Cache
+
+REQUEST = {"model": "gpt-4o-mini", "messages": [{"role": "user", "content": "hi"}], "temperature": 0}
+
+
+def test_key_covers_the_endpoint():
+    default = request_cache_key("openai", REQUEST)
+    proxy = request_cache_key("openai", REQUEST, "https://proxy.example/v1")
+
+    assert proxy != default
+    assert proxy == request_cache_key("openai", dict(REQUEST), "https://proxy.example/v1")
+    assert proxy != request_cache_key("openai", REQUEST, "https://other.example/v1")
+
+
+def test_default_endpoint_keeps_its_key():
+    assert request_cache_key("openai", REQUEST) == \
+        f"openai:{stable_hash({'provider': 'openai', 'request': REQUEST})}"
+
+
+def test_key_covers_the_request():
+    assert request_cache_key("openai", REQUEST) != request_cache_key("openai", {**REQUEST, "temperature": 0.5})
+    assert request_cache_key("openai", REQUEST) != request_cache_key("anthropic", REQUEST)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = Cache(cache_dir=str(tmp_path))
+    yield cache
+    cache.close()
+
+
+def test_clients_on_different_endpoints_do_not_share_entries(cache):
+    with MockLLMServer() as first, MockLLMServer() as second:
+        clients = [OpenAIClient(api_key="mock", model="gpt-4o-mini", base_url=server.openai_base_url,
+                                cache=cache, temperature=0) for server in (first, second)]
+
+        for client in clients:
+            assert client.generate("hi") == "Echo: hi"
+        assert clients[1].generate("hi") == "Echo: hi"
+
+        assert (first.stats["requests"], second.stats["requests"]) == (1, 1)
@@ -0,0 +1,91 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.llm.router import RouterClient
+from tests.fakes import FakeClient
+
+
+def down(name, **kwargs):
+    return FakeClient(name, error=ConnectionError(f"{name} is down"), **kwargs)
+
+
+def make_router(clients, latencies):
+    router = RouterClient(clients, min_samples=1)
+    for tracker, seconds in zip(router.latencies, latencies):
+        tracker.record(seconds)
+    return router
+
+
+def run(router, mode):
+    if mode == "sync":
+        return router.generate("hi")
+    return asyncio.run(router.generate_async("hi"))
+
+
+@pytest.fixture(params=["sync", "async"])
+def mode(request):
+    return request.param
+
+
+def test_slow_primary_is_hedged(mode):
+    router = make_router([FakeClient("primary", delay=0.5), FakeClient("backup")], [0.02, 0.02])
+
+    assert run(router, mode) == "backup"
+    stats = router.stats()
+    assert (stats["hedges"], stats["hedge_wins"], stats["failovers"]) == (1, 1, 0)
+
+
+def test_hedge_delay_after_failover_is_the_failover_clients(mode):
+    # "primary" is fast when it works, "second" is normally slow: after failing
+    # over, "second" must get its own (long) hedge delay, not the primary's.
+    clients = [down("primary"), FakeClient("second", delay=0.2), FakeClient("third")]
+    router = make_router(clients, [0.01, 5.0, 0.01])
+
+    assert run(router, mode) == "second"
+    stats = router.stats()
+    assert (stats["hedges"], stats["hedge_wins"], stats["failovers"]) == (0, 0, 1)
+    assert clients[2].calls == 0
+
+
+def test_win_by_a_hedged_client_is_not_counted_for_another(mode):
+    clients = [down("primary"), FakeClient("second", delay=0.1), FakeClient("third", delay=1.0)]
+    router = make_router(clients, [0.01, 0.02, 0.01])
+
+    assert run(router, mode) == "second"
+    stats = router.stats()
+    assert (stats["hedges"], stats["hedge_wins"], stats["failovers"]) == (1, 0, 1)
+
+
+def test_all_clients_failing_raises_the_last_error(mode):
+    router = make_router([down("a"), down("b")], [0.01, 0.01])
+
+    with pytest.raises(ConnectionError, match="b is down"):
+        run(router, mode)
+
+
+def test_counters_are_exact_under_concurrency():
+    router = make_router([down("primary"), FakeClient("backup")], [1.0, 1.0])
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        results = list(executor.map(lambda _: router.generate("hi"), range(200)))
+
+    assert results == ["backup"] * 200
+    stats = router.stats()
+    assert (stats["requests"], stats["failovers"]) == (200, 200)
+
+
+def test_close_shuts_down_the_hedging_threads():
+    clients = [FakeClient("primary", delay=0.5), FakeClient("backup")]
+    router = make_router(clients, [0.02, 0.02])
+    assert router.generate("hi") == "backup"
+    workers = set(router.executor._threads)
+
+    router.close()
+
+    for worker in workers:
+        worker.join(timeout=2)
+    assert not any(worker.is_alive() for worker in workers)
+    with pytest.raises(RuntimeError):
+        router.executor.submit(lambda: None)
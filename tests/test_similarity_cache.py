@@ -0,0 +1,124 @@
+import numpy as np
+import pytest
+
+from src.utils.similarity_cache import SimilarityCache, normalize_prompt
+
+PROMPT = "Summarize the following customer review in two sentences: the blender arrived quickly, " \
+         "works well on ice and frozen fruit, but it is louder than my old one and the lid leaks."
+NEAR_DUPLICATE = PROMPT.replace("two sentences", "2 sentences")
+UNRELATED = "Translate 'good morning, how are you today?' into French, Spanish and German."
+
+
+@pytest.fixture
+def make_cache(tmp_path):
+    caches = []
+
+    def make(name="cache", **kwargs):
+        cache = SimilarityCache(cache_dir=str(tmp_path / name), **kwargs)
+        caches.append(cache)
+        return cache
+
+    yield make
+    for cache in caches:
+        cache.close()
+
+
+def test_normalization_ignores_case_punctuation_and_spacing():
+    assert normalize_prompt("  Hello,   WORLD!\n") == "hello world"
+
+
+def test_trivial_variant_is_an_exact_hit(make_cache):
+    cache = make_cache()
+    cache.set(PROMPT, "summary")
+
+    response, similarity = cache.lookup(PROMPT.upper().replace(",", ""))
+
+    assert (response, similarity) == ("summary", 1.0)
+
+
+def test_near_duplicate_above_the_threshold_hits(make_cache):
+    cache = make_cache(threshold=0.8)
+    cache.set(PROMPT, "summary")
+
+    response, similarity = cache.lookup(NEAR_DUPLICATE)
+
+    assert response == "summary"
+    assert 0.8 <= similarity < 1.0
+    assert cache.stats.hits == 1
+
+
+def test_near_duplicate_below_a_stricter_threshold_misses(make_cache):
+    cache = make_cache(threshold=0.99)
+    cache.set(PROMPT, "summary")
+
+    response, similarity = cache.lookup(NEAR_DUPLICATE)
+
+    assert response is None
+    assert similarity < 0.99
+    assert cache.stats.misses == 1
+
+
+def test_dissimilar_prompt_misses(make_cache):
+    cache = make_cache()
+    cache.set(PROMPT, "summary")
+
+    assert cache.lookup(UNRELATED) == (None, 0.0)
+    assert cache.get(UNRELATED) is None
+
+
+def test_most_similar_entry_wins(make_cache):
+    cache = make_cache(threshold=0.5)
+    cache.set(PROMPT, "original")
+    cache.set(UNRELATED, "translation")
+    cache.set(NEAR_DUPLICATE, "near duplicate")
+
+    assert cache.get(PROMPT) == "original"
+    assert cache.get(NEAR_DUPLICATE) == "near duplicate"
+    assert cache.get(UNRELATED.lower()) == "translation"
+
+
+def test_results_are_deterministic_for_a_seed(make_cache):
+    first, second = make_cache("first", seed=7), make_cache("second", seed=7)
+    for cache in (first, second):
+        cache.set(PROMPT, "summary")
+
+    assert np.array_equal(first._signature(PROMPT), second._signature(PROMPT))
+    assert first.lookup(NEAR_DUPLICATE) == second.lookup(NEAR_DUPLICATE)
+    assert not np.array_equal(make_cache("other", seed=8)._signature(PROMPT), first._signature(PROMPT))
+
+
+def test_index_survives_a_restart(make_cache):
+    cache = make_cache()
+    cache.set(PROMPT, "summary")
+    cache.close()
+
+    reopened = make_cache()
+
+    assert len(reopened) == 1
+    assert reopened.get(NEAR_DUPLICATE) == "summary"
+
+
+def test_reopening_with_other_parameters_is_refused(make_cache):
+    make_cache(seed=1).set(PROMPT, "summary")
+
+    with pytest.raises(ValueError):
+        make_cache(seed=2)
+
+
+def test_exact_duplicate_overwrites_its_entry(make_cache):
+    cache = make_cache()
+    cache.set(PROMPT, "first")
+    cache.set(PROMPT.lower(), "second")
+
+    assert len(cache) == 1
+    assert cache.get(PROMPT) == "second"
+
+
+def test_entries_are_found_before_and_after_merging(make_cache):
+    cache = make_cache(merge_every=3)
+    prompts = [f"{PROMPT} Review number {i} of the batch, item {i * 7919}." for i in range(7)]
+    for i, prompt in enumerate(prompts):
+        cache.set(prompt, i)
+
+    assert cache._indexed == 6
+    assert [cache.get(prompt) for prompt in prompts] == list(range(7))
@@ -0,0 +1,113 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from examples.mock_server import MockLLMServer
+from src.llm.openai_client import OpenAIClient
+from src.utils.single_flight import SingleFlight
+
+
+def test_concurrent_threads_share_one_call():
+    flight = SingleFlight()
+    calls = []
+    release = threading.Event()
+
+    def work():
+        calls.append(1)
+        release.wait(5)
+        return "result"
+
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        futures = [executor.submit(flight.do, "key", work) for _ in range(5)]
+        while flight.stats()["executed"] + flight.stats()["coalesced"] < 5:
+            time.sleep(0.01)
+        release.set()
+        results = [f.result() for f in futures]
+
+    assert results == ["result"] * 5
+    assert len(calls) == 1
+    assert flight.stats() == {"executed": 1, "coalesced": 4}
+
+
+def test_concurrent_tasks_share_one_call():
+    flight = SingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "result"
+
+    async def main():
+        return await asyncio.gather(*(flight.do_async("key", work) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["result"] * 5
+    assert len(calls) == 1
+    assert flight.tasks == {}
+
+
+def test_loops_in_different_threads_do_not_share_tasks():
+    flight = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.05)
+        return threading.get_ident()
+
+    async def main():
+        return await asyncio.gather(*(flight.do_async("key", work) for _ in range(20)))
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(lambda _: asyncio.run(main()), range(4)))
+
+    # Every loop ran its own call and only waited for calls on that loop.
+    assert all(len(set(idents)) == 1 for idents in results)
+    assert flight.stats() == {"executed": 4, "coalesced": 76}
+    assert flight.tasks == {}
+
+
+def test_exceptions_reach_every_waiter():
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def main():
+        return await asyncio.gather(*(flight.do_async("key", fail) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(r, ValueError) for r in results)
+
+
+@pytest.fixture(scope="module")
+def slow_server():
+    with MockLLMServer(latency=0.2) as server:
+        yield server
+
+
+def concurrent_requests(server, **kwargs):
+    client = OpenAIClient(api_key="mock", model="gpt-4o-mini", base_url=server.openai_base_url)
+    before = server.stats["requests"]
+
+    async def main():
+        return await asyncio.gather(*(client.generate_async("same prompt", **kwargs) for _ in range(4)))
+
+    asyncio.run(main())
+    return server.stats["requests"] - before
+
+
+def test_deterministic_requests_are_coalesced(slow_server):
+    assert concurrent_requests(slow_server, temperature=0) == 1
+
+
+def test_sampled_requests_are_not_coalesced(slow_server):
+    assert concurrent_requests(slow_server) == 4
+
+
+def test_sampled_requests_coalesce_on_request(slow_server):
+    assert concurrent_requests(slow_server, coalesce=True) == 1
+    assert concurrent_requests(slow_server, force_cache=True) == 1
+    assert concurrent_requests(slow_server, temperature=0, coalesce=False) == 4
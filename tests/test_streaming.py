@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+
+from examples.mock_server import MockLLMServer
+from src.llm.claude_client import ClaudeClient
+from src.llm.openai_client import OpenAIClient
+
+PROMPT = "Tell me a long enough story to arrive in several chunks."
+
+
+@pytest.fixture(scope="module")
+def server():
+    with MockLLMServer(chunk_chars=8) as server:
+        yield server
+
+
+@pytest.fixture(params=["openai", "anthropic"])
+def client(request, server):
+    if request.param == "openai":
+        return OpenAIClient(api_key="mock", model="gpt-4o-mini", base_url=server.openai_base_url)
+    return ClaudeClient(api_key="mock", model="claude-3-5-haiku-20241022", base_url=server.anthropic_base_url)
+
+
+def test_stream_yields_deltas_and_records_usage(client):
+    stream = client.generate_stream(PROMPT)
+
+    deltas = list(stream)
+
+    assert len(deltas) > 1
+    assert "".join(deltas) == stream.text == f"Echo: {PROMPT}"
+    assert stream.usage and stream.usage["output_tokens"] > 0
+    assert stream.stop_reason is not None
+
+
+def test_iterating_a_finished_stream_replays_its_text(client, server):
+    stream = client.generate_stream(PROMPT)
+    first = "".join(stream)
+    usage, stop_reason = stream.usage, stream.stop_reason
+    requests = server.stats["requests"]
+
+    assert list(stream) == [first]
+    assert server.stats["requests"] == requests
+    assert (stream.usage, stream.stop_reason) == (usage, stop_reason)
+
+
+def test_iterating_an_unfinished_stream_again_raises(client, server):
+    stream = client.generate_stream(PROMPT)
+    deltas = iter(stream)
+    next(deltas)
+    requests = server.stats["requests"]
+
+    with pytest.raises(RuntimeError):
+        list(stream)
+    assert server.stats["requests"] == requests
+    deltas.close()
+
+
+def test_async_stream_is_sent_once(client, server):
+    async def main():
+        stream = client.agenerate_stream(PROMPT)
+        first = "".join([delta async for delta in stream])
+        requests = server.stats["requests"]
+        again = [delta async for delta in stream]
+        return stream, first, again, server.stats["requests"] - requests
+
+    stream, first, again, sent = asyncio.run(main())
+
+    assert first == stream.text == f"Echo: {PROMPT}"
+    assert again == [first]
+    assert sent == 0
+
+
+def test_async_unfinished_stream_again_raises(client):
+    async def main():
+        stream = client.agenerate_stream(PROMPT)
+        deltas = stream.__aiter__()
+        await deltas.__anext__()
+        try:
+            with pytest.raises(RuntimeError):
+                [delta async for delta in stream]
+        finally:
+            await deltas.aclose()
+
+    asyncio.run(main())
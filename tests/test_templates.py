@@ -0,0 +1,95 @@
+from pathlib import Path
+
+import pytest
+
+from src.prompt_engineering.templates import PromptTemplate, TemplateRegistry, get_registry
+from src.utils.token_counter import get_token_counter
+
+MODEL = "claude-templates-test"
+
+
+def test_render_fills_placeholders_and_defaults():
+    template = PromptTemplate("greet", "Hello {name}, {name}! Use {{braces}} for {thing}.",
+                              defaults={"thing": "literals"})
+
+    assert template.render(name="Ann") == "Hello Ann, Ann! Use {braces} for literals."
+    assert template(name="Bo", thing="sets") == "Hello Bo, Bo! Use {braces} for sets."
+    assert template.fields == ("name", "name", "thing")
+    assert template.required == {"name"}
+
+
+def test_missing_variable_names_the_template():
+    template = PromptTemplate("greet", "Hello {name}")
+
+    with pytest.raises(KeyError, match="greet"):
+        template.render()
+
+
+@pytest.mark.parametrize("text, kwargs", [
+    ("Hello {name", {}),
+    ("Hello {name!r}", {}),
+    ("Hello {name:>10}", {}),
+    ("Hello {user.name}", {}),
+    ("Hello {name}", {"variables": ["name", "title"]}),
+    ("Hello {name}", {"defaults": {"title": "Dr"}}),
+])
+def test_invalid_templates_fail_at_load_time(text, kwargs):
+    with pytest.raises(ValueError):
+        PromptTemplate("bad", text, **kwargs)
+
+
+def test_count_tokens_adds_variable_counts_to_the_cached_static_count():
+    template = PromptTemplate("summarize", "Summarize in {n} words:\n{text}")
+    counter = get_token_counter(MODEL)
+    text = "word " * 40
+
+    static = template.static_tokens(MODEL)
+
+    assert static == sum(counter.count(literal) for literal in template.literals)
+    assert template.count_tokens(MODEL, n=50, text=text) == static + counter.count("50") + counter.count(text)
+    assert template._static_tokens == {MODEL: static}
+
+
+@pytest.fixture
+def templates_file(tmp_path):
+    path = tmp_path / "templates.yaml"
+    path.write_text(
+        "templates:\n"
+        "  summarize:\n"
+        "    system: Be concise.\n"
+        "    template: 'Summarize in {max_words} words: {text}'\n"
+        "    defaults:\n"
+        "      max_words: 100\n"
+        "  echo: 'Say {text}'\n"
+    )
+    return str(path)
+
+
+def test_registry_loads_and_renders(templates_file):
+    registry = TemplateRegistry(templates_file)
+
+    assert registry.names() == ["echo", "summarize"]
+    assert registry.get("summarize").system == "Be concise."
+    assert registry.render("summarize", text="abc") == "Summarize in 100 words: abc"
+    assert registry.render("echo", text="hi") == "Say hi"
+    with pytest.raises(KeyError, match="Available"):
+        registry.get("missing")
+
+
+def test_registry_rejects_a_broken_file(tmp_path):
+    path = tmp_path / "broken.yaml"
+    path.write_text("templates:\n  bad:\n    template: 'Hello {name'\n")
+
+    with pytest.raises(ValueError, match="bad"):
+        TemplateRegistry(str(path))
+
+
+def test_registries_are_loaded_once_per_path(templates_file):
+    assert get_registry(templates_file) is get_registry(templates_file)
+
+
+def test_shipped_templates_load():
+    registry = TemplateRegistry(str(Path(__file__).parents[1] / "config" / "prompt_templates.yaml"))
+
+    assert "summarize" in registry
+    assert registry.render("summarize", text="abc").startswith("Summarize the following text in at most 100 words.")
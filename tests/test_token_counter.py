@@ -0,0 +1,140 @@
+import sys
+import types
+
+import pytest
+
+from src.utils import token_counter
+from src.utils.token_counter import (OPENAI_REPLY_PRIMING, OPENAI_TOKENS_PER_MESSAGE, OPENAI_TOKENS_PER_NAME,
+                                     HeuristicTokenCounter, TiktokenCounter, get_encoding, get_token_counter)
+
+
+class FakeEncoding:
+    """One token per whitespace-separated word; records what it was asked to encode."""
+
+    def __init__(self):
+        self.encoded = []
+        self.batches = []
+
+    def encode(self, text, disallowed_special=()):
+        self.encoded.append(text)
+        return text.split()
+
+    def encode_batch(self, texts, disallowed_special=()):
+        self.batches.append(list(texts))
+        return [text.split() for text in texts]
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    monkeypatch.setattr(token_counter, "_encoders", {})
+    monkeypatch.setattr(token_counter, "_counters", {})
+
+
+def test_repeated_strings_are_counted_from_the_memo():
+    encoding = FakeEncoding()
+    counter = TiktokenCounter(encoding)
+
+    assert [counter.count("one two three") for _ in range(3)] == [3, 3, 3]
+    assert counter.count("") == 0
+    assert encoding.encoded == ["one two three"]
+
+
+def test_memo_is_bounded():
+    encoding = FakeEncoding()
+    counter = TiktokenCounter(encoding, memo_size=2, memo_max_chars=10)
+    for text in ("a", "b", "a", "c", "a b"):
+        counter.count(text)
+    counter.count("a much longer text")
+    counter.count("a much longer text")
+
+    assert list(counter._memo) == ["c", "a b"]
+    assert encoding.encoded.count("a much longer text") == 2
+
+
+def test_count_many_encodes_unmemoized_strings_in_one_batch():
+    encoding = FakeEncoding()
+    counter = TiktokenCounter(encoding)
+    counter.count("known text")
+
+    counts = counter.count_many(["known text", "new one", "", "new one", "three more words"])
+
+    assert counts == [2, 2, 0, 2, 3]
+    assert encoding.batches == [["new one", "three more words"]]
+
+
+def test_openai_message_overhead():
+    counter = TiktokenCounter(FakeEncoding())
+    messages = [{"role": "system", "content": "be brief"},
+                {"role": "user", "name": "ann", "content": [{"type": "text", "text": "hi there"}]}]
+
+    expected = OPENAI_REPLY_PRIMING + 2 * OPENAI_TOKENS_PER_MESSAGE + OPENAI_TOKENS_PER_NAME + (1 + 2) + (1 + 2 + 1)
+    assert counter.count_messages(messages) == expected
+    assert counter.count_messages(messages) == counter.request_overhead + sum(map(counter.count_message, messages))
+
+
+def test_heuristic_counts_by_character_ratio():
+    counter = HeuristicTokenCounter(chars_per_token=4.0, tokens_per_message=3, base_overhead=2)
+    messages = [{"role": "user", "content": "x" * 40}, {"role": "assistant", "content": "y" * 20}]
+
+    assert counter.count("x" * 40) == 10
+    assert counter.count("x") == 1
+    assert counter.count("") == 0
+    assert counter.count_messages(messages) == 2 + 2 * 3 + 15
+
+
+def test_calibration_converges_on_the_reported_ratio():
+    counter = HeuristicTokenCounter(chars_per_token=3.5, tokens_per_message=3)
+    messages = [{"role": "user", "content": "z" * 600}]
+    for _ in range(50):
+        # 600 characters at 2 characters per token, plus the message overhead.
+        counter.calibrate(messages, input_tokens=300 + 3)
+
+    assert counter.chars_per_token == pytest.approx(2.0, abs=0.01)
+    assert counter.count_messages(messages) == pytest.approx(303, abs=2)
+
+
+def test_calibration_ignores_tiny_requests():
+    counter = HeuristicTokenCounter(chars_per_token=3.5)
+    counter.calibrate([{"role": "user", "content": "hi"}], input_tokens=10)
+    counter.calibrate([{"role": "user", "content": "q" * 100}], input_tokens=2)
+
+    assert (counter.chars_per_token, counter.samples) == (3.5, 0)
+
+
+def test_claude_models_share_one_heuristic_counter(registry):
+    counter = get_token_counter("claude-3-5-haiku-20241022")
+
+    assert isinstance(counter, HeuristicTokenCounter)
+    assert get_token_counter("claude-3-5-haiku-20241022") is counter
+    assert "claude-3-5-haiku-20241022" not in token_counter._encoders
+
+
+def test_encodings_are_loaded_once_per_model(registry, monkeypatch):
+    loads = []
+
+    def encoding_for_model(model):
+        loads.append(model)
+        if model == "unknown":
+            raise KeyError(model)
+        return FakeEncoding()
+
+    fake = types.SimpleNamespace(encoding_for_model=encoding_for_model, get_encoding=lambda name: name)
+    monkeypatch.setitem(sys.modules, "tiktoken", fake)
+
+    counter = get_token_counter("gpt-4o")
+
+    assert isinstance(counter, TiktokenCounter)
+    assert get_token_counter("gpt-4o") is counter
+    assert get_encoding("gpt-4o") is counter.encoding
+    assert get_encoding("unknown") == "o200k_base"
+    assert loads == ["gpt-4o", "unknown"]
+
+
+def test_unavailable_encoding_falls_back_to_the_heuristic(registry, monkeypatch):
+    def fail(model):
+        raise OSError("no network")
+
+    monkeypatch.setitem(sys.modules, "tiktoken", types.SimpleNamespace(encoding_for_model=fail))
+
+    assert isinstance(get_token_counter("gpt-4o-mini"), HeuristicTokenCounter)
+    assert token_counter._encoders == {"gpt-4o-mini": None}